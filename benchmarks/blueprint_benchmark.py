@@ -0,0 +1,73 @@
+import importlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+import typing
+
+from jyuusu.injectors import create_injector, create_blueprint
+from benchmarks.import_benchmark import generate_module_source
+
+MODULE_NAME = "jyuusu_blueprint_benchmark_classes"
+
+
+def generate_app_module_source(num_classes: int, num_args: int) -> str:
+    lines = [
+        generate_module_source(num_classes, num_args),
+        "from jyuusu.binder import Module, Binder",
+        "",
+        "",
+        "class AppModule(Module):",
+        "    def configure(self, binder: Binder):",
+    ]
+    lines.extend(f"        binder.install_class(C{i})" for i in range(num_classes))
+    return "\n".join(lines) + "\n"
+
+
+def best_time(func: typing.Callable[[], typing.Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmark(class_counts: typing.Sequence[int] = (100, 1000, 5000), num_args: int = 3, repeat: int = 5):
+    """
+    Compare what a worker process spends on building its injector: running the modules' configure() with
+    create_injector(), or unpickling a blueprint received from the parent and creating the injector from it.
+    """
+    print(f"{'classes':>8}{'configure (ms)':>16}{'blueprint (ms)':>16}{'blueprint size (KB)':>22}")
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        try:
+            for num_classes in class_counts:
+                with open(os.path.join(directory, MODULE_NAME + ".py"), "w") as file:
+                    file.write(generate_app_module_source(num_classes, num_args))
+                sys.modules.pop(MODULE_NAME, None)
+                importlib.invalidate_caches()
+
+                def configure():
+                    # A fresh import each time, so that the classes have not been introspected yet, as in a new
+                    # worker.
+                    module = importlib.reload(importlib.import_module(MODULE_NAME))
+                    start = time.perf_counter()
+                    create_injector(module.AppModule)
+                    return time.perf_counter() - start
+
+                module = importlib.import_module(MODULE_NAME)
+                data = pickle.dumps(create_blueprint(module.AppModule))
+
+                configure_time = min(configure() for _ in range(repeat))
+                blueprint_time = best_time(lambda: pickle.loads(data).create_injector(), repeat)
+                print(f"{num_classes:>8}{configure_time * 1000:>16.2f}{blueprint_time * 1000:>16.2f}"
+                      f"{len(data) / 1024:>22.1f}")
+        finally:
+            sys.path.remove(directory)
+            sys.modules.pop(MODULE_NAME, None)
+
+
+if __name__ == "__main__":
+    run_benchmark()
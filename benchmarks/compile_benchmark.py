@@ -0,0 +1,27 @@
+from jyuusu.injector import Injector
+from benchmarks.graphs import create_layered_bindings, time_per_call, ROOT_KEY, Node
+
+GRAPHS = [
+    ("deep (depth=50, width=1)", dict(depth=50, width=1)),
+    ("deep (depth=200, width=1)", dict(depth=200, width=1)),
+    ("wide (depth=2, width=50)", dict(depth=2, width=50)),
+    ("wide (depth=2, width=200)", dict(depth=2, width=200)),
+    ("layered (depth=10, width=20, fan_out=2)", dict(depth=10, width=20, fan_out=2, memoized=True)),
+]
+
+
+def run_benchmark(number: int = 200):
+    print(f"{'graph':<42}{'interpretive (us)':>20}{'compiled (us)':>16}{'speedup':>10}")
+    for (name, kwargs) in GRAPHS:
+        interpretive = Injector(create_layered_bindings(**kwargs))
+        compiled = Injector(create_layered_bindings(**kwargs)).compile()
+
+        interpretive_time = time_per_call(lambda: interpretive.get_instance(Node, ROOT_KEY.tag), number)
+        compiled_time = time_per_call(lambda: compiled.get_instance(Node, ROOT_KEY.tag), number)
+
+        print(f"{name:<42}{interpretive_time * 1e6:>20.2f}{compiled_time * 1e6:>16.2f}"
+              f"{interpretive_time / compiled_time:>9.2f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
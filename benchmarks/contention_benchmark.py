@@ -0,0 +1,56 @@
+import time
+import typing
+from threading import Barrier, Thread
+
+from jyuusu.injector import Injector
+from benchmarks.graphs import create_layered_bindings, ROOT_KEY, Node
+
+
+class LockedLookupInjector(Injector):
+    """
+    Reproduces the old lookup path, which took the injector's lock on every get_resolver() call.
+    """
+
+    def get_resolver(self, key):
+        with self.lock:
+            return super().get_resolver(key)
+
+
+def measure_throughput(injector: Injector, num_threads: int, calls_per_thread: int) -> float:
+    """
+    Return the number of get_instance() calls per second achieved by `num_threads` threads together.
+    """
+    barrier = Barrier(num_threads + 1)
+
+    def work():
+        barrier.wait()
+        for _ in range(calls_per_thread):
+            injector.get_instance(Node, ROOT_KEY.tag)
+
+    threads = [Thread(target=work) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return num_threads * calls_per_thread / elapsed
+
+
+def run_benchmark(thread_counts: typing.Sequence[int] = (1, 2, 4, 8, 16), calls_per_thread: int = 2000):
+    bindings = create_layered_bindings(depth=5, width=4, memoized=True)
+    injectors = [
+        ("locked lookup", LockedLookupInjector(bindings)),
+        ("lock-free lookup", Injector(bindings)),
+    ]
+    print(f"{'threads':>8}" + "".join(f"{name + ' (calls/s)':>28}" for (name, _) in injectors))
+    for num_threads in thread_counts:
+        row = f"{num_threads:>8}"
+        for (_, injector) in injectors:
+            row += f"{measure_throughput(injector, num_threads, calls_per_thread):>28.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    run_benchmark()
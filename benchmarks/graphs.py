@@ -0,0 +1,126 @@
+import timeit
+import typing
+
+from jyuusu.binder import Module, Binder
+from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey
+from jyuusu.constructor_resolver import ConstructorResolver, ResolverSpec
+from jyuusu.injector import Resolver
+from jyuusu.resolvers import MemoizedResolver
+
+
+class Node:
+    def __init__(self, **dependencies):
+        self.dependencies = dependencies
+
+
+def node_key(layer: int, index: int) -> SimpleTypeBindingKey:
+    return SimpleTypeBindingKey(Node, f"{layer}:{index}")
+
+
+ROOT_KEY = SimpleTypeBindingKey(Node, "root")
+
+
+def create_layered_bindings(depth: int,
+                            width: int,
+                            fan_out: int = 1,
+                            memoized: bool = False) -> typing.Dict[BindingKey, Resolver]:
+    """
+    Create the bindings of a synthetic graph with `depth` layers of `width` nodes each.
+
+    Nodes in layer 0 have no dependencies. A node in layer i depends on `fan_out` nodes of layer i - 1. The node
+    bound to ROOT_KEY depends on every node in the last layer. A deep graph is obtained with width=1, and a wide one
+    with a small depth and a large width.
+    """
+    assert depth >= 1
+    assert width >= 1
+    assert 1 <= fan_out <= width
+
+    def wrap(resolver: Resolver) -> Resolver:
+        if memoized:
+            return MemoizedResolver(resolver)
+        else:
+            return resolver
+
+    bindings = {}
+    for index in range(width):
+        bindings[node_key(0, index)] = wrap(ConstructorResolver(Node, {}))
+    for layer in range(1, depth):
+        for index in range(width):
+            specs = {}
+            for k in range(fan_out):
+                specs[f"d{k}"] = ResolverSpec(node_key(layer - 1, (index + k) % width))
+            bindings[node_key(layer, index)] = wrap(ConstructorResolver(Node, specs))
+    root_specs = {f"d{index}": ResolverSpec(node_key(depth - 1, index)) for index in range(width)}
+    bindings[ROOT_KEY] = ConstructorResolver(Node, root_specs)
+    return bindings
+
+
+def create_node_constructor(num_dependencies: int) -> typing.Callable[..., Node]:
+    """
+    Create a function with the arguments d0, ..., d{num_dependencies - 1} that returns a Node. Unlike Node itself,
+    the function can be bound with Binder.to_constructor(), which introspects its argument list.
+    """
+    arg_names = [f"d{k}" for k in range(num_dependencies)]
+    source = f"def make_node({', '.join(arg_names)}):\n" \
+             f"    return Node({', '.join(f'{name}={name}' for name in arg_names)})\n"
+    namespace = {"Node": Node}
+    exec(source, namespace)
+    return namespace["make_node"]
+
+
+def create_layered_module(depth: int, width: int, fan_out: int = 1, memoized: bool = False) -> type:
+    """
+    Create a module that binds the same graph as create_layered_bindings() through the Binder API.
+    """
+    assert depth >= 1
+    assert width >= 1
+    assert 1 <= fan_out <= width
+    make_leaf = create_node_constructor(0)
+    make_inner_node = create_node_constructor(fan_out)
+    make_root = create_node_constructor(width)
+
+    class LayeredModule(Module):
+        def configure(self, binder: Binder):
+            for layer in range(depth):
+                for index in range(width):
+                    subject = binder.bind(Node, node_key(layer, index).tag)
+                    if memoized:
+                        subject.with_memoization()
+                    if layer == 0:
+                        subject.to_constructor(make_leaf)
+                    else:
+                        specs = {
+                            f"d{k}": ResolverSpec.of(Node, node_key(layer - 1, (index + k) % width).tag)
+                            for k in range(fan_out)
+                        }
+                        subject.to_constructor(make_inner_node, **specs)
+            root_specs = {f"d{index}": ResolverSpec.of(Node, node_key(depth - 1, index).tag) for index in range(width)}
+            binder.bind(Node, ROOT_KEY.tag).to_constructor(make_root, **root_specs)
+
+    return LayeredModule
+
+
+def create_dict_module(size: int, memoized: bool = False) -> type:
+    """
+    Create a module that binds a Dict[str, Node] multibinding with `size` entries.
+    """
+    make_leaf = create_node_constructor(0)
+
+    class DictModule(Module):
+        def configure(self, binder: Binder):
+            binder.install_dict(str, Node)
+            for index in range(size):
+                subject = binder.bind_to_dict(str, Node).with_key(f"k{index}")
+                if memoized:
+                    subject.with_memoization()
+                subject.to_constructor(make_leaf)
+
+    return DictModule
+
+
+def time_per_call(func: typing.Callable[[], typing.Any], number: int, repeat: int = 5) -> float:
+    """
+    Return the best, over `repeat` runs, of the average number of seconds that one call to `func` takes.
+    """
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
@@ -0,0 +1,65 @@
+import time
+from threading import Barrier, Thread
+
+from jyuusu.once_cell import OnceCell
+from jyuusu.read_writer_monitor import ReadWriteMonitor
+from benchmarks.graphs import time_per_call
+
+
+class MonitorMemo:
+    """
+    The memoization scheme that MemoizedResolver and Lazy used before OnceCell.
+    """
+
+    def __init__(self):
+        self.read_write_monitor = ReadWriteMonitor()
+        self.value = None
+
+    def get_or_init(self, initializer):
+        with self.read_write_monitor.read_session():
+            value = self.value
+        if value is not None:
+            return value
+        with self.read_write_monitor.write_session():
+            if self.value is None:
+                self.value = initializer()
+        return self.value
+
+
+def measure_threaded_hits(memo, num_threads: int, calls_per_thread: int) -> float:
+    barrier = Barrier(num_threads + 1)
+
+    def work():
+        barrier.wait()
+        for _ in range(calls_per_thread):
+            memo.get_or_init(object)
+
+    threads = [Thread(target=work) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) / (num_threads * calls_per_thread)
+
+
+def run_benchmark(number: int = 200000):
+    memos = [("ReadWriteMonitor", MonitorMemo()), ("OnceCell", OnceCell())]
+    for (_, memo) in memos:
+        memo.get_or_init(object)
+
+    print(f"{'scenario':<24}" + "".join(f"{name + ' (ns/hit)':>26}" for (name, _) in memos))
+    row = f"{'1 thread':<24}"
+    for (_, memo) in memos:
+        row += f"{time_per_call(lambda: memo.get_or_init(object), number) * 1e9:>26.1f}"
+    print(row)
+    for num_threads in [2, 4, 8]:
+        row = f"{str(num_threads) + ' threads':<24}"
+        for (_, memo) in memos:
+            row += f"{measure_threaded_hits(memo, num_threads, number // num_threads) * 1e9:>26.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    run_benchmark()
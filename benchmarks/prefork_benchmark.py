@@ -0,0 +1,96 @@
+"""
+Measures how much of a warmed-up injector stays shared between forked workers, with and without gc.freeze(). Each
+worker resolves from the injector and runs a full garbage collection, as a long-running worker eventually would, and
+then reports its memory from /proc/self/smaps_rollup. Linux only.
+"""
+import gc
+import json
+import os
+import typing
+
+from jyuusu.injector import Injector
+from benchmarks.graphs import create_layered_bindings, ROOT_KEY, Node
+
+
+class Payload:
+    """
+    A singleton that holds many small objects tracked by the garbage collector.
+    """
+
+    def __init__(self, size: int):
+        self.records = [{"id": index, "name": f"record-{index}"} for index in range(size)]
+
+
+def read_memory_kb() -> typing.Dict[str, int]:
+    memory = {}
+    with open("/proc/self/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                memory[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "private_dirty_kb": memory.get("Private_Dirty", 0),
+        "shared_kb": memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0),
+    }
+
+
+def run_worker(injector: Injector, write_fd: int):
+    for _ in range(100):
+        injector.get_instance(Node, ROOT_KEY.tag)
+    gc.collect()
+    os.write(write_fd, (json.dumps(read_memory_kb()) + "\n").encode())
+    os._exit(0)
+
+
+def measure(freeze_gc: bool, num_workers: int, depth: int, width: int, payload_size: int) -> typing.Dict[str, float]:
+    """
+    Build and prepare an injector, fork the workers and return the average memory of a worker. Runs in a process of
+    its own, because gc.freeze() affects the whole process.
+    """
+    bindings = create_layered_bindings(depth=depth, width=width, memoized=True)
+    injector = Injector(bindings)
+    payloads = [Payload(payload_size) for _ in range(width)]
+    for (index, payload) in enumerate(payloads):
+        injector.get_instance(Node, f"0:{index}").dependencies["payload"] = payload
+    del payloads
+    injector.prepare_for_fork(freeze_gc=freeze_gc)
+
+    (read_fd, write_fd) = os.pipe()
+    pids = []
+    for _ in range(num_workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            run_worker(injector, write_fd)
+        pids.append(pid)
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as file:
+        reports = [json.loads(line) for line in file]
+    return {name: sum(report[name] for report in reports) / len(reports) for name in reports[0]}
+
+
+def run_in_child_process(func: typing.Callable[[], typing.Any]) -> typing.Any:
+    (read_fd, write_fd) = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, json.dumps(func()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as file:
+        result = json.loads(file.read())
+    os.waitpid(pid, 0)
+    return result
+
+
+def run_benchmark(num_workers: int = 4, depth: int = 5, width: int = 20, payload_size: int = 20000):
+    print(f"{'gc.freeze()':>12}{'private dirty per worker (KB)':>32}{'shared per worker (KB)':>26}")
+    for freeze_gc in [False, True]:
+        result = run_in_child_process(lambda: measure(freeze_gc, num_workers, depth, width, payload_size))
+        print(f"{str(freeze_gc):>12}{result['private_dirty_kb']:>32.0f}{result['shared_kb']:>26.0f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
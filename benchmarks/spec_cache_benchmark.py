@@ -0,0 +1,65 @@
+import importlib
+import os
+import sys
+import tempfile
+import time
+import typing
+
+from jyuusu.spec_cache import enable_spec_cache, disable_spec_cache
+from benchmarks.import_benchmark import generate_module_source
+
+MODULE_NAME = "jyuusu_spec_cache_benchmark_classes"
+
+
+def time_introspection(module) -> float:
+    """
+    Reload the module, so that its classes have not been introspected yet, and time the introspection of all of them.
+    """
+    module = importlib.reload(module)
+    classes = [value for (name, value) in vars(module).items() if name.startswith("C")]
+    start = time.perf_counter()
+    for klass in classes:
+        # What binding the class costs: the resolver is created from the introspected specs.
+        klass._create_jyuusu_resolver()
+    return time.perf_counter() - start
+
+
+def run_benchmark(class_counts: typing.Sequence[int] = (100, 1000, 5000), num_args: int = 3, repeat: int = 5):
+    print(f"{'classes':>8}{'no cache (ms)':>16}{'cold cache (ms)':>18}{'warm cache (ms)':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        try:
+            for num_classes in class_counts:
+                with open(os.path.join(directory, MODULE_NAME + ".py"), "w") as file:
+                    file.write(generate_module_source(num_classes, num_args))
+                sys.modules.pop(MODULE_NAME, None)
+                importlib.invalidate_caches()
+                module = importlib.import_module(MODULE_NAME)
+                cache_path = os.path.join(directory, f"specs-{num_classes}.cache")
+
+                disable_spec_cache()
+                no_cache = min(time_introspection(module) for _ in range(repeat))
+
+                cold_times = []
+                for _ in range(repeat):
+                    if os.path.exists(cache_path):
+                        os.remove(cache_path)
+                    cache = enable_spec_cache(cache_path, save_at_exit=False)
+                    cold_times.append(time_introspection(module))
+                cache.save()
+
+                warm_times = []
+                for _ in range(repeat):
+                    enable_spec_cache(cache_path, save_at_exit=False)
+                    warm_times.append(time_introspection(module))
+                disable_spec_cache()
+
+                print(f"{num_classes:>8}{no_cache * 1000:>16.2f}{min(cold_times) * 1000:>18.2f}"
+                      f"{min(warm_times) * 1000:>18.2f}")
+        finally:
+            sys.path.remove(directory)
+            sys.modules.pop(MODULE_NAME, None)
+
+
+if __name__ == "__main__":
+    run_benchmark()
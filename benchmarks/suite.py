@@ -0,0 +1,169 @@
+"""
+Times the hot paths of the injector on synthetic graphs and writes the results as JSON, so that runs can be compared
+against a baseline:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --fail-on-regression
+"""
+import argparse
+import json
+import platform
+import sys
+import typing
+
+from jyuusu.binder import Module, Binder
+from jyuusu.constructor_resolver import ResolverSpec
+from jyuusu.factory_resolver import make_injectable_factory, factory_class
+from jyuusu.injector import Injector
+from jyuusu.injectors import create_injector
+from jyuusu.provider import Lazy
+from benchmarks.contention_benchmark import measure_throughput
+from benchmarks.graphs import create_layered_bindings, create_layered_module, create_dict_module, time_per_call, \
+    node_key, ROOT_KEY, Node
+
+
+class Widget:
+    def __init__(self, value: int, node: Node):
+        self.value = value
+        self.node = node
+
+
+make_injectable_factory(Widget, 'node', node=ResolverSpec.of(Node, node_key(0, 0).tag))
+
+
+class WidgetModule(Module):
+    def configure(self, binder: Binder):
+        binder.bind(Node, node_key(0, 0).tag).to_instance(Node())
+        binder.install_class(factory_class(Widget))
+
+
+def run_single_threaded(config: typing.Dict[str, typing.Any]) -> typing.Dict[str, float]:
+    """
+    Return the number of seconds taken by one operation on each hot path.
+    """
+    number = config["number"]
+    graph = dict(depth=config["depth"], width=config["width"], fan_out=config["fan_out"])
+    results = {}
+
+    unscoped = Injector(create_layered_bindings(**graph))
+    results["get_instance/unscoped"] = time_per_call(lambda: unscoped.get_instance(Node, ROOT_KEY.tag), number)
+
+    memoized = Injector(create_layered_bindings(**graph, memoized=True))
+    memoized.get_instance(Node, ROOT_KEY.tag)
+    results["get_instance/memoized"] = time_per_call(lambda: memoized.get_instance(Node, ROOT_KEY.tag), number)
+
+    dict_type = typing.Dict[str, Node]
+    dict_injector = create_injector(create_dict_module(config["dict_size"]))
+    results["get_instance/dict"] = time_per_call(lambda: dict_injector.get_instance(dict_type), number)
+
+    provider = unscoped.get_provider(Node, ROOT_KEY.tag)
+    results["provider_get"] = time_per_call(provider.get, number)
+
+    lazy = Lazy.create(unscoped.get_provider(Node, ROOT_KEY.tag))
+    lazy.get()
+    results["lazy_get"] = time_per_call(lazy.get, number)
+
+    widget_factory = create_injector(WidgetModule).get_instance(factory_class(Widget))
+    results["factory_create"] = time_per_call(lambda: widget_factory.create(10), number)
+    widget_args = [(index,) for index in range(100)]
+    results["factory_create_many"] = time_per_call(lambda: widget_factory.create_many(widget_args), number) / 100
+
+    module = create_layered_module(**graph, memoized=True)
+    results["create_injector"] = time_per_call(lambda: create_injector(module), max(1, number // 10))
+    return results
+
+
+def run_contention(config: typing.Dict[str, typing.Any]) -> typing.Dict[str, float]:
+    """
+    Return the number of seconds per get_instance() call on a memoized graph shared by several threads.
+    """
+    graph = dict(depth=config["depth"], width=config["width"], fan_out=config["fan_out"])
+    results = {}
+    for num_threads in config["threads"]:
+        injector = Injector(create_layered_bindings(**graph, memoized=True))
+        injector.get_instance(Node, ROOT_KEY.tag)
+        throughput = measure_throughput(injector, num_threads, config["number"])
+        results[f"contention/{num_threads}_threads"] = 1.0 / throughput
+    return results
+
+
+def run_suite(config: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    results = run_single_threaded(config)
+    results.update(run_contention(config))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "config": config,
+        "results": results,
+    }
+
+
+def compare_with_baseline(report: typing.Dict[str, typing.Any],
+                          baseline: typing.Dict[str, typing.Any],
+                          threshold: float) -> typing.List[str]:
+    """
+    Print the ratio between the current and the baseline time of every benchmark, and return the names of the
+    benchmarks that got slower by more than the threshold, e.g. 0.1 for 10%.
+    """
+    regressions = []
+    print(f"{'benchmark':<32}{'baseline (us)':>16}{'current (us)':>16}{'ratio':>10}")
+    for (name, seconds) in report["results"].items():
+        baseline_seconds = baseline["results"].get(name)
+        if baseline_seconds is None:
+            print(f"{name:<32}{'-':>16}{seconds * 1e6:>16.3f}{'-':>10}")
+            continue
+        ratio = seconds / baseline_seconds
+        marker = ""
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+            marker = "  <- regression"
+        print(f"{name:<32}{baseline_seconds * 1e6:>16.3f}{seconds * 1e6:>16.3f}{ratio:>9.2f}x{marker}")
+    if baseline.get("config") != report["config"]:
+        print("Warning: the baseline was recorded with a different configuration.")
+    return regressions
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of jyuusu injectors.")
+    parser.add_argument("--depth", type=int, default=5, help="number of layers of the synthetic graph")
+    parser.add_argument("--width", type=int, default=8, help="number of nodes per layer")
+    parser.add_argument("--fan-out", type=int, default=2, help="number of dependencies of each inner node")
+    parser.add_argument("--dict-size", type=int, default=32, help="number of entries of the dict multibinding")
+    parser.add_argument("--number", type=int, default=1000, help="number of calls per timing")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16], help="thread counts for contention")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown ratio that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    config = {
+        "depth": args.depth,
+        "width": args.width,
+        "fan_out": args.fan_out,
+        "dict_size": args.dict_size,
+        "number": args.number,
+        "threads": args.threads,
+    }
+    report = run_suite(config)
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline is None:
+        print(f"{'benchmark':<32}{'time (us)':>16}")
+        for (name, seconds) in report["results"].items():
+            print(f"{name:<32}{seconds * 1e6:>16.3f}")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare_with_baseline(report, baseline, args.threshold)
+    if len(regressions) > 0 and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import asyncio
+import typing
+from collections import OrderedDict
+
+from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey
+from jyuusu.injector import Injector, raise_circular_dependency_error
+from jyuusu.provider import AsyncProvider
+
+
+class AsyncInjector(Injector):
+    """
+    An injector that can also resolve bindings whose constructors or providers are coroutine functions.
+
+    Synchronous bindings can still be obtained with get_instance(). Bindings that need to await anything must be
+    obtained with get_instance_async(), which resolves the independent arguments of a constructor concurrently.
+    """
+
+    async def get_instance_async(self, type_: type, tag: typing.Optional[str] = None) -> typing.Any:
+        return await self.get_instance_internal_async(SimpleTypeBindingKey.of(type_, tag), OrderedDict())
+
+    def get_async_provider(self, type_: type, tag: typing.Optional[str] = None) -> AsyncProvider:
+        return AsyncProviderUsingInjector(self, SimpleTypeBindingKey.of(type_, tag))
+
+    async def get_instance_internal_async(self,
+                                          key: BindingKey,
+                                          binding_key_stack: OrderedDict) -> typing.Any:
+        if self.parent is not None and key not in self.bindings:
+            owner = self.get_binding_owner(key)
+            if owner is not self:
+                return await owner.get_instance_internal_async(key, binding_key_stack)
+
+        if not self.check_cycles:
+            return await self.get_resolver(key).resolve_async(self, binding_key_stack)
+
+        if key in binding_key_stack:
+            raise_circular_dependency_error(binding_key_stack, key)
+
+        binding_key_stack[key] = None
+        resolver = self.get_resolver(key)
+        output = await resolver.resolve_async(self, binding_key_stack)
+        del binding_key_stack[key]
+        return output
+
+    async def get_instances_internal_async(self,
+                                           keys: typing.List[BindingKey],
+                                           binding_key_stack: OrderedDict) -> typing.List[typing.Any]:
+        """
+        Resolve the given keys concurrently. Each key gets its own copy of the binding key stack because the
+        resolutions interleave.
+        """
+        if len(keys) == 0:
+            return []
+        elif len(keys) == 1:
+            return [await self.get_instance_internal_async(keys[0], binding_key_stack)]
+        else:
+            return list(await asyncio.gather(*[
+                self.get_instance_internal_async(key, OrderedDict(binding_key_stack)) for key in keys
+            ]))
+
+
+class AsyncProviderUsingInjector(AsyncProvider):
+    def __init__(self, injector: AsyncInjector, binding_key: BindingKey):
+        self.binding_key = binding_key
+        self.injector = injector
+
+    async def get(self):
+        return await self.injector.get_instance_internal_async(self.binding_key, OrderedDict())
@@ -0,0 +1,126 @@
+import typing
+from collections import OrderedDict
+
+from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey
+from jyuusu.injector import Injector, raise_circular_dependency_error
+from jyuusu.once_cell import UNSET
+
+BatchKey = typing.Union[type, typing.Tuple[type, typing.Optional[str]], BindingKey]
+
+
+class BatchResolutionError(RuntimeError):
+    """
+    Raised by Injector.get_instances() when some of the keys fail. Every key is attempted, so the error holds the
+    exception of each failed key, by position, and the instances of the keys that succeeded.
+    """
+
+    def __init__(self, keys: typing.List[BindingKey], results: typing.List[typing.Any],
+                 errors: typing.Dict[int, Exception]):
+        lines = [f"{len(errors)} of {len(keys)} key(s) failed to resolve:"]
+        for (index, error) in errors.items():
+            lines.append(f"  [{index}] {keys[index]}: {type(error).__name__}: {error}")
+        super().__init__("\n".join(lines))
+        self.keys = keys
+        self.results = results
+        self.errors = errors
+
+
+class SharingInjectorView:
+    """
+    Stands in for an injector while one get_instances() call resolves its keys, and remembers every instance it
+    resolves, so that each binding is built at most once in the call. Everything else is delegated to the injector.
+    Providers created during the call keep the view, but they resolve through the injector's get_instance(), which
+    does not share.
+    """
+
+    def __init__(self, injector: Injector, views: typing.Dict[int, 'SharingInjectorView']):
+        self.injector = injector
+        self.instances: typing.Dict[BindingKey, typing.Any] = {}
+        # The views of the injectors of the parent chain, by id, so that the parents' bindings are shared too.
+        self.views = views
+        views[id(injector)] = self
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.injector, name)
+
+    def get_owning_injector(self) -> Injector:
+        return self.injector
+
+    def get_view(self, injector: Injector) -> 'SharingInjectorView':
+        view = self.views.get(id(injector))
+        if view is None:
+            view = SharingInjectorView(injector, self.views)
+        return view
+
+    def get_instance_internal(self,
+                              key: BindingKey,
+                              binding_key_stack: OrderedDict) -> typing.Any:
+        injector = self.injector
+        if injector.parent is not None and key not in injector.bindings:
+            owner = injector.get_binding_owner(key)
+            if owner is not injector:
+                return self.get_view(owner).get_instance_internal(key, binding_key_stack)
+
+        value = self.instances.get(key, UNSET)
+        if value is not UNSET:
+            return value
+
+        resolver = injector.get_resolver(key)
+        if not injector.check_cycles:
+            value = resolver.resolve(self, binding_key_stack)
+        else:
+            if key in binding_key_stack:
+                raise_circular_dependency_error(binding_key_stack, key)
+            binding_key_stack[key] = None
+            value = resolver.resolve(self, binding_key_stack)
+            del binding_key_stack[key]
+        self.instances[key] = value
+        return value
+
+    def clear(self):
+        for view in self.views.values():
+            view.instances.clear()
+
+
+def to_binding_key(key: BatchKey) -> BindingKey:
+    if isinstance(key, BindingKey):
+        return key
+    elif isinstance(key, tuple):
+        (type_, tag) = key
+        return SimpleTypeBindingKey.of(type_, tag)
+    else:
+        return SimpleTypeBindingKey.of(key)
+
+
+def get_instances(injector: Injector,
+                  keys: typing.Sequence[BatchKey],
+                  share_dependencies: bool = False) -> typing.List[typing.Any]:
+    binding_keys = [to_binding_key(key) for key in keys]
+    if share_dependencies:
+        view = SharingInjectorView(injector, {})
+
+        def get(key: BindingKey) -> typing.Any:
+            return view.get_instance_internal(key, OrderedDict())
+    else:
+        view = None
+
+        def get(key: BindingKey) -> typing.Any:
+            if isinstance(key, SimpleTypeBindingKey):
+                return injector.get_instance(key.type_, key.tag)
+            return injector.create_instance_getter(key)()
+
+    results = []
+    errors = {}
+    try:
+        for (index, key) in enumerate(binding_keys):
+            try:
+                results.append(get(key))
+            except Exception as e:
+                results.append(None)
+                errors[index] = e
+    finally:
+        if view is not None:
+            view.clear()
+    if len(errors) > 0:
+        raise BatchResolutionError(binding_keys, results, errors)
+    return results
@@ -5,7 +5,10 @@ from typing import Dict, Set, Optional
 from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey, ToDictBindingKey
 from jyuusu.constructor_resolver import create_resolver, class_module
 from jyuusu.injector import Resolver
+from jyuusu.memoization import MemoizationPolicy, EvictingMemoizedResolver
+from jyuusu.once_cell import FailurePolicy
 from jyuusu.resolvers import InstanceResolver, DelegatedResolver, MemoizedResolver, DictResolver
+from jyuusu.scopes import Scope, ScopedResolver
 
 
 class AbstractBindingSubject(ABC):
@@ -14,6 +17,9 @@ class AbstractBindingSubject(ABC):
         self.type_ = type_
         self.binder = binder
         self.memoized = False
+        self.failure_policy: Optional[FailurePolicy] = None
+        self.memoization_policy: Optional[MemoizationPolicy] = None
+        self.scope: Optional[Scope] = None
 
     @abstractmethod
     def get_binding_key(self) -> BindingKey:
@@ -28,19 +34,37 @@ class AbstractBindingSubject(ABC):
         self.tag = tag
         return self
 
-    def with_memoization(self):
+    def with_memoization(self,
+                         failure_policy: Optional[FailurePolicy] = None,
+                         policy: Optional[MemoizationPolicy] = None):
         assert self.memoized == False
+        assert self.scope is None
+        assert failure_policy is None or policy is None, \
+            "A failure policy only applies to bindings that are kept for the life of the injector."
         self.memoized = True
+        self.failure_policy = failure_policy
+        self.memoization_policy = policy
+        return self
+
+    def in_scope(self, scope: Scope):
+        assert self.scope is None
+        assert not self.memoized
+        self.scope = scope
         return self
 
     def to_instance(self, value: typing.Any):
         assert not self.memoized
+        assert self.scope is None
         self.add_binding(InstanceResolver(value))
         return self
 
     def wrap_if_memoized(self, resolver: Resolver):
-        if self.memoized:
-            return MemoizedResolver(resolver)
+        if self.memoized and self.memoization_policy is not None:
+            return EvictingMemoizedResolver(resolver, self.memoization_policy)
+        elif self.memoized:
+            return MemoizedResolver(resolver, self.failure_policy)
+        elif self.scope is not None:
+            return ScopedResolver(resolver, self.scope)
         else:
             return resolver
 
@@ -115,13 +139,20 @@ class Binder:
     def install_class(self, klass: type):
         return self.install_module(class_module(klass))
 
-    def install_dict(self, key_type: type, value_type: type, tag: Optional[str] = None):
+    def install_dict(self, key_type: type, value_type: type, tag: Optional[str] = None, cached: bool = False):
+        """
+        Bind Dict[key_type, value_type] to a dict built from the entries bound with bind_to_dict(). With cached=True,
+        the dict is built once, on first injection, and every injection gets the same read-only mapping. Installing
+        the same dict again, e.g. from another module, is allowed. The dict is cached if any installation asks for it.
+        """
         assert key_type in [str, int, type]
         dict_type = typing.Dict[key_type, value_type]
         simple_key = SimpleTypeBindingKey(dict_type, tag)
-        if simple_key in self.bindings:
-            return
-        self.add_binding(simple_key, DictResolver(dict_type, set()))
+        dict_resolver = self.bindings.get(simple_key)
+        if dict_resolver is None:
+            self.add_binding(simple_key, DictResolver(dict_type, set(), cached))
+        elif cached and not dict_resolver.cached:
+            self.bindings[simple_key] = DictResolver(dict_type, dict_resolver.to_dict_binding_keys, cached)
         return self
 
     def bind(self, type_: type, tag: Optional[str] = None):
@@ -1,4 +1,5 @@
 import typing
+import weakref
 from abc import ABC
 from dataclasses import dataclass
 
@@ -16,6 +17,43 @@ class SimpleTypeBindingKey(BindingKey):
 
     def __post_init__(self):
         check_is_type_all_the_way_down(self.type_)
+        # Generic aliases are expensive to hash, so the hash is computed once.
+        object.__setattr__(self, '_hash', hash((self.type_, self.tag)))
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # The cached hash depends on the identity of the type and must not travel across processes.
+        return _unpickle_simple_type_binding_key, (self.type_, self.tag)
+
+    @staticmethod
+    def of(type_: type, tag: typing.Optional[str] = None) -> 'SimpleTypeBindingKey':
+        """
+        Return the interned key for the given type and tag. The key is validated only when it is first created.
+        """
+        interned_key = _interned_simple_type_binding_keys.get((type_, tag))
+        if interned_key is not None:
+            return interned_key
+        key = SimpleTypeBindingKey(type_, tag)
+        return _interned_simple_type_binding_keys.setdefault((type_, tag), key)
+
+
+# Keyed by the type itself, so equal generic aliases with different ids share one key. An entry lives only as long as
+# its key is used elsewhere, e.g. by a binding or an instance getter, so interning never pins a type.
+_interned_simple_type_binding_keys: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def _unpickle_simple_type_binding_key(type_: type, tag: typing.Optional[str]) -> SimpleTypeBindingKey:
+    # The key was validated when it was created, so unpickling interns it without validating it again.
+    interned_key = _interned_simple_type_binding_keys.get((type_, tag))
+    if interned_key is not None:
+        return interned_key
+    key = object.__new__(SimpleTypeBindingKey)
+    object.__setattr__(key, 'type_', type_)
+    object.__setattr__(key, 'tag', tag)
+    object.__setattr__(key, '_hash', hash((type_, tag)))
+    return _interned_simple_type_binding_keys.setdefault((type_, tag), key)
 
 
 @dataclass(eq=True, frozen=True)
@@ -27,4 +65,11 @@ class ToDictBindingKey(BindingKey):
     def __post_init__(self):
         check_is_type_all_the_way_down(self.dict_type)
         assert typing.get_origin(self.dict_type) == dict
-        assert typing.get_args(self.dict_type)[0] in {type, str, int}
\ No newline at end of file
+        assert typing.get_args(self.dict_type)[0] in {type, str, int}
+        object.__setattr__(self, '_hash', hash((self.dict_type, self.key_value, self.tag)))
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return ToDictBindingKey, (self.dict_type, self.key_value, self.tag)
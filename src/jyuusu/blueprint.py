@@ -0,0 +1,41 @@
+import pickle
+import typing
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver
+
+
+class InjectorBlueprint:
+    """
+    A serialized copy of the bindings configured by a set of modules: binding keys, resolver kinds, constructor
+    references and constant instances, without any memoized instance or other runtime state. A blueprint can be
+    pickled, e.g. to the workers of a process pool, which then create injectors from it without running the modules'
+    configure() again. Constructors and instances are pickled as usual, so constructors must be importable by name.
+    """
+
+    def __init__(self, bindings: typing.Dict[BindingKey, Resolver]):
+        self.data = serialize_bindings(bindings)
+
+    def create_bindings(self) -> typing.Dict[BindingKey, Resolver]:
+        # Every call gets new resolvers, so injectors created from one blueprint never share memoized instances.
+        return pickle.loads(self.data)
+
+    def create_injector(self, injector_class: typing.Type[Injector] = Injector, validate: bool = False) -> Injector:
+        injector = injector_class(self.create_bindings())
+        if validate:
+            injector.validate()
+        return injector
+
+
+def serialize_bindings(bindings: typing.Dict[BindingKey, Resolver]) -> bytes:
+    try:
+        return pickle.dumps(bindings, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass
+    # Find the binding that cannot be pickled, so that the error names it.
+    for (key, resolver) in bindings.items():
+        try:
+            pickle.dumps(resolver, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            raise ValueError(f"The binding of {key} cannot be put in a blueprint: {e}") from e
+    raise ValueError("The bindings cannot be put in a blueprint.")
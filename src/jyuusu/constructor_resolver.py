@@ -1,14 +1,24 @@
+import functools
 import inspect
 import typing
+import weakref
 from dataclasses import dataclass
 from enum import Enum
 from inspect import FullArgSpec
 from typing import Dict
 
-from jyuusu.injector import Resolver, Injector, ProviderUsingInjector
-from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey
-from jyuusu.provider import Provider, Lazy
-from jyuusu.resolvers import MemoizedResolver
+from jyuusu.async_injector import AsyncInjector, AsyncProviderUsingInjector
+from jyuusu.injector import Resolver, Injector, ProviderUsingInjector, Dependency, unwrap_resolver
+from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey, ToDictBindingKey
+from jyuusu.memoization import MemoizationPolicy, EvictingMemoizedResolver
+from jyuusu.once_cell import FailurePolicy, OnceCell
+from jyuusu.provider import Provider, Lazy, AsyncProvider, AsyncLazy
+from jyuusu.resolvers import MemoizedResolver, DictResolver
+from jyuusu.scopes import Scope, ScopedResolver
+from jyuusu.spec_cache import get_specs
+
+if typing.TYPE_CHECKING:
+    from jyuusu.compiler import ResolutionCompiler
 
 
 def normalize_dict_type(type_: type) -> type:
@@ -22,6 +32,12 @@ class ProviderType(Enum):
     VALUE = 1
     PROVIDER = 2
     LAZY = 3
+    ASYNC_PROVIDER = 4
+    ASYNC_LAZY = 5
+    # Resolve to a dict that maps the keys of a dict binding to providers, or lazies, of the entries, so that only the
+    # entries that are looked up get constructed.
+    DICT_OF_PROVIDERS = 6
+    DICT_OF_LAZIES = 7
 
 
 @dataclass
@@ -31,37 +47,191 @@ class ResolverSpec:
 
     @staticmethod
     def of(type_: type, tag: typing.Optional[str] = None):
-        return ResolverSpec(SimpleTypeBindingKey(type_, tag))
+        return ResolverSpec(SimpleTypeBindingKey.of(type_, tag))
 
     @staticmethod
     def provider(type_: type, tag: typing.Optional[str] = None):
-        return ResolverSpec(SimpleTypeBindingKey(type_, tag), ProviderType.PROVIDER)
+        return ResolverSpec(SimpleTypeBindingKey.of(type_, tag), ProviderType.PROVIDER)
 
     @staticmethod
     def lazy(type_: type, tag: typing.Optional[str] = None):
-        return ResolverSpec(SimpleTypeBindingKey(type_, tag), ProviderType.LAZY)
+        return ResolverSpec(SimpleTypeBindingKey.of(type_, tag), ProviderType.LAZY)
+
+    @staticmethod
+    def async_provider(type_: type, tag: typing.Optional[str] = None):
+        return ResolverSpec(SimpleTypeBindingKey.of(type_, tag), ProviderType.ASYNC_PROVIDER)
+
+    @staticmethod
+    def async_lazy(type_: type, tag: typing.Optional[str] = None):
+        return ResolverSpec(SimpleTypeBindingKey.of(type_, tag), ProviderType.ASYNC_LAZY)
+
+    @staticmethod
+    def dict_of_providers(key_type: type, value_type: type, tag: typing.Optional[str] = None):
+        return ResolverSpec(SimpleTypeBindingKey.of(Dict[key_type, value_type], tag), ProviderType.DICT_OF_PROVIDERS)
+
+    @staticmethod
+    def dict_of_lazies(key_type: type, value_type: type, tag: typing.Optional[str] = None):
+        return ResolverSpec(SimpleTypeBindingKey.of(Dict[key_type, value_type], tag), ProviderType.DICT_OF_LAZIES)
 
 
 class ConstructorResolver(Resolver):
     def __init__(self, constructor: typing.Callable, arg_resolver_specs: typing.Dict[str, ResolverSpec]):
         self.constructor = constructor
         self.arg_resolver_specs = arg_resolver_specs
+        self.has_deferred_arguments = any(
+            resolver_spec.provider_type != ProviderType.VALUE for resolver_spec in arg_resolver_specs.values())
+        # Maps an injector to a function per deferred argument that produces its value from providers created for
+        # that injector. Providers are stateless, so they are created once per injector and shared by every
+        # construction. Lazies cache their value, so every construction still gets new ones. The factories of the
+        # injector that used them last are also kept on their own, so that they are found without a lookup. The
+        # dictionary is created on first use, since most resolvers have no deferred arguments.
+        self.deferred_argument_factories_by_injector: typing.Optional[
+            'weakref.WeakKeyDictionary[Injector, typing.Dict[str, typing.Callable[[], typing.Any]]]'] = None
+        self.deferred_argument_factories: typing.Optional[
+            typing.Tuple[Injector, typing.Dict[str, typing.Callable[[], typing.Any]]]] = None
+
+    def __reduce__(self):
+        return ConstructorResolver, (self.constructor, self.arg_resolver_specs)
+
+    def get_deferred_argument_factories(self, injector: Injector) -> typing.Dict[str, typing.Callable[[], typing.Any]]:
+        deferred_argument_factories = self.deferred_argument_factories
+        if deferred_argument_factories is not None and deferred_argument_factories[0] is injector:
+            return deferred_argument_factories[1]
+        # Providers are bound to the injector itself, never to a temporary view of it, such as the one of
+        # get_instances(), so that a singleton built under the view does not keep the view alive.
+        owner = injector.get_owning_injector()
+        factories_by_injector = self.deferred_argument_factories_by_injector
+        if factories_by_injector is None:
+            factories_by_injector = weakref.WeakKeyDictionary()
+            self.deferred_argument_factories_by_injector = factories_by_injector
+        factories = factories_by_injector.get(owner)
+        if factories is None:
+            factories = {
+                key: create_deferred_argument_factory(owner, resolver_spec)
+                for (key, resolver_spec) in self.arg_resolver_specs.items()
+                if resolver_spec.provider_type != ProviderType.VALUE
+            }
+            # Racing threads create equivalent factories, so losing one of them is harmless.
+            factories = factories_by_injector.setdefault(owner, factories)
+        self.deferred_argument_factories = (owner, factories)
+        return factories
 
     def resolve(self,
                 injector: Injector,
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        if self.has_deferred_arguments:
+            factories = self.get_deferred_argument_factories(injector)
+        else:
+            factories = None
         kwargs = {}
         for (key, resolver_spec) in self.arg_resolver_specs.items():
             if resolver_spec.provider_type == ProviderType.VALUE:
                 value = injector.get_instance_internal(resolver_spec.binding_key, binding_key_stack)
-            elif resolver_spec.provider_type == ProviderType.PROVIDER:
-                value = ProviderUsingInjector(injector, resolver_spec.binding_key)
             else:
-                value = Lazy(ProviderUsingInjector(injector, resolver_spec.binding_key))
+                value = factories[key]()
             kwargs[key] = value
         instance = self.constructor(**kwargs)
         return instance
 
+    async def resolve_async(self,
+                            injector: AsyncInjector,
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        kwargs = {}
+        value_arg_names = []
+        value_keys = []
+        for (key, resolver_spec) in self.arg_resolver_specs.items():
+            if resolver_spec.provider_type == ProviderType.VALUE:
+                value_arg_names.append(key)
+                value_keys.append(resolver_spec.binding_key)
+            else:
+                kwargs[key] = self.get_deferred_argument_factories(injector)[key]()
+        values = await injector.get_instances_internal_async(value_keys, binding_key_stack)
+        kwargs.update(zip(value_arg_names, values))
+        instance = self.constructor(**kwargs)
+        if inspect.isawaitable(instance):
+            instance = await instance
+        return instance
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        constructor = self.constructor
+        if len(self.arg_resolver_specs) == 0:
+            return constructor
+
+        arg_plans = []
+        for (key, resolver_spec) in self.arg_resolver_specs.items():
+            if resolver_spec.provider_type == ProviderType.VALUE:
+                plan = compiler.compile_key(resolver_spec.binding_key)
+            else:
+                plan = create_deferred_argument_factory(compiler.injector, resolver_spec)
+            arg_plans.append((key, plan))
+
+        def resolve():
+            return constructor(**{key: plan() for (key, plan) in arg_plans})
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return [
+            Dependency(resolver_spec.binding_key, resolver_spec.provider_type != ProviderType.VALUE)
+            for resolver_spec in self.arg_resolver_specs.values()
+        ]
+
+
+def create_deferred_argument_factory(injector: Injector,
+                                     resolver_spec: ResolverSpec) -> typing.Callable[[], typing.Any]:
+    """
+    Create the providers of a deferred argument and return a function that produces the argument from them.
+    """
+    if resolver_spec.provider_type == ProviderType.PROVIDER:
+        provider = ProviderUsingInjector(injector, resolver_spec.binding_key)
+        return lambda: provider
+    elif resolver_spec.provider_type == ProviderType.LAZY:
+        return functools.partial(Lazy, ProviderUsingInjector(injector, resolver_spec.binding_key))
+    elif resolver_spec.provider_type == ProviderType.ASYNC_PROVIDER:
+        async_provider = AsyncProviderUsingInjector(injector, resolver_spec.binding_key)
+        return lambda: async_provider
+    elif resolver_spec.provider_type == ProviderType.ASYNC_LAZY:
+        return functools.partial(AsyncLazy, AsyncProviderUsingInjector(injector, resolver_spec.binding_key))
+    elif resolver_spec.provider_type == ProviderType.DICT_OF_PROVIDERS:
+        providers = {
+            key.key_value: ProviderUsingInjector(injector, key)
+            for key in get_dict_entry_keys(injector, resolver_spec.binding_key)
+        }
+        # The dict is copied, so that an instance that modifies its dict does not affect the others.
+        return functools.partial(dict, providers)
+    elif resolver_spec.provider_type == ProviderType.DICT_OF_LAZIES:
+        providers = [
+            (key.key_value, ProviderUsingInjector(injector, key))
+            for key in get_dict_entry_keys(injector, resolver_spec.binding_key)
+        ]
+        return lambda: {key_value: Lazy(provider) for (key_value, provider) in providers}
+    else:
+        raise AssertionError(f"Provider type {resolver_spec.provider_type} does not defer resolution.")
+
+
+def create_deferred_argument(injector: Injector, resolver_spec: ResolverSpec) -> typing.Any:
+    return create_deferred_argument_factory(injector, resolver_spec)()
+
+
+def get_dict_entry_keys(injector: Injector, dict_key: SimpleTypeBindingKey) -> typing.Set[ToDictBindingKey]:
+    dict_resolver = unwrap_resolver(injector.get_resolver(dict_key))
+    assert isinstance(dict_resolver, DictResolver), f"{dict_key} is not bound to a dict binding."
+    return dict_resolver.to_dict_binding_keys
+
+
+def get_dict_of_providers_spec(dict_type: type, tag: typing.Optional[str]) -> typing.Optional[ResolverSpec]:
+    """
+    Return the spec of a Dict[K, Provider[V]] or Dict[K, Lazy[V]] annotation, or None for other dict types.
+    """
+    (key_type, value_type) = typing.get_args(dict_type)
+    value_origin = typing.get_origin(value_type)
+    if value_origin == Provider:
+        return ResolverSpec.dict_of_providers(key_type, typing.get_args(value_type)[0], tag)
+    elif value_origin == Lazy:
+        return ResolverSpec.dict_of_lazies(key_type, typing.get_args(value_type)[0], tag)
+    else:
+        return None
+
 
 def assert_valid_constructor_and_resolver_specs(constructor_arg_spec: FullArgSpec,
                                                 resolver_specs: Dict[str, typing.Union[str, ResolverSpec]],
@@ -117,6 +287,16 @@ def get_resolver_spec(
                 assert len(typing.get_args(arg_type)) == 1
                 underlying_type = normalize_dict_type(typing.get_args(arg_type)[0])
                 spec = ResolverSpec.lazy(underlying_type, tag)
+            elif origin == AsyncProvider:
+                assert len(typing.get_args(arg_type)) == 1
+                underlying_type = normalize_dict_type(typing.get_args(arg_type)[0])
+                spec = ResolverSpec.async_provider(underlying_type, tag)
+            elif origin == AsyncLazy:
+                assert len(typing.get_args(arg_type)) == 1
+                underlying_type = normalize_dict_type(typing.get_args(arg_type)[0])
+                spec = ResolverSpec.async_lazy(underlying_type, tag)
+            elif origin == dict and get_dict_of_providers_spec(arg_type, tag) is not None:
+                spec = get_dict_of_providers_spec(arg_type, tag)
             else:
                 spec = ResolverSpec.of(normalize_dict_type(arg_type), tag)
     else:
@@ -169,21 +349,34 @@ def create_jyuusu_class_installation_module(klass: type):
     return _JyuusuModule
 
 
-def add_resolver_factory_and_module(klass: type, resolver_specs: Dict[str, typing.Union[str, ResolverSpec]]) -> type:
-    assert inspect.isclass(klass), "The input 'klass' is not a class!"
+def get_class_constructor_arg_spec(klass: type) -> FullArgSpec:
     if '__init__' not in klass.__dict__:
         def __init__(self):
             pass
 
-        full_arg_spec = inspect.getfullargspec(__init__)
+        return inspect.getfullargspec(__init__)
     else:
         assert inspect.isfunction(klass.__init__), f"{klass}'s __init__ is not a function"
-        full_arg_spec = inspect.getfullargspec(klass.__init__)
+        return inspect.getfullargspec(klass.__init__)
+
+
+def get_class_arg_resolver_specs(klass: type,
+                                 resolver_specs: Dict[str, typing.Union[str, ResolverSpec]]) -> Dict[str, ResolverSpec]:
+    full_arg_spec = get_class_constructor_arg_spec(klass)
+    return get_constructor_arg_resolver_specs(full_arg_spec, resolver_specs, is_class_constructor=True)
 
-    args_resolver_specs = get_constructor_arg_resolver_specs(full_arg_spec, resolver_specs, is_class_constructor=True)
+
+def add_resolver_factory_and_module(klass: type, resolver_specs: Dict[str, typing.Union[str, ResolverSpec]]) -> type:
+    assert inspect.isclass(klass), "The input 'klass' is not a class!"
+    # The constructor is introspected when the class is first bound, not when it is decorated, so that importing
+    # classes that a program never uses costs almost nothing. validate_injectable_class() does it eagerly.
+    args_resolver_specs_cell = OnceCell()
+
+    def introspect() -> Dict[str, ResolverSpec]:
+        return get_specs(klass, 'class', resolver_specs, lambda: get_class_arg_resolver_specs(klass, resolver_specs))
 
     def _create_jyuusu_resolver() -> Resolver:
-        return ConstructorResolver(klass, args_resolver_specs)
+        return ConstructorResolver(klass, args_resolver_specs_cell.get_or_init(introspect))
 
     klass._create_jyuusu_resolver = staticmethod(_create_jyuusu_resolver)
     klass._JyuusuModule = create_jyuusu_class_installation_module(klass)
@@ -233,17 +426,63 @@ def is_class_injectable(klass: type) -> bool:
     return len(jyuusu_module_init_signature.parameters) == 0
 
 
+def validate_injectable_class(klass: type) -> type:
+    """
+    Introspect the constructor of an injectable class now instead of when the class is first bound, so that errors
+    in its annotations or resolver specs are reported right away.
+    """
+    assert is_class_injectable(klass), "Input is not injectable!"
+    klass._create_jyuusu_resolver()
+    return klass
+
+
 def class_module(klass: type):
     assert is_class_injectable(klass)
     return klass._JyuusuModule
 
 
+def memoized_with(failure_policy: typing.Optional[FailurePolicy] = None,
+                  policy_factory: typing.Optional[typing.Callable[[], MemoizationPolicy]] = None):
+    """
+    Memoize the instances of the class. With policy_factory, e.g. KeepWhileReferenced or
+    functools.partial(EvictWhenIdle, 60.0), every binding of the class, in every injector, gets its own policy from
+    the factory, and keeps its instance for as long as that policy does. A policy that serves a single binding never
+    has another instance to evict in favour of it, so a group of bindings that should share a KeepMostRecentlyUsed
+    must be bound with with_memoization(policy=...) and one explicitly shared policy instead.
+    """
+    assert failure_policy is None or policy_factory is None, \
+        "A failure policy only applies to bindings that are kept for the life of the injector."
+    assert not isinstance(policy_factory, MemoizationPolicy), \
+        "Pass a function that creates a policy, so that the injectors that bind the class do not share one."
+
+    def _memoized(klass):
+        assert is_class_injectable(klass), "Input is not injectable!"
+        old_factory = klass._create_jyuusu_resolver
+
+        def _create_jyuusu_resolver() -> Resolver:
+            if policy_factory is not None:
+                return EvictingMemoizedResolver(old_factory(), policy_factory())
+            return MemoizedResolver(old_factory(), failure_policy)
+
+        klass._create_jyuusu_resolver = staticmethod(_create_jyuusu_resolver)
+        return klass
+
+    return _memoized
+
+
 def memoized(klass):
-    assert is_class_injectable(klass), "Input is not injectable!"
-    old_factory = klass._create_jyuusu_resolver
+    return memoized_with()(klass)
 
-    def _create_jyuusu_resolver() -> Resolver:
-        return MemoizedResolver(old_factory())
 
-    klass._create_jyuusu_resolver = staticmethod(_create_jyuusu_resolver)
-    return klass
+def scoped(scope: Scope):
+    def _scoped(klass):
+        assert is_class_injectable(klass), "Input is not injectable!"
+        old_factory = klass._create_jyuusu_resolver
+
+        def _create_jyuusu_resolver() -> Resolver:
+            return ScopedResolver(old_factory(), scope)
+
+        klass._create_jyuusu_resolver = staticmethod(_create_jyuusu_resolver)
+        return klass
+
+    return _scoped
@@ -1,11 +1,15 @@
+import functools
 import inspect
 from inspect import FullArgSpec
-from typing import Dict, Union, Optional
+from typing import Dict, Union, Optional, Any, Callable, List, Tuple, Iterable, Sequence
 
 from jyuusu.constructor_resolver import ResolverSpec, assert_valid_constructor_and_resolver_specs, get_resolver_spec, \
-    ProviderType, ConstructorResolver, create_jyuusu_class_installation_module
-from jyuusu.injector import Resolver
-from jyuusu.provider import Provider, Lazy
+    ProviderType, ConstructorResolver, create_jyuusu_class_installation_module, get_class_constructor_arg_spec
+from jyuusu.injector import Resolver, ProviderUsingInjector, unwrap_resolver
+from jyuusu.once_cell import OnceCell
+from jyuusu.spec_cache import get_specs
+from jyuusu.provider import Provider, Lazy, AsyncLazy
+from jyuusu.resolvers import MemoizedResolver, InstanceResolver
 
 
 def get_factory_arg_resolver_specs(constructor_arg_spec: FullArgSpec,
@@ -31,48 +35,124 @@ def get_factory_arg_resolver_specs(constructor_arg_spec: FullArgSpec,
     return args_resolver_specs
 
 
+def get_factory_resolver_specs(args_resolver_specs: Dict[str, ResolverSpec]) -> Dict[str, ResolverSpec]:
+    """
+    Return the specs of the arguments of a factory's constructor, which receives a provider for each argument that
+    the factory resolves.
+    """
+    factory_resolver_specs = {}
+    for (arg_name, resolver_spec) in args_resolver_specs.items():
+        if resolver_spec.provider_type in (ProviderType.ASYNC_PROVIDER, ProviderType.ASYNC_LAZY):
+            spec = ResolverSpec(resolver_spec.binding_key, ProviderType.ASYNC_PROVIDER)
+        elif resolver_spec.provider_type in (ProviderType.DICT_OF_PROVIDERS, ProviderType.DICT_OF_LAZIES):
+            spec = ResolverSpec(resolver_spec.binding_key, ProviderType.DICT_OF_PROVIDERS)
+        else:
+            spec = ResolverSpec(resolver_spec.binding_key, ProviderType.PROVIDER)
+        factory_resolver_specs[arg_name] = spec
+    return factory_resolver_specs
+
+
+def create_arg_getter(provider_type: ProviderType, provider: Any) -> Optional[Callable[[], Any]]:
+    """
+    Return a function that produces the argument of the given provider type from the factory's provider, or None if
+    the provider itself is the argument.
+    """
+    if provider_type == ProviderType.VALUE:
+        return provider.get
+    elif provider_type in (ProviderType.PROVIDER, ProviderType.ASYNC_PROVIDER):
+        return None
+    elif provider_type == ProviderType.LAZY:
+        # Every created instance gets its own Lazy, so that it resolves the binding on its own first use.
+        return functools.partial(Lazy, provider)
+    elif provider_type == ProviderType.ASYNC_LAZY:
+        return functools.partial(AsyncLazy, provider)
+    elif provider_type == ProviderType.DICT_OF_PROVIDERS:
+        return functools.partial(dict, provider)
+    elif provider_type == ProviderType.DICT_OF_LAZIES:
+        items = list(provider.items())
+        return lambda: {key: Lazy(entry_provider) for (key, entry_provider) in items}
+    else:
+        raise AssertionError(f"Unknown provider type {provider_type}.")
+
+
+def is_memoized_value_getter(getter: Callable[[], Any]) -> bool:
+    """
+    Return whether the getter is the get() of a provider whose binding always resolves to the same instance.
+    """
+    provider = getattr(getter, '__self__', None)
+    if not isinstance(provider, ProviderUsingInjector):
+        return False
+    resolver = unwrap_resolver(provider.injector.get_resolver(provider.binding_key))
+    return isinstance(resolver, (MemoizedResolver, InstanceResolver))
+
+
 def add_injectable_factory(
         klass: type,
         resolved_start: str,
         resolver_specs: Dict[str, Union[str, ResolverSpec]]):
     assert inspect.isclass(klass), "The input 'klass' is not a class!"
-    if '__init__' not in klass.__dict__:
-        def __init__(self):
-            pass
+    # As with injectable classes, the constructor is introspected when the factory is first bound.
+    args_resolver_specs_cell = OnceCell()
 
-        full_arg_spec = inspect.getfullargspec(__init__)
-    else:
-        assert inspect.isfunction(klass.__init__)
-        full_arg_spec = inspect.getfullargspec(klass.__init__)
+    def compute() -> Dict[str, ResolverSpec]:
+        return get_factory_arg_resolver_specs(get_class_constructor_arg_spec(klass), resolved_start, resolver_specs)
 
-    args_resolver_specs = get_factory_arg_resolver_specs(full_arg_spec, resolved_start, resolver_specs)
+    def introspect() -> Dict[str, ResolverSpec]:
+        return get_specs(klass, f'factory:{resolved_start}', resolver_specs, compute)
+
+    def get_args_resolver_specs() -> Dict[str, ResolverSpec]:
+        return args_resolver_specs_cell.get_or_init(introspect)
 
     class _JyuusuFactory:
         def __init__(self, **kwargs):
+            self.args_resolver_specs = get_args_resolver_specs()
             self.providers: Dict[str, Provider] = {}
-            for arg_name in args_resolver_specs:
+            for arg_name in self.args_resolver_specs:
                 self.providers[arg_name] = kwargs[arg_name]
+            # How each argument is produced is decided here, once, so that create() only calls the getters.
+            self.constant_kwargs: Dict[str, Any] = {}
+            self.arg_getters: List[Tuple[str, Callable[[], Any]]] = []
+            for (arg_name, resolver_spec) in self.args_resolver_specs.items():
+                getter = create_arg_getter(resolver_spec.provider_type, self.providers[arg_name])
+                if getter is None:
+                    self.constant_kwargs[arg_name] = self.providers[arg_name]
+                else:
+                    self.arg_getters.append((arg_name, getter))
 
         def create(self, *args, **kwargs):
-            new_kwargs = kwargs.copy()
-            for (arg_name, resolver_spec) in args_resolver_specs.items():
-                if resolver_spec.provider_type == ProviderType.VALUE:
-                    value = self.providers[arg_name].get()
-                elif resolver_spec.provider_type == ProviderType.PROVIDER:
-                    value = self.providers[arg_name]
+            kwargs.update(self.constant_kwargs)
+            for (arg_name, getter) in self.arg_getters:
+                kwargs[arg_name] = getter()
+            return klass(*args, **kwargs)
+
+        def create_many(self, args_iterable: Iterable[Sequence[Any]]) -> List[Any]:
+            """
+            Create one instance for each sequence of positional arguments. Injected values of memoized bindings are
+            fetched once for the whole batch. The other injected arguments are produced for every instance, as
+            create() does.
+            """
+            shared_kwargs = dict(self.constant_kwargs)
+            arg_getters = []
+            for (arg_name, getter) in self.arg_getters:
+                if is_memoized_value_getter(getter):
+                    shared_kwargs[arg_name] = getter()
                 else:
-                    value = Lazy(self.providers[arg_name])
-                new_kwargs[arg_name] = value
-            return klass(*args, **new_kwargs)
+                    arg_getters.append((arg_name, getter))
 
-    factory_resolver_specs = {}
-    for (arg_name, resolver_spec) in args_resolver_specs.items():
-        spec = ResolverSpec(resolver_spec.binding_key, ProviderType.PROVIDER)
-        factory_resolver_specs[arg_name] = spec
+            if len(arg_getters) == 0:
+                return [klass(*args, **shared_kwargs) for args in args_iterable]
+            instances = []
+            for args in args_iterable:
+                kwargs = {arg_name: getter() for (arg_name, getter) in arg_getters}
+                instances.append(klass(*args, **kwargs, **shared_kwargs))
+            return instances
 
     def _create_jyuusu_resolver() -> Resolver:
-        return ConstructorResolver(_JyuusuFactory, factory_resolver_specs)
+        return ConstructorResolver(_JyuusuFactory, get_factory_resolver_specs(get_args_resolver_specs()))
 
+    # Name the factory after the attribute that holds it, so that it can be pickled by reference.
+    _JyuusuFactory.__module__ = klass.__module__
+    _JyuusuFactory.__qualname__ = f"{klass.__qualname__}._JyuusuFactory"
     _JyuusuFactory._create_jyuusu_resolver = staticmethod(_create_jyuusu_resolver)
     _JyuusuFactory._JyuusuModule = create_jyuusu_class_installation_module(_JyuusuFactory)
     klass._JyuusuFactory = _JyuusuFactory
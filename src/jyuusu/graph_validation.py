@@ -0,0 +1,113 @@
+import typing
+from collections import OrderedDict
+from threading import Lock
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver, raise_circular_dependency_error, create_just_in_time_resolver
+
+
+def raise_missing_binding_error(binding_key_stack: typing.Iterable[BindingKey], key: BindingKey):
+    chain = []
+    for key_ in binding_key_stack:
+        chain.append("  " + str(key_))
+    chain.append("  " + str(key))
+    chain_string = "\n".join(chain)
+    raise AssertionError(f"Resolver for key {key} is not found.\n{chain_string}")
+
+
+class GraphValidator:
+    """
+    Checks the dependency graph of an injector for circular dependencies and missing bindings.
+
+    Keys that are not bound but can be bound just in time get their resolvers created during validation. These
+    resolvers are added to the injector only after the part of the graph that they belong to has been validated.
+    """
+
+    def __init__(self, injector: Injector):
+        self.injector = injector
+        self.lock = Lock()
+        self.validated_keys: typing.Set[BindingKey] = set()
+        self.has_opaque_resolvers = False
+
+    def validate_all(self):
+        with self.lock:
+            pending_bindings = {}
+            self.validate_keys(list(self.injector.bindings.keys()), pending_bindings)
+            self.injector.add_bindings(pending_bindings)
+
+    def bind_just_in_time(self, key: BindingKey) -> Resolver:
+        with self.lock:
+            resolver = self.injector.bindings.get(key)
+            if resolver is not None:
+                return resolver
+            pending_bindings = {}
+            self.validate_keys([key], pending_bindings)
+            self.injector.add_bindings(pending_bindings)
+            if self.has_opaque_resolvers and not self.injector.check_cycles:
+                self.injector.check_cycles = True
+                # Getters created while the graph was acyclic resolve without the binding key stack.
+                self.injector.reset_instance_getters()
+            return self.injector.bindings[key]
+
+    def validate_keys(self, keys: typing.List[BindingKey], pending_bindings: typing.Dict[BindingKey, Resolver]):
+        # Keys reached through a Provider or a Lazy are resolved with a fresh stack, so they are validated as new
+        # roots instead of as part of the current chain.
+        deferred_keys = list(keys)
+        validated_keys = set()
+        while len(deferred_keys) > 0:
+            key = deferred_keys.pop()
+            self.validate_key(key, OrderedDict(), pending_bindings, validated_keys, deferred_keys)
+        self.validated_keys.update(validated_keys)
+
+    def validate_key(self,
+                     key: BindingKey,
+                     binding_key_stack: typing.OrderedDict[BindingKey, typing.Any],
+                     pending_bindings: typing.Dict[BindingKey, Resolver],
+                     validated_keys: typing.Set[BindingKey],
+                     deferred_keys: typing.List[BindingKey]):
+        if key in self.validated_keys or key in validated_keys:
+            return
+        if key in binding_key_stack:
+            raise_circular_dependency_error(binding_key_stack, key)
+
+        owner = self.injector.get_binding_owner(key)
+        if owner is not self.injector:
+            # The key belongs to a parent injector, whose bindings cannot depend on this injector's bindings.
+            try:
+                owner.get_resolver(key)
+            except AssertionError:
+                raise_missing_binding_error(binding_key_stack, key)
+            validated_keys.add(key)
+            return
+
+        resolver = self.get_resolver(key, binding_key_stack, pending_bindings)
+        dependencies = resolver.get_dependencies()
+        if dependencies is None:
+            self.has_opaque_resolvers = True
+            dependencies = []
+
+        binding_key_stack[key] = None
+        for dependency in dependencies:
+            if dependency.deferred:
+                deferred_keys.append(dependency.binding_key)
+            else:
+                self.validate_key(
+                    dependency.binding_key, binding_key_stack, pending_bindings, validated_keys, deferred_keys)
+        del binding_key_stack[key]
+        validated_keys.add(key)
+
+    def get_resolver(self,
+                     key: BindingKey,
+                     binding_key_stack: typing.OrderedDict[BindingKey, typing.Any],
+                     pending_bindings: typing.Dict[BindingKey, Resolver]) -> Resolver:
+        resolver = self.injector.bindings.get(key)
+        if resolver is not None:
+            return resolver
+        resolver = pending_bindings.get(key)
+        if resolver is not None:
+            return resolver
+        resolver = create_just_in_time_resolver(key)
+        if resolver is None:
+            raise_missing_binding_error(binding_key_stack, key)
+        pending_bindings[key] = resolver
+        return resolver
@@ -1,11 +1,32 @@
+import time
 import typing
 from abc import ABC, abstractmethod
 from collections import OrderedDict
+from dataclasses import dataclass
 from threading import Lock
 
 from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey
 from jyuusu.provider import Provider
 
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.batch import BatchKey
+    from jyuusu.compiler import ResolutionCompiler
+    from jyuusu.graph_validation import GraphValidator
+    from jyuusu.memory_accounting import MemoryAccountant
+    from jyuusu.metrics import ResolutionMetrics
+    from jyuusu.profiling import ResolutionProfiler
+    from jyuusu.tracing import SamplingTracer
+    from jyuusu.warm_up import WarmUpReport
+
+
+@dataclass(frozen=True)
+class Dependency:
+    binding_key: BindingKey
+    # True if the dependency is obtained later through a Provider or a Lazy, in which case it cannot take part in a
+    # circular dependency.
+    deferred: bool = False
+
 
 class Resolver(ABC):
     @abstractmethod
@@ -14,41 +35,440 @@ class Resolver(ABC):
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
         pass
 
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        """
+        Resolve the value inside an AsyncInjector. The default implementation resolves synchronously. Subclasses
+        override it to await their dependencies and asynchronous constructors.
+        """
+        return self.resolve(injector, binding_key_stack)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        """
+        Turn this resolver into a zero-argument function that produces the same value as resolve().
+
+        The default implementation falls back to the interpretive resolve(). Subclasses override it to link their
+        dependencies ahead of time through compiler.compile_key().
+        """
+        injector = compiler.injector
+
+        def resolve():
+            return self.resolve(injector, OrderedDict())
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        """
+        Return the binding keys this resolver resolves through the injector, or None if they are not known.
+        """
+        return None
+
+
+class WrappingResolver(Resolver):
+    """
+    A resolver that adds behavior around another resolver, such as instrumentation. By default, it forwards
+    everything to the wrapped resolver.
+    """
+
+    def __init__(self, base_resolver: Resolver):
+        self.base_resolver = base_resolver
+
+    def resolve(self,
+                injector: 'Injector',
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return self.base_resolver.resolve(injector, binding_key_stack)
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return await self.base_resolver.resolve_async(injector, binding_key_stack)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        """
+        Compile the wrapped resolver. Subclasses that add behavior wrap the plan of the wrapped resolver in it, so
+        that instrumenting an injector does not undo compile().
+        """
+        return self.base_resolver.compile(compiler)
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return self.base_resolver.get_dependencies()
+
+
+def unwrap_resolver(resolver: Resolver) -> Resolver:
+    while isinstance(resolver, WrappingResolver):
+        resolver = resolver.base_resolver
+    return resolver
+
+
+def raise_circular_dependency_error(binding_key_stack: typing.Iterable[BindingKey], key: BindingKey):
+    stack_trace = []
+    for key_ in binding_key_stack:
+        stack_trace.append("  " + str(key_))
+    stack_trace.append("  " + str(key))
+    stack_trace_string = "\n".join(stack_trace)
+    raise RuntimeError(f"Circular dependency discovered!!!\n{stack_trace_string}")
+
+
+def create_just_in_time_resolver(key: BindingKey) -> typing.Optional[Resolver]:
+    from jyuusu.constructor_resolver import is_class_injectable
+
+    if isinstance(key, SimpleTypeBindingKey) and key.tag is None and is_class_injectable(key.type_):
+        return key.type_._create_jyuusu_resolver()
+    else:
+        return None
+
 
 class Injector:
-    def __init__(self, bindings: typing.Dict[BindingKey, Resolver]):
-        self.bindings = bindings
+    def __init__(self, bindings: typing.Dict[BindingKey, Resolver], parent: typing.Optional['Injector'] = None):
+        # A copy-on-write snapshot. Just-in-time bindings replace the whole table under self.lock.
+        self.bindings: typing.Dict[BindingKey, Resolver] = dict(bindings)
+        # Keys that are not bound in this injector are resolved by the parent, with the parent as the injector, so
+        # the parent's bindings and singletons are shared and never see this injector's bindings.
+        self.parent = parent
         self.lock = Lock()
+        self.compiled_plans: typing.Optional[typing.Dict[BindingKey, typing.Callable[[], typing.Any]]] = None
+        # Maps (type_, tag) to a function that produces an instance, so repeated get_instance() calls skip key
+        # construction and validation. Equal generic aliases share one entry, so the table grows only with the
+        # number of distinct types requested.
+        self.instance_getters: typing.Dict[typing.Tuple[type, typing.Optional[str]], typing.Callable] = {}
+        # Maps (id(type_), tag) to the type and its getter, so that a type object that was requested before is found
+        # without hashing it, which costs about as much as the rest of get_instance() for a nested generic alias. The
+        # entry holds the type, so the id cannot be reused while the entry exists. Only the first type object of each
+        # entry of instance_getters is added, so the table does not grow with equal aliases created on every call.
+        self.instance_getters_by_id: typing.Dict[typing.Tuple[int, typing.Optional[str]],
+                                                 typing.Tuple[type, typing.Callable]] = {}
+        # Set by validate(). Once the graph is proven acyclic, resolution skips the binding key stack bookkeeping.
+        self.graph_validator: typing.Optional['GraphValidator'] = None
+        self.check_cycles = True
+        # Applied, in order, to every binding of this injector, including the ones added just in time.
+        self.resolver_wrappers: typing.List[typing.Callable[[BindingKey, Resolver], Resolver]] = []
+        # Called with the key and the number of seconds spent waiting for self.lock when a binding is added just in
+        # time.
+        self.lock_wait_observer: typing.Optional[typing.Callable[[BindingKey, float], None]] = None
 
     def get_instance(self, type_: type, tag: typing.Optional[str] = None) -> typing.Any:
-        key = SimpleTypeBindingKey(type_, tag)
-        return self.get_instance_internal(key, OrderedDict())
+        entry = self.instance_getters_by_id.get((id(type_), tag))
+        if entry is not None and entry[0] is type_:
+            return entry[1]()
+        getter = self.instance_getters.get((type_, tag))
+        if getter is None:
+            getter = self.create_instance_getter(SimpleTypeBindingKey.of(type_, tag))
+            self.instance_getters[(type_, tag)] = getter
+            self.instance_getters_by_id[(id(type_), tag)] = (type_, getter)
+        return getter()
+
+    def reset_instance_getters(self):
+        """
+        Drop the instance getters, e.g. after the resolvers or the way they are run change, so that they are created
+        again.
+        """
+        self.instance_getters = {}
+        self.instance_getters_by_id = {}
+
+    def create_instance_getter(self, key: BindingKey) -> typing.Callable[[], typing.Any]:
+        owner = self.get_binding_owner(key)
+        if owner is not self:
+            return owner.create_instance_getter(key)
+
+        if self.compiled_plans is not None:
+            return self.get_compiled_plan(key)
+
+        resolver = self.get_resolver(key)
+
+        if not self.check_cycles:
+            def get():
+                return resolver.resolve(self, OrderedDict())
+        else:
+            def get():
+                return resolver.resolve(self, OrderedDict(((key, None),)))
+
+        return get
+
+    def get_instances(self,
+                      keys: typing.Sequence['BatchKey'],
+                      share_dependencies: bool = False) -> typing.List[typing.Any]:
+        """
+        Resolve the keys, each a type, a (type, tag) pair or a binding key, and return their instances in the same
+        order. With share_dependencies=True, every binding is built at most once in the call, so an unscoped
+        dependency reached from several keys, or through several paths, is shared by all of them. Every key is
+        attempted. If some fail, a BatchResolutionError with the error of each failed key is raised.
+        """
+        from jyuusu.batch import get_instances
+
+        return get_instances(self, keys, share_dependencies)
+
+    def create_child(self, *modules) -> 'Injector':
+        """
+        Create an injector that has the bindings configured by the given modules on top of the bindings of this
+        injector. The child links to this injector instead of copying its bindings, so creating it costs time
+        proportional to the new bindings only. The child resolves its own keys first. A class that is bound just in
+        time through the child is bound in the highest injector that can satisfy its dependencies, so it is shared
+        with this injector unless it depends on the child's bindings.
+        """
+        from jyuusu.injectors import configure_bindings
+
+        return type(self)(configure_bindings(*modules), parent=self)
+
+    def wrap_resolvers(self, wrapper: typing.Callable[[BindingKey, Resolver], Resolver]):
+        """
+        Replace every binding's resolver with wrapper(key, resolver), now and for bindings added just in time later.
+        Instance getters, compiled plans and the values kept by dict bindings are rebuilt so that they go through the
+        wrapped resolvers.
+        """
+        from jyuusu.resolvers import DictResolver
+
+        with self.lock:
+            self.resolver_wrappers.append(wrapper)
+            self.bindings = {key: wrapper(key, resolver) for (key, resolver) in self.bindings.items()}
+            self.reset_instance_getters()
+            if self.compiled_plans is not None:
+                self.compiled_plans = {}
+            for resolver in self.bindings.values():
+                dict_resolver = unwrap_resolver(resolver)
+                if isinstance(dict_resolver, DictResolver):
+                    dict_resolver.static_values = None
+
+    def apply_resolver_wrappers(self, key: BindingKey, resolver: Resolver) -> Resolver:
+        for wrapper in self.resolver_wrappers:
+            resolver = wrapper(key, resolver)
+        return resolver
+
+    def get_binding_owner(self, key: BindingKey) -> 'Injector':
+        """
+        Return the injector that resolves the key: the nearest injector in the parent chain that binds it. A key that
+        no injector in the chain binds is owned by the injector where it is bound just in time: the highest one
+        whose view of the bindings includes every dependency of the key, bound or bound just in time, like in Guice.
+        A key that cannot be bound just in time is owned by the root injector.
+        """
+        injector = self
+        while key not in injector.bindings:
+            if injector.parent is None:
+                if injector is self:
+                    return self
+                chain = self.get_injector_chain()
+                return chain[self.get_just_in_time_binding_depth(key, chain, {})]
+            injector = injector.parent
+        return injector
+
+    def get_injector_chain(self) -> typing.List['Injector']:
+        chain = []
+        injector = self
+        while injector is not None:
+            chain.append(injector)
+            injector = injector.parent
+        return chain
+
+    def get_just_in_time_binding_depth(self,
+                                       key: BindingKey,
+                                       chain: typing.List['Injector'],
+                                       depths: typing.Dict[BindingKey, int]) -> int:
+        """
+        Return the index in the chain, from this injector to the root, of the injector where the unbound key would be
+        bound just in time. Depths already computed for other keys are kept in depths.
+        """
+        root_depth = len(chain) - 1
+        resolver = create_just_in_time_resolver(key)
+        if resolver is None:
+            return root_depth
+        dependencies = resolver.get_dependencies()
+        if dependencies is None:
+            # Nothing is known about the dependencies, so only this injector is sure to satisfy them.
+            return 0
+        # A key that depends on itself is reported when it is resolved. Until then, it does not constrain itself.
+        depths[key] = root_depth
+        depth = root_depth
+        for dependency in dependencies:
+            dependency_key = dependency.binding_key
+            dependency_depth = depths.get(dependency_key)
+            if dependency_depth is None:
+                dependency_depth = next(
+                    (index for (index, injector) in enumerate(chain) if dependency_key in injector.bindings), None)
+                if dependency_depth is None:
+                    dependency_depth = self.get_just_in_time_binding_depth(dependency_key, chain, depths)
+                depths[dependency_key] = dependency_depth
+            depth = min(depth, dependency_depth)
+            if depth == 0:
+                break
+        depths[key] = depth
+        return depth
+
+    def validate(self) -> 'Injector':
+        """
+        Check the whole graph for circular dependencies and missing bindings, including the entries of dict
+        bindings. If every resolver in the graph reports its dependencies, resolution afterwards runs without the
+        per-call circular dependency bookkeeping. Bindings added just in time are validated before they are used.
+        """
+        from jyuusu.graph_validation import GraphValidator
+
+        validator = GraphValidator(self)
+        validator.validate_all()
+        self.graph_validator = validator
+        self.check_cycles = validator.has_opaque_resolvers
+        self.reset_instance_getters()
+        return self
+
+    def compile(self) -> 'Injector':
+        """
+        Compile every binding into a closure with its dependencies already linked. After this call, get_instance()
+        runs the compiled plans instead of walking the graph through Resolver.resolve().
+        """
+        from jyuusu.compiler import ResolutionCompiler
+
+        compiler = ResolutionCompiler(self)
+        for key in list(self.bindings.keys()):
+            compiler.compile_key(key)
+        self.compiled_plans = compiler.plans
+        self.reset_instance_getters()
+        return self
+
+    def enable_metrics(self, metrics: typing.Optional['ResolutionMetrics'] = None) -> 'ResolutionMetrics':
+        """
+        Record per-binding resolution metrics from now on and return the object that collects them. Injectors that
+        never call this method pay nothing for the instrumentation.
+        """
+        from jyuusu.metrics import ResolutionMetrics, instrument_injector
+
+        if metrics is None:
+            metrics = ResolutionMetrics()
+        instrument_injector(self, metrics)
+        return metrics
+
+    def enable_profiling(self, profiler: typing.Optional['ResolutionProfiler'] = None) -> 'ResolutionProfiler':
+        """
+        Record the inclusive and exclusive time of every resolution from now on. The returned profiler reports the
+        critical path and the bindings with the most self time.
+        """
+        from jyuusu.profiling import ResolutionProfiler, profile_injector
+
+        if profiler is None:
+            profiler = ResolutionProfiler()
+        profile_injector(self, profiler)
+        return profiler
+
+    def enable_tracing(self, tracer: typing.Optional['SamplingTracer'] = None) -> 'SamplingTracer':
+        """
+        Sample resolutions into the ring buffer of the given tracer, or of a new one with the default sampling rate
+        and capacity, from now on.
+        """
+        from jyuusu.tracing import SamplingTracer, trace_injector
+
+        if tracer is None:
+            tracer = SamplingTracer()
+        trace_injector(self, tracer)
+        return tracer
+
+    def enable_memory_accounting(self, accountant: typing.Optional['MemoryAccountant'] = None) -> 'MemoryAccountant':
+        """
+        Measure the memory allocated by and retained by each memoized binding constructed from now on. Starts
+        tracemalloc if it is not running.
+        """
+        from jyuusu.memory_accounting import MemoryAccountant, account_memory
+
+        if accountant is None:
+            accountant = MemoryAccountant()
+        account_memory(self, accountant)
+        return accountant
+
+    def warm_up(self, max_workers: typing.Optional[int] = None) -> 'WarmUpReport':
+        """
+        Build all memoized bindings now instead of on first request. Memoized bindings that do not depend on each
+        other are built concurrently on a thread pool with at most max_workers threads. Failures are reported, not
+        raised.
+        """
+        from jyuusu.warm_up import warm_up
+
+        return warm_up(self, max_workers)
+
+    def prepare_for_fork(self, max_workers: typing.Optional[int] = None, freeze_gc: bool = False) -> 'WarmUpReport':
+        """
+        Warm up the injector before forking worker processes that share it and make its locks safe to use in the
+        children. With freeze_gc=True, also moves every object in the process to the garbage collector's permanent
+        generation with gc.freeze(), which gc.unfreeze() undoes. See jyuusu.prefork.prepare_for_fork().
+        """
+        from jyuusu.prefork import prepare_for_fork
+
+        return prepare_for_fork(self, max_workers, freeze_gc)
+
+    def get_compiled_plan(self, key: BindingKey) -> typing.Callable[[], typing.Any]:
+        plan = self.compiled_plans.get(key)
+        if plan is not None:
+            return plan
+
+        # The key was bound just in time after compile() ran. Compile it against a copy of the plan table and
+        # publish the copy. Racing threads produce equivalent plans, so losing one of the copies is harmless.
+        from jyuusu.compiler import ResolutionCompiler
+
+        compiler = ResolutionCompiler(self, dict(self.compiled_plans))
+        plan = compiler.compile_key(key)
+        self.compiled_plans = compiler.plans
+        return plan
+
+    def get_owning_injector(self) -> 'Injector':
+        """
+        Return the injector that providers created while resolving through this object should be bound to: the
+        injector itself. Views that stand in for an injector return the injector.
+        """
+        return self
 
     def get_provider(self, type_: type, tag: typing.Optional[str] = None) -> Provider:
-        return ProviderUsingInjector(self, SimpleTypeBindingKey(type_, tag))
+        return ProviderUsingInjector(self, SimpleTypeBindingKey.of(type_, tag))
 
     def get_resolver(self, key: BindingKey):
-        from jyuusu.constructor_resolver import is_class_injectable
+        # The binding table is never mutated in place, so a bound key can be looked up without taking the lock.
+        resolver = self.bindings.get(key)
+        if resolver is not None:
+            return resolver
 
-        with self.lock:
-            if not key in self.bindings:
-                if isinstance(key, SimpleTypeBindingKey) and key.tag is None and is_class_injectable(key.type_):
-                    self.bindings[key] = key.type_._create_jyuusu_resolver()
-                else:
+        if self.parent is not None:
+            owner = self.get_binding_owner(key)
+            if owner is not self:
+                return owner.get_resolver(key)
+
+        if self.graph_validator is not None:
+            return self.graph_validator.bind_just_in_time(key)
+
+        if self.lock_wait_observer is not None:
+            start = time.perf_counter()
+            self.lock.acquire()
+            self.lock_wait_observer(key, time.perf_counter() - start)
+        else:
+            self.lock.acquire()
+        try:
+            bindings = self.bindings
+            if not key in bindings:
+                resolver = create_just_in_time_resolver(key)
+                if resolver is None:
                     raise AssertionError(f"Resolver for key {key} is not found.")
-            resolver = self.bindings[key]
+                bindings = dict(bindings)
+                bindings[key] = self.apply_resolver_wrappers(key, resolver)
+                self.bindings = bindings
+            resolver = bindings[key]
             return resolver
+        finally:
+            self.lock.release()
+
+    def add_bindings(self, bindings: typing.Dict[BindingKey, Resolver]):
+        with self.lock:
+            new_bindings = dict(self.bindings)
+            for (key, resolver) in bindings.items():
+                assert key not in new_bindings
+                new_bindings[key] = self.apply_resolver_wrappers(key, resolver)
+            self.bindings = new_bindings
 
     def get_instance_internal(self,
                               key: BindingKey,
                               binding_key_stack: OrderedDict) -> typing.Any:
+        if self.parent is not None and key not in self.bindings:
+            owner = self.get_binding_owner(key)
+            if owner is not self:
+                return owner.get_instance_internal(key, binding_key_stack)
+
+        if not self.check_cycles:
+            return self.get_resolver(key).resolve(self, binding_key_stack)
+
         if key in binding_key_stack:
-            stack_trace = []
-            for key_ in binding_key_stack:
-                stack_trace.append("  " + str(key_))
-            stack_trace.append("  " + str(key))
-            stack_trace_string = "\n".join(stack_trace)
-            raise RuntimeError(f"Circular dependency discovered!!!\n{stack_trace_string}")
+            raise_circular_dependency_error(binding_key_stack, key)
 
         binding_key_stack[key] = None
         resolver = self.get_resolver(key)
@@ -58,9 +478,19 @@ class Injector:
 
 
 class ProviderUsingInjector(Provider):
-    def __init__(self, injector: Injector, binding_key: SimpleTypeBindingKey):
+    def __init__(self, injector: Injector, binding_key: BindingKey):
         self.binding_key = binding_key
         self.injector = injector
+        # The instance getter of the key and the getter table of the injector when it was created. The injector
+        # replaces its table whenever getters may change, e.g. in compile() or wrap_resolvers(), so a getter is
+        # reused, without any lookup, for as long as the table is the same.
+        self.cached_getter: typing.Optional[typing.Tuple[typing.Dict, typing.Callable[[], typing.Any]]] = None
 
     def get(self):
-        return self.injector.get_instance(self.binding_key.type_, self.binding_key.tag)
+        injector = self.injector
+        cached_getter = self.cached_getter
+        if cached_getter is None or cached_getter[0] is not injector.instance_getters:
+            instance_getters = injector.instance_getters
+            cached_getter = (instance_getters, injector.create_instance_getter(self.binding_key))
+            self.cached_getter = cached_getter
+        return cached_getter[1]()
@@ -1,9 +1,29 @@
+from jyuusu.async_injector import AsyncInjector
 from jyuusu.binder import Binder
+from jyuusu.blueprint import InjectorBlueprint
 from jyuusu.injector import Injector
 
 
-def create_injector(*args):
+def configure_bindings(*args):
     binder = Binder()
     for module in args:
         binder.install_module(module)
-    return Injector(binder.bindings)
+    return binder.bindings
+
+
+def create_injector(*args, validate: bool = False):
+    injector = Injector(configure_bindings(*args))
+    if validate:
+        injector.validate()
+    return injector
+
+
+def create_async_injector(*args, validate: bool = False):
+    injector = AsyncInjector(configure_bindings(*args))
+    if validate:
+        injector.validate()
+    return injector
+
+
+def create_blueprint(*args) -> InjectorBlueprint:
+    return InjectorBlueprint(configure_bindings(*args))
@@ -0,0 +1,319 @@
+import collections
+import time
+import typing
+import weakref
+from abc import ABC, abstractmethod
+from threading import Lock, get_ident
+
+from jyuusu import once_cell
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Resolver, Injector, Dependency
+from jyuusu.once_cell import UNSET, ReentrantInitializationError
+from jyuusu.resolvers import construct_synchronously
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
+
+
+class MemoizationPolicy(ABC):
+    """
+    Decides how long the instances of memoized bindings are kept before they are evicted and, on the next request,
+    built again. One policy can serve several bindings of one injector, keyed by their resolvers. A policy keeps the
+    resolvers of its bindings alive, so it should not be shared by injectors with different lifetimes. Policies count
+    the constructions and evictions of their bindings, to help trade memory against rebuild cost.
+
+    Policies never drop instances while holding their lock, because dropping the last reference to an instance can
+    run arbitrary code, e.g. a __del__ method that resolves another binding of the same policy. Like the lock of a
+    OnceCell, the lock of a policy created before a fork is replaced in the child before it is next taken, since
+    another thread of the parent may have held it.
+    """
+
+    def __init__(self):
+        self.current_lock = Lock()
+        self.fork_generation = once_cell.fork_generation
+        self.construction_count = 0
+        self.eviction_count = 0
+
+    @property
+    def lock(self) -> Lock:
+        if self.fork_generation != once_cell.fork_generation:
+            with once_cell.fork_reset_lock:
+                if self.fork_generation != once_cell.fork_generation:
+                    self.current_lock = Lock()
+                    self.fork_generation = once_cell.fork_generation
+        return self.current_lock
+
+    @abstractmethod
+    def get(self, owner: Resolver) -> typing.Any:
+        """
+        Return the kept instance of the binding of the resolver, or UNSET.
+        """
+        pass
+
+    @abstractmethod
+    def put(self, owner: Resolver, value: typing.Any):
+        pass
+
+    @abstractmethod
+    def get_size(self) -> int:
+        """
+        Return the number of instances kept now.
+        """
+        pass
+
+    def snapshot(self) -> typing.Dict[str, int]:
+        with self.lock:
+            return {
+                "construction_count": self.construction_count,
+                "eviction_count": self.eviction_count,
+                "size": self.get_size(),
+            }
+
+
+class KeepWhileReferenced(MemoizationPolicy):
+    """
+    Keeps only a weak reference to each instance, so that an instance is built again once nothing else holds it. The
+    instances must support weak references.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.references: typing.Dict[Resolver, weakref.ref] = {}
+        # The references whose instances have been collected, with their resolvers. A collection can happen in any
+        # thread at any allocation, including one made while this policy's lock is held, so the weak reference
+        # callbacks only append here, which takes no lock. The entries are removed the next time the lock is taken.
+        self.collected_references: typing.Deque[typing.Tuple[Resolver, weakref.ref]] = collections.deque()
+
+    def __reduce__(self):
+        return KeepWhileReferenced, ()
+
+    def get(self, owner: Resolver) -> typing.Any:
+        if len(self.collected_references) > 0:
+            with self.lock:
+                self.remove_collected_references_locked()
+        reference = self.references.get(owner)
+        if reference is None:
+            return UNSET
+        value = reference()
+        if value is None:
+            return UNSET
+        return value
+
+    def put(self, owner: Resolver, value: typing.Any):
+        collected_references = self.collected_references
+
+        def on_collected(collected_reference: weakref.ref):
+            collected_references.append((owner, collected_reference))
+
+        try:
+            reference = weakref.ref(value, on_collected)
+        except TypeError as e:
+            raise TypeError(f"An instance of {type(value).__name__} cannot be memoized with KeepWhileReferenced "
+                            f"because it does not support weak references.") from e
+        with self.lock:
+            self.remove_collected_references_locked()
+            self.construction_count += 1
+            self.references[owner] = reference
+
+    def remove_collected_references_locked(self):
+        while len(self.collected_references) > 0:
+            (owner, reference) = self.collected_references.popleft()
+            self.eviction_count += 1
+            if self.references.get(owner) is reference:
+                del self.references[owner]
+
+    def snapshot(self) -> typing.Dict[str, int]:
+        with self.lock:
+            self.remove_collected_references_locked()
+        return super().snapshot()
+
+    def get_size(self) -> int:
+        # Instances collected since the collected references were last removed are still counted.
+        return len(self.references)
+
+
+class KeepMostRecentlyUsed(MemoizationPolicy):
+    """
+    Keeps the instances of at most capacity bindings that share this policy, e.g. a group of tagged bindings of one
+    type. Building the instance of another binding evicts the least recently used one.
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        assert capacity >= 1
+        self.capacity = capacity
+        self.values: typing.OrderedDict[Resolver, typing.Any] = collections.OrderedDict()
+
+    def __reduce__(self):
+        return KeepMostRecentlyUsed, (self.capacity,)
+
+    def get(self, owner: Resolver) -> typing.Any:
+        with self.lock:
+            value = self.values.get(owner, UNSET)
+            if value is not UNSET:
+                self.values.move_to_end(owner)
+            return value
+
+    def put(self, owner: Resolver, value: typing.Any):
+        # An instance that a racing thread stored for the same binding is replaced, and dropped with the evicted ones.
+        evicted_items = []
+        with self.lock:
+            self.construction_count += 1
+            evicted_items.append(self.values.get(owner))
+            self.values[owner] = value
+            self.values.move_to_end(owner)
+            while len(self.values) > self.capacity:
+                evicted_items.append(self.values.popitem(last=False))
+                self.eviction_count += 1
+        # The evicted instances are dropped on return, outside of the lock.
+
+    def get_size(self) -> int:
+        return len(self.values)
+
+
+class EvictWhenIdle(MemoizationPolicy):
+    """
+    Evicts an instance that has not been requested for more than idle_seconds. Expired instances are dropped when
+    they are next requested, whenever another instance is built, and when evict_expired() is called.
+    """
+
+    def __init__(self, idle_seconds: float, clock: typing.Callable[[], float] = time.monotonic):
+        super().__init__()
+        assert idle_seconds > 0
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        # Maps a resolver to its instance and the time of the last request.
+        self.entries: typing.Dict[Resolver, typing.List[typing.Any]] = {}
+
+    def __reduce__(self):
+        return EvictWhenIdle, (self.idle_seconds, self.clock)
+
+    def get(self, owner: Resolver) -> typing.Any:
+        entry = self.entries.get(owner)
+        if entry is None:
+            return UNSET
+        now = self.clock()
+        if now - entry[1] > self.idle_seconds:
+            with self.lock:
+                if self.entries.get(owner) is entry:
+                    del self.entries[owner]
+                    self.eviction_count += 1
+            # The local reference to the entry drops the instance here, outside of the lock.
+            return UNSET
+        entry[1] = now
+        return entry[0]
+
+    def put(self, owner: Resolver, value: typing.Any):
+        now = self.clock()
+        with self.lock:
+            self.construction_count += 1
+            replaced_entry = self.entries.get(owner)
+            self.entries[owner] = [value, now]
+            expired_entries = self.evict_expired_locked(now)
+        # The replaced and expired instances are dropped on return, outside of the lock.
+
+    def evict_expired(self):
+        with self.lock:
+            expired_entries = self.evict_expired_locked(self.clock())
+        # The expired instances are dropped on return, outside of the lock.
+
+    def evict_expired_locked(self, now: float) -> typing.List[typing.List[typing.Any]]:
+        """
+        Remove the expired entries and return them, so that the caller drops their instances after releasing the
+        lock.
+        """
+        expired_owners = [owner for (owner, entry) in self.entries.items() if now - entry[1] > self.idle_seconds]
+        expired_entries = [self.entries.pop(owner) for owner in expired_owners]
+        self.eviction_count += len(expired_owners)
+        return expired_entries
+
+    def get_size(self) -> int:
+        return len(self.entries)
+
+
+class EvictingMemoizedResolver(Resolver):
+    """
+    Memoizes the instance of its base resolver for as long as its policy keeps it. Only one thread builds the
+    instance at a time. Like a OnceCell, a resolver created before a fork replaces its lock in the child before it
+    next takes it.
+    """
+
+    def __init__(self, base_resolver: Resolver, policy: MemoizationPolicy):
+        self.base_resolver = base_resolver
+        self.policy = policy
+        self.lock = Lock()
+        self.fork_generation = once_cell.fork_generation
+        self.initializing_thread: typing.Optional[int] = None
+
+    def __reduce__(self):
+        return EvictingMemoizedResolver, (self.base_resolver, self.policy)
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        value = self.policy.get(self)
+        if value is not UNSET:
+            return value
+        return self.construct(self.base_resolver.resolve, injector, binding_key_stack)
+
+    def construct(self, initializer: typing.Callable[..., typing.Any], *args) -> typing.Any:
+        if self.fork_generation != once_cell.fork_generation:
+            self.reset_after_fork()
+        if self.initializing_thread == get_ident():
+            raise ReentrantInitializationError(
+                "A value is being initialized, and its initializer tried to get the same value. "
+                "This usually means that a memoized binding depends on itself through a Provider or a Lazy.")
+        with self.lock:
+            value = self.policy.get(self)
+            if value is not UNSET:
+                return value
+            self.initializing_thread = get_ident()
+            try:
+                value = construct_synchronously(initializer, *args)
+            finally:
+                self.initializing_thread = None
+            self.policy.put(self, value)
+            return value
+
+    def reset_after_fork(self):
+        with once_cell.fork_reset_lock:
+            if self.fork_generation == once_cell.fork_generation:
+                return
+            # The thread that was building the instance does not exist in this process.
+            self.lock = Lock()
+            self.initializing_thread = None
+            self.fork_generation = once_cell.fork_generation
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        value = self.policy.get(self)
+        if value is not UNSET:
+            return value
+        # The lock cannot be held across an await, so concurrent coroutines may each build an instance. The first
+        # one that is stored wins.
+        value = await self.base_resolver.resolve_async(injector, binding_key_stack)
+        if self.fork_generation != once_cell.fork_generation:
+            self.reset_after_fork()
+        with self.lock:
+            kept_value = self.policy.get(self)
+            if kept_value is not UNSET:
+                return kept_value
+            self.policy.put(self, value)
+        return value
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+        get = self.policy.get
+
+        def resolve():
+            value = get(self)
+            if value is UNSET:
+                value = self.construct(base_plan)
+            return value
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return self.base_resolver.get_dependencies()
@@ -0,0 +1,182 @@
+import contextvars
+import gc
+import sys
+import tracemalloc
+import types
+import typing
+from dataclasses import dataclass
+from threading import Lock
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver, WrappingResolver, unwrap_resolver
+from jyuusu.once_cell import OnceCell
+from jyuusu.provider import Provider, AsyncProvider
+from jyuusu.resolvers import MemoizedResolver
+
+if typing.TYPE_CHECKING:
+    from jyuusu.compiler import ResolutionCompiler
+
+# Objects of these types are shared by the whole program, so they are never counted as retained by a singleton. The
+# injector's own objects are among them: a singleton that holds a provider would otherwise be charged for the whole
+# container.
+SHARED_OBJECT_TYPES = (
+    Injector,
+    Resolver,
+    Provider,
+    AsyncProvider,
+    OnceCell,
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+)
+
+
+@dataclass
+class MemoryEntry:
+    binding_key: BindingKey
+    # Net number of bytes allocated while the singleton was constructed, excluding the memoized singletons that were
+    # constructed along the way.
+    construction_bytes: int = 0
+    # Estimated size of the object graph reachable from the singleton, excluding shared objects and other singletons.
+    retained_bytes: int = 0
+
+
+def estimate_retained_size(value: typing.Any, excluded_ids: typing.Set[int]) -> int:
+    size = 0
+    visited = set(excluded_ids)
+    objects = [value]
+    while len(objects) > 0:
+        obj = objects.pop()
+        if id(obj) in visited or isinstance(obj, SHARED_OBJECT_TYPES):
+            continue
+        visited.add(id(obj))
+        size += sys.getsizeof(obj, 0)
+        objects.extend(gc.get_referents(obj))
+    return size
+
+
+class MemoryAccountant:
+    """
+    Measures, with tracemalloc, the memory allocated while each memoized binding is constructed, and estimates the
+    memory that each singleton retains. The allocation measurement counts every allocation made while the
+    constructor runs, so constructions that overlap with other work on other threads are overestimated.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.construction_bytes: typing.Dict[BindingKey, int] = {}
+        self.memoized_resolvers: typing.Dict[BindingKey, MemoizedResolver] = {}
+        self.current_construction: contextvars.ContextVar[typing.Optional[typing.List[int]]] = \
+            contextvars.ContextVar('jyuusu_memory_accountant_construction', default=None)
+        self.started_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+    def stop(self):
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def register(self, key: BindingKey, memoized_resolver: MemoizedResolver):
+        with self.lock:
+            self.memoized_resolvers[key] = memoized_resolver
+
+    def record_construction(self, key: BindingKey, num_bytes: int):
+        # Threads that waited for another thread to construct the singleton also get here. The first measurement
+        # is kept.
+        with self.lock:
+            self.construction_bytes.setdefault(key, num_bytes)
+
+    def report(self) -> typing.List[MemoryEntry]:
+        """
+        Return one entry per constructed singleton, sorted by retained size, largest first.
+        """
+        with self.lock:
+            construction_bytes = dict(self.construction_bytes)
+            memoized_resolvers = dict(self.memoized_resolvers)
+
+        values = {}
+        for (key, memoized_resolver) in memoized_resolvers.items():
+            if memoized_resolver.cell.is_initialized():
+                values[key] = memoized_resolver.cell.value
+        singleton_ids = {id(value) for value in values.values()}
+
+        entries = []
+        for (key, value) in values.items():
+            retained_bytes = estimate_retained_size(value, singleton_ids - {id(value)})
+            entries.append(MemoryEntry(key, construction_bytes.get(key, 0), retained_bytes))
+        entries.sort(key=lambda entry: entry.retained_bytes, reverse=True)
+        return entries
+
+    def report_text(self, limit: typing.Optional[int] = None) -> str:
+        entries = self.report()
+        if limit is not None:
+            entries = entries[:limit]
+        lines = ["Memory retained by memoized bindings:"]
+        for entry in entries:
+            lines.append(f"  {entry.binding_key}: retained ~{entry.retained_bytes} bytes, "
+                         f"allocated {entry.construction_bytes} bytes during construction")
+        return "\n".join(lines)
+
+
+class MemoryAccountingResolver(WrappingResolver):
+    def __init__(self, base_resolver: Resolver, binding_key: BindingKey, accountant: MemoryAccountant):
+        super().__init__(base_resolver)
+        self.binding_key = binding_key
+        self.accountant = accountant
+        self.memoized_resolver = unwrap_resolver(base_resolver)
+        assert isinstance(self.memoized_resolver, MemoizedResolver)
+        accountant.register(binding_key, self.memoized_resolver)
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return self.measure(self.base_resolver.resolve, injector, binding_key_stack)
+
+    def measure(self, resolve: typing.Callable[..., typing.Any], *args) -> typing.Any:
+        if self.memoized_resolver.cell.is_initialized():
+            return resolve(*args)
+
+        # The first element accumulates the bytes of the singletons constructed inside this construction.
+        nested_bytes = [0]
+        token = self.accountant.current_construction.set(nested_bytes)
+        (start_bytes, _) = tracemalloc.get_traced_memory()
+        try:
+            value = resolve(*args)
+        finally:
+            self.accountant.current_construction.reset(token)
+        (end_bytes, _) = tracemalloc.get_traced_memory()
+
+        total_bytes = end_bytes - start_bytes
+        self.accountant.record_construction(self.binding_key, total_bytes - nested_bytes[0])
+        enclosing_bytes = self.accountant.current_construction.get()
+        if enclosing_bytes is not None:
+            enclosing_bytes[0] += total_bytes
+        return value
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+
+        def resolve():
+            return self.measure(base_plan)
+
+        return resolve
+
+
+def account_memory(injector: Injector, accountant: MemoryAccountant):
+    accountant.start()
+
+    def wrap(key: BindingKey, resolver: Resolver) -> Resolver:
+        if isinstance(unwrap_resolver(resolver), MemoizedResolver):
+            return MemoryAccountingResolver(resolver, key, accountant)
+        else:
+            return resolver
+
+    injector.wrap_resolvers(wrap)
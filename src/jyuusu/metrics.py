@@ -0,0 +1,159 @@
+import bisect
+import time
+import typing
+from threading import Lock
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver, WrappingResolver, unwrap_resolver
+from jyuusu.resolvers import MemoizedResolver
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
+
+# Upper bounds, in seconds, of the buckets of construction time histograms: 1us, 2us, 4us, ..., about 8.6 minutes.
+DEFAULT_HISTOGRAM_BUCKETS = [1e-6 * 2 ** i for i in range(30)]
+
+
+class Histogram:
+    def __init__(self, bucket_upper_bounds: typing.Optional[typing.List[float]] = None):
+        if bucket_upper_bounds is None:
+            bucket_upper_bounds = DEFAULT_HISTOGRAM_BUCKETS
+        self.bucket_upper_bounds = bucket_upper_bounds
+        # The last count is for the values larger than every upper bound.
+        self.counts = [0] * (len(bucket_upper_bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bucket_upper_bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "bucket_upper_bounds": list(self.bucket_upper_bounds),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class BindingMetrics:
+    def __init__(self, binding_key: BindingKey):
+        self.binding_key = binding_key
+        self.lock = Lock()
+        self.resolve_count = 0
+        self.memoization_hits = 0
+        self.memoization_misses = 0
+        self.construction_seconds = Histogram()
+        self.lock_wait_count = 0
+        self.lock_wait_seconds = 0.0
+
+    def record_memoization_hit(self):
+        with self.lock:
+            self.resolve_count += 1
+            self.memoization_hits += 1
+
+    def record_construction(self, seconds: float, memoized: bool):
+        with self.lock:
+            self.resolve_count += 1
+            if memoized:
+                self.memoization_misses += 1
+            self.construction_seconds.record(seconds)
+
+    def record_lock_wait(self, seconds: float):
+        with self.lock:
+            self.lock_wait_count += 1
+            self.lock_wait_seconds += seconds
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        with self.lock:
+            return {
+                "resolve_count": self.resolve_count,
+                "memoization_hits": self.memoization_hits,
+                "memoization_misses": self.memoization_misses,
+                "construction_seconds": self.construction_seconds.snapshot(),
+                "lock_wait_count": self.lock_wait_count,
+                "lock_wait_seconds": self.lock_wait_seconds,
+            }
+
+
+class ResolutionMetrics:
+    """
+    Collects BindingMetrics for every binding of the injectors it instruments.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.binding_metrics: typing.Dict[BindingKey, BindingMetrics] = {}
+
+    def get_binding_metrics(self, key: BindingKey) -> BindingMetrics:
+        binding_metrics = self.binding_metrics.get(key)
+        if binding_metrics is not None:
+            return binding_metrics
+        with self.lock:
+            return self.binding_metrics.setdefault(key, BindingMetrics(key))
+
+    def record_lock_wait(self, key: BindingKey, seconds: float):
+        self.get_binding_metrics(key).record_lock_wait(seconds)
+
+    def snapshot(self) -> typing.Dict[BindingKey, typing.Dict[str, typing.Any]]:
+        """
+        Return the metrics of every binding as plain dictionaries and lists, keyed by binding key. Distinct keys can
+        have the same string form, e.g. those of local classes with the same name, so exporters that need string
+        keys must tell them apart.
+        """
+        with self.lock:
+            binding_metrics = list(self.binding_metrics.values())
+        return {metrics.binding_key: metrics.snapshot() for metrics in binding_metrics}
+
+
+class MetricsResolver(WrappingResolver):
+    def __init__(self, base_resolver: Resolver, binding_metrics: BindingMetrics):
+        super().__init__(base_resolver)
+        self.binding_metrics = binding_metrics
+        memoized_resolver = unwrap_resolver(base_resolver)
+        if isinstance(memoized_resolver, MemoizedResolver):
+            self.memoized_resolver = memoized_resolver
+            memoized_resolver.cell.lock_wait_observer = binding_metrics.record_lock_wait
+        else:
+            self.memoized_resolver = None
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return self.measure(self.base_resolver.resolve, injector, binding_key_stack)
+
+    def measure(self, resolve: typing.Callable[..., typing.Any], *args) -> typing.Any:
+        if self.memoized_resolver is not None and self.memoized_resolver.cell.is_initialized():
+            self.binding_metrics.record_memoization_hit()
+            return resolve(*args)
+        start = time.perf_counter()
+        value = resolve(*args)
+        self.binding_metrics.record_construction(time.perf_counter() - start, self.memoized_resolver is not None)
+        return value
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        if self.memoized_resolver is not None and self.memoized_resolver.cell.is_initialized():
+            self.binding_metrics.record_memoization_hit()
+            return await self.base_resolver.resolve_async(injector, binding_key_stack)
+        start = time.perf_counter()
+        value = await self.base_resolver.resolve_async(injector, binding_key_stack)
+        self.binding_metrics.record_construction(time.perf_counter() - start, self.memoized_resolver is not None)
+        return value
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+
+        def resolve():
+            return self.measure(base_plan)
+
+        return resolve
+
+
+def instrument_injector(injector: Injector, metrics: ResolutionMetrics):
+    injector.lock_wait_observer = metrics.record_lock_wait
+    injector.wrap_resolvers(lambda key, resolver: MetricsResolver(resolver, metrics.get_binding_metrics(key)))
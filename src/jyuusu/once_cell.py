@@ -0,0 +1,230 @@
+import asyncio
+import contextvars
+import math
+import os
+import time
+import typing
+from abc import ABC, abstractmethod
+from threading import Lock, get_ident
+
+T = typing.TypeVar('T')
+
+# Marks a cell whose value has not been computed yet, so that any value, including None, can be cached.
+UNSET = object()
+
+
+# The ids of the cells whose asynchronous initializers are running in the current chain of tasks. Tasks created
+# while an initializer runs, e.g. by asyncio.gather(), inherit it.
+initializing_cell_ids: contextvars.ContextVar[typing.FrozenSet[int]] = \
+    contextvars.ContextVar('initializing_cell_ids', default=frozenset())
+
+
+# Incremented in a child process right after a fork. Another thread of the parent may have held the lock of a cell
+# when the process forked, and that lock would stay held forever in the child. A cell created before the fork
+# therefore replaces its lock before it next takes it. Initialized cells are read without the lock and never notice.
+fork_generation = 0
+fork_reset_lock = Lock()
+
+
+def _after_fork_in_child():
+    global fork_generation, fork_reset_lock
+    fork_reset_lock = Lock()
+    fork_generation += 1
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class ReentrantInitializationError(RuntimeError):
+    pass
+
+
+class CachedInitializationError(RuntimeError):
+    pass
+
+
+class FailurePolicy(ABC):
+    """
+    Decides what a OnceCell does after its initializer raises.
+    """
+
+    @abstractmethod
+    def get_backoff_seconds(self, num_consecutive_failures: int) -> float:
+        """
+        Return how long the failure is reported again without running the initializer. A value of 0 means that the
+        next call retries immediately.
+        """
+        pass
+
+
+class RetryOnFailure(FailurePolicy):
+    def get_backoff_seconds(self, num_consecutive_failures: int) -> float:
+        return 0.0
+
+
+class CacheFailureWithBackoff(FailurePolicy):
+    def __init__(self,
+                 initial_backoff_seconds: float,
+                 max_backoff_seconds: float = math.inf,
+                 multiplier: float = 2.0):
+        assert initial_backoff_seconds > 0
+        assert max_backoff_seconds >= initial_backoff_seconds
+        assert multiplier >= 1.0
+        self.initial_backoff_seconds = initial_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.multiplier = multiplier
+
+    def get_backoff_seconds(self, num_consecutive_failures: int) -> float:
+        backoff = self.initial_backoff_seconds * self.multiplier ** (num_consecutive_failures - 1)
+        return min(backoff, self.max_backoff_seconds)
+
+
+class OnceCell(typing.Generic[T]):
+    """
+    A cell whose value is computed at most once.
+
+    Reads after the value has been computed take no lock. Only the threads that find the cell empty contend for the
+    lock, and only one of them runs the initializer. If the initializer raises, the lock is released and the failure
+    policy decides whether later calls retry or re-report the failure. An initializer that re-enters its own cell
+    gets a ReentrantInitializationError instead of deadlocking.
+    """
+
+    def __init__(self, failure_policy: typing.Optional[FailurePolicy] = None):
+        if failure_policy is None:
+            failure_policy = RetryOnFailure()
+        self.failure_policy = failure_policy
+        self.lock = Lock()
+        self.fork_generation = fork_generation
+        self.value: typing.Any = UNSET
+        self.initializing_thread: typing.Optional[int] = None
+        self.failure: typing.Optional[BaseException] = None
+        self.failure_expiry = 0.0
+        self.num_consecutive_failures = 0
+        self.pending_future: typing.Optional[asyncio.Future] = None
+        # Called with the number of seconds spent waiting for the lock. Only the initialization path takes the lock,
+        # so reads of an initialized cell never check it.
+        self.lock_wait_observer: typing.Optional[typing.Callable[[float], None]] = None
+
+    def is_initialized(self) -> bool:
+        return self.value is not UNSET
+
+    def get_or_init(self, initializer: typing.Callable[..., T], *args) -> T:
+        value = self.value
+        if value is not UNSET:
+            return value
+        return self.initialize(initializer, args)
+
+    def initialize(self, initializer: typing.Callable[..., T], args: typing.Tuple) -> T:
+        if self.fork_generation != fork_generation:
+            self.reset_after_fork()
+        if self.initializing_thread == get_ident():
+            raise ReentrantInitializationError(
+                "A value is being initialized, and its initializer tried to get the same value. "
+                "This usually means that a memoized binding depends on itself through a Provider or a Lazy.")
+        self.raise_if_failure_is_cached()
+        self.acquire_lock()
+        try:
+            if self.value is not UNSET:
+                return self.value
+            self.raise_if_failure_is_cached()
+            self.initializing_thread = get_ident()
+            try:
+                value = initializer(*args)
+            except Exception as e:
+                self.record_failure(e)
+                raise
+            finally:
+                self.initializing_thread = None
+            self.failure = None
+            self.num_consecutive_failures = 0
+            self.value = value
+            return value
+        finally:
+            self.lock.release()
+
+    def reset_after_fork(self):
+        with fork_reset_lock:
+            if self.fork_generation == fork_generation:
+                return
+            # The threads that were initializing the cell do not exist in this process.
+            self.lock = Lock()
+            self.initializing_thread = None
+            self.pending_future = None
+            self.fork_generation = fork_generation
+
+    def acquire_lock(self):
+        if self.lock_wait_observer is not None:
+            start = time.perf_counter()
+            self.lock.acquire()
+            self.lock_wait_observer(time.perf_counter() - start)
+        else:
+            self.lock.acquire()
+
+    async def get_or_init_async(self, initializer: typing.Callable[..., typing.Awaitable[T]], *args) -> T:
+        """
+        Like get_or_init(), but the initializer is a coroutine function. Coroutines that find the cell empty while
+        another coroutine is initializing it wait for that initialization instead of starting their own.
+        """
+        value = self.value
+        if value is not UNSET:
+            return value
+        if id(self) in initializing_cell_ids.get():
+            raise ReentrantInitializationError(
+                "A value is being initialized, and its initializer tried to get the same value. "
+                "This usually means that a memoized binding depends on itself through an AsyncProvider.")
+        if self.fork_generation != fork_generation:
+            self.reset_after_fork()
+        self.raise_if_failure_is_cached()
+        with self.lock:
+            if self.value is not UNSET:
+                return self.value
+            self.raise_if_failure_is_cached()
+            future = self.pending_future
+            # An initialization started by another event loop, e.g. by an earlier asyncio.run(), cannot be awaited
+            # here, and it never completes once that loop has been closed, so it is started again in this loop.
+            if future is None or future.done() or future.get_loop() is not asyncio.get_running_loop():
+                future = asyncio.ensure_future(self.run_async_initializer(initializer, args))
+                self.pending_future = future
+        # Cancelling one of the waiters must not cancel the initialization that the other waiters share.
+        return await asyncio.shield(future)
+
+    async def run_async_initializer(self, initializer: typing.Callable[..., typing.Awaitable[T]], args: typing.Tuple):
+        initializing_cell_ids.set(initializing_cell_ids.get() | {id(self)})
+        try:
+            value = await initializer(*args)
+        except BaseException as e:
+            # A cancellation, e.g. of the tasks left when asyncio.run() returns, is not a failure of the initializer,
+            # but the next call must still start a new initialization.
+            with self.lock:
+                if isinstance(e, Exception):
+                    self.record_failure(e)
+                self.clear_pending_future()
+            raise
+        with self.lock:
+            self.failure = None
+            self.num_consecutive_failures = 0
+            self.value = value
+            self.clear_pending_future()
+        return value
+
+    def clear_pending_future(self):
+        # The cell may already wait for an initialization that another event loop started.
+        if self.pending_future is asyncio.current_task():
+            self.pending_future = None
+
+    def raise_if_failure_is_cached(self):
+        failure = self.failure
+        if failure is not None and time.monotonic() < self.failure_expiry:
+            raise CachedInitializationError(
+                f"Initialization failed {self.num_consecutive_failures} time(s) in a row. "
+                f"It will be retried in {self.failure_expiry - time.monotonic():.3f} seconds.") from failure
+
+    def record_failure(self, failure: BaseException):
+        self.num_consecutive_failures += 1
+        backoff = self.failure_policy.get_backoff_seconds(self.num_consecutive_failures)
+        if backoff > 0:
+            self.failure = failure
+            self.failure_expiry = time.monotonic() + backoff
+        else:
+            self.failure = None
@@ -0,0 +1,57 @@
+import gc
+import os
+import typing
+import weakref
+from threading import Lock
+
+from jyuusu.injector import Injector
+from jyuusu.warm_up import WarmUpReport
+
+
+def reset_injector_locks(injector: Injector):
+    """
+    Replace the locks of the injector and of its parents. Only safe in a process that has a single thread, e.g. a
+    child right after a fork.
+    """
+    while injector is not None:
+        injector.lock = Lock()
+        if injector.graph_validator is not None:
+            injector.graph_validator.lock = Lock()
+        injector = injector.parent
+
+
+# The injectors prepared for forking. Their locks are replaced in every child by a single hook, because fork hooks
+# cannot be unregistered.
+prepared_injectors: 'weakref.WeakSet[Injector]' = weakref.WeakSet()
+
+
+def _reset_prepared_injector_locks_in_child():
+    for injector in list(prepared_injectors):
+        reset_injector_locks(injector)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_prepared_injector_locks_in_child)
+
+
+def prepare_for_fork(injector: Injector,
+                     max_workers: typing.Optional[int] = None,
+                     freeze_gc: bool = False) -> WarmUpReport:
+    """
+    Get the injector ready to be shared copy-on-write by forked worker processes.
+
+    Builds every memoized binding now, so that children find the singletons already built. Arranges for the
+    injector's locks to be replaced in every child, since another thread may hold one at the time of the fork; the
+    locks of memoized bindings, of memoization policies and of lazies replace themselves. With freeze_gc, collects
+    garbage and then moves every surviving object to the permanent generation with gc.freeze(), so that collections
+    in the children do not write to the pages that hold the parent's objects. Freezing affects the whole process and
+    the objects it freezes are never collected until gc.unfreeze() is called, so only freeze in a parent that does
+    little else but fork.
+    """
+    report = injector.warm_up(max_workers)
+    prepared_injectors.add(injector)
+
+    if freeze_gc:
+        gc.collect()
+        gc.freeze()
+    return report
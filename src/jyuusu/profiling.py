@@ -0,0 +1,190 @@
+import contextvars
+import json
+import time
+import typing
+from dataclasses import dataclass, field
+from threading import Lock
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver, WrappingResolver
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
+
+
+@dataclass
+class ProfileNode:
+    binding_key: BindingKey
+    inclusive_seconds: float = 0.0
+    children: typing.List['ProfileNode'] = field(default_factory=list)
+
+    @property
+    def exclusive_seconds(self) -> float:
+        return max(0.0, self.inclusive_seconds - sum(child.inclusive_seconds for child in self.children))
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "binding_key": str(self.binding_key),
+            "inclusive_seconds": self.inclusive_seconds,
+            "exclusive_seconds": self.exclusive_seconds,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@dataclass
+class SelfTimeEntry:
+    binding_key: BindingKey
+    exclusive_seconds: float
+    count: int
+
+
+class ProfileReport:
+    def __init__(self, roots: typing.List[ProfileNode]):
+        self.roots = roots
+
+    def get_critical_path(self) -> typing.List[ProfileNode]:
+        """
+        Return the chain of resolutions that took the longest: the slowest root resolution, then its slowest
+        dependency, and so on.
+        """
+        path = []
+        nodes = self.roots
+        while len(nodes) > 0:
+            node = max(nodes, key=lambda node: node.inclusive_seconds)
+            path.append(node)
+            nodes = node.children
+        return path
+
+    def get_top_self_time(self, limit: typing.Optional[int] = None) -> typing.List[SelfTimeEntry]:
+        """
+        Return the bindings sorted by the total time spent in their own constructors, excluding the time spent
+        resolving their dependencies.
+        """
+        entries: typing.Dict[BindingKey, SelfTimeEntry] = {}
+        nodes = list(self.roots)
+        while len(nodes) > 0:
+            node = nodes.pop()
+            entry = entries.get(node.binding_key)
+            if entry is None:
+                entry = SelfTimeEntry(node.binding_key, 0.0, 0)
+                entries[node.binding_key] = entry
+            entry.exclusive_seconds += node.exclusive_seconds
+            entry.count += 1
+            nodes.extend(node.children)
+        sorted_entries = sorted(entries.values(), key=lambda entry: entry.exclusive_seconds, reverse=True)
+        if limit is not None:
+            sorted_entries = sorted_entries[:limit]
+        return sorted_entries
+
+    def to_text(self, limit: int = 10) -> str:
+        lines = ["Critical path:"]
+        for (depth, node) in enumerate(self.get_critical_path()):
+            lines.append(f"  {'  ' * depth}{node.binding_key}: inclusive {node.inclusive_seconds * 1000:.3f} ms, "
+                         f"exclusive {node.exclusive_seconds * 1000:.3f} ms")
+        lines.append(f"Top {limit} bindings by self time:")
+        for entry in self.get_top_self_time(limit):
+            lines.append(f"  {entry.binding_key}: {entry.exclusive_seconds * 1000:.3f} ms in {entry.count} call(s)")
+        return "\n".join(lines)
+
+    def to_dict(self, limit: int = 10) -> typing.Dict[str, typing.Any]:
+        return {
+            "roots": [root.to_dict() for root in self.roots],
+            "critical_path": [
+                {
+                    "binding_key": str(node.binding_key),
+                    "inclusive_seconds": node.inclusive_seconds,
+                    "exclusive_seconds": node.exclusive_seconds,
+                }
+                for node in self.get_critical_path()
+            ],
+            "top_self_time": [
+                {
+                    "binding_key": str(entry.binding_key),
+                    "exclusive_seconds": entry.exclusive_seconds,
+                    "count": entry.count,
+                }
+                for entry in self.get_top_self_time(limit)
+            ],
+        }
+
+    def to_json(self, limit: int = 10, **kwargs) -> str:
+        return json.dumps(self.to_dict(limit), **kwargs)
+
+
+class ResolutionProfiler:
+    """
+    Records a tree of resolutions with the inclusive time of each one. The current node is kept in a context
+    variable, so nested resolutions on the same thread or asyncio task become its children.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.roots: typing.List[ProfileNode] = []
+        self.current_node: contextvars.ContextVar[typing.Optional[ProfileNode]] = \
+            contextvars.ContextVar('jyuusu_profiler_current_node', default=None)
+
+    def start(self, key: BindingKey) -> typing.Tuple[ProfileNode, contextvars.Token]:
+        node = ProfileNode(key)
+        parent = self.current_node.get()
+        if parent is None:
+            with self.lock:
+                self.roots.append(node)
+        else:
+            parent.children.append(node)
+        return node, self.current_node.set(node)
+
+    def finish(self, token: contextvars.Token):
+        self.current_node.reset(token)
+
+    def report(self) -> ProfileReport:
+        with self.lock:
+            return ProfileReport(list(self.roots))
+
+    def clear(self):
+        with self.lock:
+            self.roots = []
+
+
+class ProfilingResolver(WrappingResolver):
+    def __init__(self, base_resolver: Resolver, binding_key: BindingKey, profiler: ResolutionProfiler):
+        super().__init__(base_resolver)
+        self.binding_key = binding_key
+        self.profiler = profiler
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return self.measure(self.base_resolver.resolve, injector, binding_key_stack)
+
+    def measure(self, resolve: typing.Callable[..., typing.Any], *args) -> typing.Any:
+        (node, token) = self.profiler.start(self.binding_key)
+        start = time.perf_counter()
+        try:
+            return resolve(*args)
+        finally:
+            node.inclusive_seconds = time.perf_counter() - start
+            self.profiler.finish(token)
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        (node, token) = self.profiler.start(self.binding_key)
+        start = time.perf_counter()
+        try:
+            return await self.base_resolver.resolve_async(injector, binding_key_stack)
+        finally:
+            node.inclusive_seconds = time.perf_counter() - start
+            self.profiler.finish(token)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+
+        def resolve():
+            return self.measure(base_plan)
+
+        return resolve
+
+
+def profile_injector(injector: Injector, profiler: ResolutionProfiler):
+    injector.wrap_resolvers(lambda key, resolver: ProfilingResolver(resolver, key, profiler))
@@ -1,7 +1,7 @@
 import typing
 from abc import abstractmethod, ABC
 
-from jyuusu.read_writer_monitor import ReadWriteMonitor
+from jyuusu.once_cell import OnceCell
 
 T = typing.TypeVar('T')
 
@@ -15,18 +15,10 @@ class Provider(ABC, typing.Generic[T]):
 class Lazy(Provider[T]):
     def __init__(self, base_provider: Provider[T]):
         self.base_provider = base_provider
-        self.read_write_monitor = ReadWriteMonitor()
-        self.value: typing.Optional[T] = None
+        self.cell: OnceCell[T] = OnceCell()
 
     def get(self) -> T:
-        with self.read_write_monitor.read_session():
-            value = self.value
-        if value is not None:
-            return value
-        with self.read_write_monitor.write_session():
-            if self.value is None:
-                self.value = self.base_provider.get()
-        return self.value
+        return self.cell.get_or_init(self.base_provider.get)
 
     @staticmethod
     def create(provider: Provider[T]) -> 'Lazy[T]':
@@ -39,3 +31,22 @@ class InstanceProvider(Provider[T]):
 
     def get(self) -> T:
         return self.value
+
+
+class AsyncProvider(ABC, typing.Generic[T]):
+    @abstractmethod
+    async def get(self) -> T:
+        pass
+
+
+class AsyncLazy(AsyncProvider[T]):
+    def __init__(self, base_provider: AsyncProvider[T]):
+        self.base_provider = base_provider
+        self.cell: OnceCell[T] = OnceCell()
+
+    async def get(self) -> T:
+        return await self.cell.get_or_init_async(self.base_provider.get)
+
+    @staticmethod
+    def create(provider: AsyncProvider[T]) -> 'AsyncLazy[T]':
+        return AsyncLazy(provider)
@@ -26,8 +26,10 @@ class ReadWriteMonitor:
     @contextmanager
     def read_session(self):
         self.acquire_read()
-        yield
-        self.release_read()
+        try:
+            yield
+        finally:
+            self.release_read()
 
     def acquire_write(self):
         with self.lock:
@@ -48,5 +50,7 @@ class ReadWriteMonitor:
     @contextmanager
     def write_session(self):
         self.acquire_write()
-        yield
-        self.release_write()
\ No newline at end of file
+        try:
+            yield
+        finally:
+            self.release_write()
\ No newline at end of file
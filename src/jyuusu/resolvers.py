@@ -1,25 +1,121 @@
+import functools
+import inspect
+import types
 import typing
 
-from jyuusu.injector import Resolver, Injector
+from jyuusu.injector import Resolver, Injector, Dependency
 from jyuusu.binding_keys import BindingKey, SimpleTypeBindingKey, ToDictBindingKey
-from jyuusu.read_writer_monitor import ReadWriteMonitor
+from jyuusu.once_cell import OnceCell, FailurePolicy
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
 
 
 class DictResolver(Resolver):
-    def __init__(self, dict_type: type, to_dict_binding_keys: typing.Set[ToDictBindingKey]):
+    """
+    Resolves a dict multibinding by resolving each of its entries.
+
+    In the cached mode, the mapping is built once and every injection gets the same read-only MappingProxyType, even
+    if some entries are not memoized. Otherwise, every injection gets a new dict. If every entry is bound to an
+    instance or is memoized, the values cannot change after the first successful build, so they are kept and later
+    injections only copy them instead of resolving every entry again.
+    """
+
+    def __init__(self, dict_type: type, to_dict_binding_keys: typing.Set[ToDictBindingKey], cached: bool = False):
         self.to_dict_binding_keys = to_dict_binding_keys
         self.dict_type = dict_type
+        self.cached = cached
+        self.cell = OnceCell()
+        self.static_values: typing.Optional[typing.Dict[typing.Any, typing.Any]] = None
+
+    def __reduce__(self):
+        # Only the configuration is pickled. The cached mapping and values stay in this process.
+        return DictResolver, (self.dict_type, set(self.to_dict_binding_keys), self.cached)
 
     def resolve(self, injector: Injector,
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        if self.cached:
+            return self.cell.get_or_init(self.create_mapping, injector, binding_key_stack)
+        static_values = self.static_values
+        if static_values is not None:
+            return dict(static_values)
+        result = self.create_dict(injector, binding_key_stack)
+        self.keep_if_static(injector, result)
+        return result
+
+    def create_dict(self,
+                    injector: Injector,
+                    binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Dict:
         result = {}
         for key in self.to_dict_binding_keys:
             value = injector.get_instance_internal(key, binding_key_stack)
             result[key.key_value] = value
         return result
 
+    def create_mapping(self,
+                       injector: Injector,
+                       binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Mapping:
+        return types.MappingProxyType(self.create_dict(injector, binding_key_stack))
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        if self.cached:
+            return await self.cell.get_or_init_async(self.create_mapping_async, injector, binding_key_stack)
+        static_values = self.static_values
+        if static_values is not None:
+            return dict(static_values)
+        result = await self.create_dict_async(injector, binding_key_stack)
+        self.keep_if_static(injector, result)
+        return result
+
+    async def create_dict_async(self,
+                                injector: 'AsyncInjector',
+                                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Dict:
+        keys = list(self.to_dict_binding_keys)
+        values = await injector.get_instances_internal_async(keys, binding_key_stack)
+        return {key.key_value: value for (key, value) in zip(keys, values)}
+
+    async def create_mapping_async(self,
+                                   injector: 'AsyncInjector',
+                                   binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Mapping:
+        return types.MappingProxyType(await self.create_dict_async(injector, binding_key_stack))
+
+    def keep_if_static(self, injector: Injector, result: typing.Dict[typing.Any, typing.Any]):
+        # Entries wrapped by instrumentation are not static, so that their resolutions keep being observed. Wrapping
+        # the resolvers of an injector drops the kept values, so that they are checked again.
+        for key in self.to_dict_binding_keys:
+            if not isinstance(injector.get_resolver(key), (InstanceResolver, MemoizedResolver)):
+                return
+        self.static_values = dict(result)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        entries = [(key.key_value, compiler.compile_key(key)) for key in self.to_dict_binding_keys]
+
+        def create_dict():
+            return {key_value: plan() for (key_value, plan) in entries}
+
+        if self.cached:
+            return functools.partial(self.cell.get_or_init, lambda: types.MappingProxyType(create_dict()))
+
+        def resolve():
+            static_values = self.static_values
+            if static_values is not None:
+                return dict(static_values)
+            result = create_dict()
+            self.keep_if_static(compiler.injector, result)
+            return result
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return [Dependency(key) for key in self.to_dict_binding_keys]
+
     def add_key(self, key: ToDictBindingKey):
         assert key not in self.to_dict_binding_keys
+        assert not self.cell.is_initialized() and self.static_values is None, \
+            "Entries cannot be added to a dict binding that has already been resolved."
         self.to_dict_binding_keys.add(key)
 
 
@@ -31,6 +127,17 @@ class InstanceResolver(Resolver):
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
         return self.value
 
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        value = self.value
+
+        def resolve():
+            return value
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return []
+
 
 class DelegatedResolver(Resolver):
     def __init__(self, binding_key: SimpleTypeBindingKey):
@@ -40,21 +147,53 @@ class DelegatedResolver(Resolver):
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
         return injector.get_instance_internal(self.binding_key, binding_key_stack)
 
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return await injector.get_instance_internal_async(self.binding_key, binding_key_stack)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        return compiler.compile_key(self.binding_key)
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return [Dependency(self.binding_key)]
+
+
+def construct_synchronously(initializer: typing.Callable[..., typing.Any], *args) -> typing.Any:
+    """
+    Call the initializer of a memoized binding on the synchronous path, and refuse an awaitable result, e.g. the
+    coroutine of an async constructor, so that it is never memoized in place of the value it would produce.
+    """
+    value = initializer(*args)
+    if inspect.isawaitable(value):
+        if inspect.iscoroutine(value):
+            value.close()
+        raise TypeError(f"The constructor of a memoized binding returned {type(value).__name__}, which must be "
+                        f"awaited. Use AsyncInjector.get_instance_async() to get the bindings of async constructors.")
+    return value
+
 
 class MemoizedResolver(Resolver):
-    def __init__(self, base_resolver: Resolver):
+    def __init__(self, base_resolver: Resolver, failure_policy: typing.Optional[FailurePolicy] = None):
         self.base_resolver = base_resolver
-        self.read_write_monitor = ReadWriteMonitor()
-        self.value: typing.Any = None
+        self.cell = OnceCell(failure_policy)
+
+    def __reduce__(self):
+        return MemoizedResolver, (self.base_resolver, self.cell.failure_policy)
 
     def resolve(self,
                 injector: Injector,
                 binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
-        with self.read_write_monitor.read_session():
-            value = self.value
-        if value is not None:
-            return value
-        with self.read_write_monitor.write_session():
-            if self.value is None:
-                self.value = self.base_resolver.resolve(injector, binding_key_stack)
-        return self.value
\ No newline at end of file
+        return self.cell.get_or_init(construct_synchronously, self.base_resolver.resolve, injector, binding_key_stack)
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return await self.cell.get_or_init_async(self.base_resolver.resolve_async, injector, binding_key_stack)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        return functools.partial(self.cell.get_or_init,
+                                 functools.partial(construct_synchronously, self.base_resolver.compile(compiler)))
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return self.base_resolver.get_dependencies()
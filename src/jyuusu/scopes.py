@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import threading
+import typing
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Resolver, Injector, Dependency
+from jyuusu.once_cell import UNSET
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
+
+
+class Scope(ABC):
+    """
+    Decides how long the instances of scoped bindings live. Each scope hands out a dictionary that caches the
+    instances for its current lifetime, keyed by the resolver of the binding.
+    """
+
+    @abstractmethod
+    def get_instances(self) -> typing.Dict[Resolver, typing.Any]:
+        pass
+
+
+class ThreadLocalScope(Scope):
+    """
+    Caches one instance per thread. The instances of a thread are freed when the thread ends or when it calls
+    clear().
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __reduce__(self):
+        # Instances never leave their process, so a copy starts empty.
+        return ThreadLocalScope, ()
+
+    def get_instances(self) -> typing.Dict[Resolver, typing.Any]:
+        instances = getattr(self.local, 'instances', None)
+        if instances is None:
+            instances = {}
+            self.local.instances = instances
+        return instances
+
+    def clear(self):
+        self.local.instances = {}
+
+
+def get_context_owner() -> typing.Any:
+    """
+    Return the asyncio task that is running, or the current thread outside of any task.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return task
+    return threading.current_thread()
+
+
+class ContextVarScope(Scope):
+    """
+    Caches instances in a context variable. The enter() context manager starts a fresh set of instances, which the
+    asyncio tasks started inside it share, and frees them on exit. Outside of enter(), every asyncio task, and every
+    thread outside of a task, implicitly gets its own instances, even though a child task copies the context of its
+    parent. Implicit instances are freed with the context of their task, or with clear().
+    """
+
+    def __init__(self, name: str = 'jyuusu_scope'):
+        self.name = name
+        # Holds the instances and their owner, the task or thread that created them implicitly, or None if they
+        # were created by enter().
+        self.instances_var: contextvars.ContextVar[
+            typing.Optional[typing.Tuple[typing.Any, typing.Dict[Resolver, typing.Any]]]] = \
+            contextvars.ContextVar(name, default=None)
+
+    def __reduce__(self):
+        return type(self), (self.name,)
+
+    def get_instances(self) -> typing.Dict[Resolver, typing.Any]:
+        entry = self.instances_var.get()
+        if entry is None or (entry[0] is not None and entry[0] is not get_context_owner()):
+            return self.create_implicit_instances()
+        return entry[1]
+
+    def create_implicit_instances(self) -> typing.Dict[Resolver, typing.Any]:
+        instances = {}
+        self.instances_var.set((get_context_owner(), instances))
+        return instances
+
+    def clear(self):
+        """
+        Free the implicit instances of the current context.
+        """
+        entry = self.instances_var.get()
+        if entry is not None and entry[0] is not None:
+            self.instances_var.set(None)
+
+    @contextmanager
+    def enter(self):
+        instances = {}
+        token = self.instances_var.set((None, instances))
+        try:
+            yield instances
+        finally:
+            instances.clear()
+            self.instances_var.reset(token)
+
+
+class RequestScope(ContextVarScope):
+    """
+    Caches instances between an explicit enter() and the matching exit. Resolving a binding in this scope outside of
+    enter() is an error.
+    """
+
+    def __init__(self, name: str = 'jyuusu_request_scope'):
+        super().__init__(name)
+
+    def create_implicit_instances(self) -> typing.Dict[Resolver, typing.Any]:
+        raise RuntimeError("A request scoped binding was resolved outside of a request scope. Wrap the code with "
+                           "'with scope.enter():'.")
+
+
+class ScopedResolver(Resolver):
+    def __init__(self, base_resolver: Resolver, scope: Scope):
+        self.base_resolver = base_resolver
+        self.scope = scope
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        instances = self.scope.get_instances()
+        value = instances.get(self, UNSET)
+        if value is UNSET:
+            value = instances.setdefault(self, self.base_resolver.resolve(injector, binding_key_stack))
+        return value
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        instances = self.scope.get_instances()
+        value = instances.get(self, UNSET)
+        if value is UNSET:
+            value = instances.setdefault(self, await self.base_resolver.resolve_async(injector, binding_key_stack))
+        return value
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+        get_instances = self.scope.get_instances
+
+        def resolve():
+            instances = get_instances()
+            value = instances.get(self, UNSET)
+            if value is UNSET:
+                value = instances.setdefault(self, base_plan())
+            return value
+
+        return resolve
+
+    def get_dependencies(self) -> typing.Optional[typing.List[Dependency]]:
+        return self.base_resolver.get_dependencies()
@@ -0,0 +1,358 @@
+import ast
+import atexit
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import stat
+import sys
+import tempfile
+import typing
+from threading import Lock
+
+# The version of the file format. Files written with another version are ignored.
+CACHE_FORMAT_VERSION = 2
+
+# Maps the (module, qualified name, kind) of a class to the description of its user-specified specs, the
+# (module, source hash) pairs of the modules its specs were computed from, and the pickled specs.
+CacheEntries = typing.Dict[
+    typing.Tuple[str, str, str], typing.Tuple[str, typing.Tuple[typing.Tuple[str, str], ...], bytes]]
+
+
+def is_trusted_cache_file(status: os.stat_result) -> bool:
+    """
+    Return whether the file can only have been written by the current user: it is owned by the current user and is
+    not writable by the group or by others. Always true on platforms without file ownership.
+    """
+    if not hasattr(os, 'geteuid'):
+        return True
+    return status.st_uid == os.geteuid() and status.st_mode & (stat.S_IWGRP | stat.S_IWOTH) == 0
+
+
+def collect_type_modules(type_: typing.Any, modules: typing.Set[str]):
+    module_name = getattr(type_, '__module__', None)
+    if isinstance(module_name, str):
+        modules.add(module_name)
+    for arg in typing.get_args(type_):
+        collect_type_modules(arg, modules)
+
+
+def get_dotted_names(node: ast.AST) -> typing.List[str]:
+    """
+    Return the names, e.g. 'Foo' or 'package.module.Foo', that an annotation expression refers to. Names inside
+    string annotations are included.
+    """
+    names = []
+    for child in ast.walk(node):
+        if isinstance(child, ast.Constant) and isinstance(child.value, str):
+            try:
+                names.extend(get_dotted_names(ast.parse(child.value, mode='eval')))
+            except SyntaxError:
+                pass
+        elif isinstance(child, ast.Attribute):
+            parts = [child.attr]
+            value = child.value
+            while isinstance(value, ast.Attribute):
+                parts.append(value.attr)
+                value = value.value
+            if isinstance(value, ast.Name):
+                parts.append(value.id)
+                names.append(".".join(reversed(parts)))
+        elif isinstance(child, ast.Name):
+            names.append(child.id)
+    return names
+
+
+class ModuleSource:
+    """
+    What the cache needs to know about the source of a module: the full names that its imports bind, and the
+    functions it defines, by the line on which their code starts.
+    """
+
+    def __init__(self, module_name: str, source: bytes):
+        tree = ast.parse(source)
+        package = getattr(sys.modules.get(module_name), '__package__', None) or ""
+        self.imported_names: typing.Dict[str, str] = {}
+        self.functions: typing.Dict[int, typing.Union[ast.FunctionDef, ast.AsyncFunctionDef]] = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname is not None:
+                        self.imported_names[alias.asname] = alias.name
+                    else:
+                        root = alias.name.split(".")[0]
+                        self.imported_names[root] = root
+            elif isinstance(node, ast.ImportFrom):
+                try:
+                    from_module = importlib.util.resolve_name("." * node.level + (node.module or ""), package)
+                except (ImportError, ValueError):
+                    continue
+                for alias in node.names:
+                    self.imported_names[alias.asname or alias.name] = f"{from_module}.{alias.name}"
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                # The code of a decorated function starts at its first decorator.
+                self.functions[min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])] = node
+
+    def get_imported_name(self, name: str) -> typing.Optional[typing.Tuple[str, str]]:
+        """
+        Return the module that the given name was imported from and the rest of the name in that module, e.g.
+        ('package.module', 'Foo') for 'Foo' after 'from package.module import Foo', or None if the name is defined in
+        the module itself. The rest is empty if the name refers to the module.
+        """
+        (root, _, rest) = name.partition(".")
+        full_name = self.imported_names.get(root)
+        if full_name is None:
+            return None
+        if rest != "":
+            full_name = f"{full_name}.{rest}"
+        # The longest prefix that is a module, e.g. 'package.module' of 'package.module.Foo'.
+        module_name = full_name
+        while module_name != "" and module_name not in sys.modules:
+            module_name = module_name.rpartition(".")[0]
+        if module_name == "":
+            return None
+        return module_name, full_name[len(module_name) + 1:]
+
+    def get_annotation_names(self, function: typing.Callable) -> typing.List[str]:
+        """
+        Return the names that the annotations of the function's arguments refer to, or every name this module imports
+        if the function cannot be found in the source.
+        """
+        node = self.functions.get(getattr(getattr(function, '__code__', None), 'co_firstlineno', -1))
+        if node is None:
+            return list(self.imported_names.keys())
+        arguments = node.args
+        names = []
+        for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs + [arguments.vararg, arguments.kwarg]:
+            if arg is not None and arg.annotation is not None:
+                names.extend(get_dotted_names(arg.annotation))
+        return names
+
+
+class ResolverSpecCache:
+    """
+    Keeps the resolver specs computed by introspecting the constructors of injectable classes and factories in a file,
+    so that later processes can skip the introspection.
+
+    An entry is keyed by the module and qualified name of the class. It stores a description of the user-specified
+    specs it was computed from and the hash of the source of every module the specs depend on: the class's module,
+    the modules the constructor's annotations were imported from, followed through re-exports to the modules that
+    define them, e.g. the module that defines an imported type alias, and the modules of the types the specs refer
+    to. If any of them has changed, the entry is stale and is recomputed and replaced. Each entry is pickled
+    separately, so an entry that refers to a class that no longer exists is only a miss. Entries of modules that no
+    longer exist are dropped when the cache is saved. Classes without a source file, or defined inside functions, are
+    never cached.
+
+    The file is read with pickle, which can run arbitrary code, so it must only be writable by the user that runs the
+    program. A file that is owned by another user, or that the group or others can write, is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.entries: CacheEntries = self.load_entries()
+        self.source_hashes: typing.Dict[str, typing.Optional[str]] = {}
+        self.module_sources: typing.Dict[str, typing.Optional[ModuleSource]] = {}
+        self.dirty = False
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def load_entries(self) -> CacheEntries:
+        try:
+            with open(self.path, "rb") as file:
+                if not is_trusted_cache_file(os.fstat(file.fileno())):
+                    return {}
+                (version, entries) = pickle.load(file)
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            return {}
+        if version != CACHE_FORMAT_VERSION:
+            return {}
+        return entries
+
+    def read_source(self, module_name: str) -> typing.Optional[bytes]:
+        module = sys.modules.get(module_name)
+        file_name = getattr(module, "__file__", None)
+        if file_name is None:
+            return None
+        try:
+            with open(file_name, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def get_source_hash(self, module_name: str) -> typing.Optional[str]:
+        if module_name in self.source_hashes:
+            return self.source_hashes[module_name]
+        source = self.read_source(module_name)
+        source_hash = None if source is None else hashlib.sha256(source).hexdigest()
+        self.source_hashes[module_name] = source_hash
+        return source_hash
+
+    def get_module_source(self, module_name: str) -> typing.Optional[ModuleSource]:
+        if module_name in self.module_sources:
+            return self.module_sources[module_name]
+        source = self.read_source(module_name)
+        module_source = None
+        if source is not None:
+            try:
+                module_source = ModuleSource(module_name, source)
+            except (SyntaxError, ValueError):
+                pass
+        self.module_sources[module_name] = module_source
+        return module_source
+
+    def get_imported_modules(self, module_source: ModuleSource, names: typing.Iterable[str]) -> typing.Set[str]:
+        """
+        Return the modules that the given names were imported from. A name that such a module itself imports, e.g.
+        one it re-exports, is followed to the module that defines it, and every module along the way is included.
+        Names defined in the module of the source are skipped.
+        """
+        modules = set()
+        visited = set()
+        pending = [(module_source, name) for name in names]
+        while len(pending) > 0:
+            (source, name) = pending.pop()
+            imported_name = source.get_imported_name(name)
+            if imported_name is None or imported_name in visited:
+                continue
+            visited.add(imported_name)
+            (module_name, rest) = imported_name
+            modules.add(module_name)
+            if rest != "":
+                next_source = self.get_module_source(module_name)
+                if next_source is not None:
+                    pending.append((next_source, rest))
+        return modules
+
+    def get_dependency_modules(self, klass: type, specs: typing.Any) -> typing.Set[str]:
+        modules = {klass.__module__}
+        constructor = klass.__dict__.get('__init__')
+        if inspect.isfunction(constructor):
+            module_source = self.get_module_source(constructor.__module__)
+            if module_source is not None:
+                modules.add(constructor.__module__)
+                annotation_names = module_source.get_annotation_names(constructor)
+                modules.update(self.get_imported_modules(module_source, annotation_names))
+        # The specs are a dict of ResolverSpecs.
+        for spec in specs.values():
+            collect_type_modules(spec.binding_key.type_, modules)
+        return modules
+
+    def is_fresh(self, dependency_hashes: typing.Tuple[typing.Tuple[str, str], ...]) -> bool:
+        return all(self.get_source_hash(module_name) == source_hash for (module_name, source_hash) in dependency_hashes)
+
+    def get_or_compute(self,
+                       klass: type,
+                       kind: str,
+                       user_specs: typing.Dict[str, typing.Any],
+                       compute: typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        Return the cached specs of the class, or compute, store and return them. The kind tells apart the different
+        spec tables of one class, e.g. the ones of its constructor and of its factory.
+        """
+        if "<locals>" in klass.__qualname__:
+            return compute()
+        if self.get_source_hash(klass.__module__) is None:
+            return compute()
+
+        key = (klass.__module__, klass.__qualname__, kind)
+        user_specs_description = repr(sorted(user_specs.items()))
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == user_specs_description and self.is_fresh(entry[1]):
+            try:
+                specs = pickle.loads(entry[2])
+                with self.lock:
+                    self.hit_count += 1
+                return specs
+            except Exception:
+                pass
+
+        with self.lock:
+            self.miss_count += 1
+        specs = compute()
+        try:
+            data = pickle.dumps(specs)
+        except Exception:
+            return specs
+        dependency_hashes = []
+        for module_name in sorted(self.get_dependency_modules(klass, specs)):
+            source_hash = self.get_source_hash(module_name)
+            # Built-in modules have no source and cannot change.
+            if source_hash is not None:
+                dependency_hashes.append((module_name, source_hash))
+        with self.lock:
+            self.entries[key] = (user_specs_description, tuple(dependency_hashes), data)
+            self.dirty = True
+        return specs
+
+    def prune(self, entries: CacheEntries) -> CacheEntries:
+        """
+        Return the entries whose classes' modules still exist.
+        """
+        existing_modules = {}
+        for module_name in {key[0] for key in entries}:
+            if module_name in sys.modules:
+                existing_modules[module_name] = True
+                continue
+            try:
+                existing_modules[module_name] = importlib.util.find_spec(module_name) is not None
+            except (ImportError, ValueError):
+                existing_modules[module_name] = False
+        return {key: entry for (key, entry) in entries.items() if existing_modules[key[0]]}
+
+    def save(self):
+        """
+        Write the entries to the file if any changed, without the entries of modules that no longer exist. The file
+        is replaced atomically, so concurrent processes never read a partial file.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = dict(self.entries)
+            self.dirty = False
+        entries = self.prune(entries)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        (fd, temp_path) = tempfile.mkstemp(dir=directory, prefix=".jyuusu-spec-cache-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump((CACHE_FORMAT_VERSION, entries), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+# The cache consulted when constructors are introspected, if any.
+active_cache: typing.Optional[ResolverSpecCache] = None
+
+
+def enable_spec_cache(path: str, save_at_exit: bool = True) -> ResolverSpecCache:
+    """
+    Cache the resolver specs of injectable classes and factories in the file at path from now on. Enable the cache
+    before the first injector is created, so that every introspection goes through it. With save_at_exit, new and
+    updated entries are written back when the process exits. Otherwise, call save(). The file is unpickled, so it
+    must live where only the current user can write, never in a shared directory.
+    """
+    global active_cache
+    cache = ResolverSpecCache(path)
+    active_cache = cache
+    if save_at_exit:
+        atexit.register(cache.save)
+    return cache
+
+
+def get_specs(klass: type,
+              kind: str,
+              user_specs: typing.Dict[str, typing.Any],
+              compute: typing.Callable[[], typing.Any]) -> typing.Any:
+    cache = active_cache
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(klass, kind, user_specs, compute)
+
+
+def disable_spec_cache():
+    global active_cache
+    active_cache = None
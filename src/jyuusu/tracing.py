@@ -0,0 +1,140 @@
+import collections
+import itertools
+import signal
+import sys
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, Resolver, WrappingResolver, unwrap_resolver
+
+if typing.TYPE_CHECKING:
+    from jyuusu.async_injector import AsyncInjector
+    from jyuusu.compiler import ResolutionCompiler
+
+
+@dataclass(frozen=True)
+class TraceSample:
+    # The chain of keys that led to the resolution, from the root to the resolved key.
+    binding_key_chain: typing.Tuple[BindingKey, ...]
+    resolver_type: str
+    duration_seconds: float
+    start_time: float
+    thread_id: int
+
+    def __str__(self):
+        chain = " -> ".join(str(key) for key in self.binding_key_chain)
+        return f"[thread {self.thread_id}] {self.duration_seconds * 1000:.3f} ms {self.resolver_type}: {chain}"
+
+
+class SamplingTracer:
+    """
+    Records one in every sample_every resolutions into a ring buffer that keeps the latest capacity samples. The
+    buffer can be dumped at any time, e.g. from a signal handler or a debug endpoint.
+    """
+
+    def __init__(self, sample_every: int = 100, capacity: int = 1024):
+        assert sample_every >= 1
+        assert capacity >= 1
+        self.sample_every = sample_every
+        # Appending to a bounded deque and advancing an itertools.count are atomic, so recording takes no lock.
+        self.samples: typing.Deque[TraceSample] = collections.deque(maxlen=capacity)
+        self.counter = itertools.count()
+
+    def should_sample(self) -> bool:
+        return next(self.counter) % self.sample_every == 0
+
+    def record(self, sample: TraceSample):
+        self.samples.append(sample)
+
+    def dump(self) -> typing.List[TraceSample]:
+        return list(self.samples)
+
+    def dump_text(self) -> str:
+        samples = self.dump()
+        lines = [f"{len(samples)} sampled resolution(s), 1 in {self.sample_every}:"]
+        lines.extend("  " + str(sample) for sample in samples)
+        return "\n".join(lines)
+
+    def install_signal_handler(self,
+                               signal_number: typing.Optional[int] = None,
+                               output: typing.Optional[typing.TextIO] = None):
+        """
+        Dump the samples as text to output (standard error by default) whenever the process receives the signal,
+        SIGUSR1 by default. Platforms without SIGUSR1, such as Windows, must name the signal explicitly. Must be
+        called from the main thread.
+        """
+        if signal_number is None:
+            if not hasattr(signal, 'SIGUSR1'):
+                raise ValueError("SIGUSR1 is not available on this platform. Pass the signal to dump the samples on.")
+            signal_number = signal.SIGUSR1
+
+        def handle(signum, frame):
+            stream = output if output is not None else sys.stderr
+            stream.write(self.dump_text() + "\n")
+            stream.flush()
+
+        signal.signal(signal_number, handle)
+
+
+class TracingResolver(WrappingResolver):
+    def __init__(self, base_resolver: Resolver, binding_key: BindingKey, tracer: SamplingTracer):
+        super().__init__(base_resolver)
+        self.binding_key = binding_key
+        self.tracer = tracer
+        self.resolver_type = type(unwrap_resolver(base_resolver)).__name__
+
+    def resolve(self,
+                injector: Injector,
+                binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        return self.trace(binding_key_stack, self.base_resolver.resolve, injector, binding_key_stack)
+
+    def trace(self,
+              binding_key_stack: typing.Iterable[BindingKey],
+              resolve: typing.Callable[..., typing.Any],
+              *args) -> typing.Any:
+        if not self.tracer.should_sample():
+            return resolve(*args)
+        start = time.perf_counter()
+        start_time = time.time()
+        try:
+            return resolve(*args)
+        finally:
+            self.record(binding_key_stack, time.perf_counter() - start, start_time)
+
+    async def resolve_async(self,
+                            injector: 'AsyncInjector',
+                            binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> typing.Any:
+        if not self.tracer.should_sample():
+            return await self.base_resolver.resolve_async(injector, binding_key_stack)
+        start = time.perf_counter()
+        start_time = time.time()
+        try:
+            return await self.base_resolver.resolve_async(injector, binding_key_stack)
+        finally:
+            self.record(binding_key_stack, time.perf_counter() - start, start_time)
+
+    def compile(self, compiler: 'ResolutionCompiler') -> typing.Callable[[], typing.Any]:
+        base_plan = self.base_resolver.compile(compiler)
+
+        # Compiled plans keep no binding key stack, so their samples only name the traced binding.
+        def resolve():
+            return self.trace((), base_plan)
+
+        return resolve
+
+    def record(self,
+               binding_key_stack: typing.Iterable[BindingKey],
+               duration_seconds: float,
+               start_time: float):
+        chain = tuple(binding_key_stack)
+        # Validated injectors do not keep the stack.
+        if len(chain) == 0 or chain[-1] != self.binding_key:
+            chain = chain + (self.binding_key,)
+        self.tracer.record(TraceSample(chain, self.resolver_type, duration_seconds, start_time, threading.get_ident()))
+
+
+def trace_injector(injector: Injector, tracer: SamplingTracer):
+    injector.wrap_resolvers(lambda key, resolver: TracingResolver(resolver, key, tracer))
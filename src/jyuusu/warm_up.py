@@ -0,0 +1,153 @@
+import time
+import typing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from jyuusu.binding_keys import BindingKey
+from jyuusu.injector import Injector, raise_circular_dependency_error, unwrap_resolver
+from jyuusu.resolvers import MemoizedResolver
+
+
+@dataclass
+class WarmUpEntry:
+    binding_key: BindingKey
+    level: int
+    seconds: float = 0.0
+    error: typing.Optional[BaseException] = None
+    skipped: bool = False
+
+
+@dataclass
+class WarmUpReport:
+    entries: typing.List[WarmUpEntry] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failures(self) -> typing.List[WarmUpEntry]:
+        return [entry for entry in self.entries if entry.error is not None]
+
+    def __str__(self):
+        lines = [f"Warmed up {len(self.entries)} memoized binding(s) in {self.seconds:.3f} seconds."]
+        for entry in sorted(self.entries, key=lambda entry: (entry.level, -entry.seconds)):
+            if entry.skipped:
+                status = f"skipped ({entry.error})"
+            elif entry.error is not None:
+                status = f"failed ({type(entry.error).__name__}: {entry.error})"
+            else:
+                status = f"{entry.seconds * 1000:.2f} ms"
+            lines.append(f"  [level {entry.level}] {entry.binding_key}: {status}")
+        return "\n".join(lines)
+
+
+class MemoizedDependencyLevels:
+    """
+    Assigns a level to every memoized binding of an injector. A memoized binding has level 0 if it does not depend,
+    directly or through unmemoized bindings, on other memoized bindings. Otherwise, its level is one more than the
+    highest level among the memoized bindings it depends on. Bindings of the same level are independent of one another.
+    """
+
+    def __init__(self, injector: Injector):
+        self.injector = injector
+        self.levels: typing.Dict[BindingKey, int] = {}
+        self.memoized_dependencies: typing.Dict[BindingKey, typing.Set[BindingKey]] = {}
+        self.errors: typing.Dict[BindingKey, BaseException] = {}
+
+    def compute(self) -> typing.Dict[BindingKey, int]:
+        for (key, resolver) in list(self.injector.bindings.items()):
+            if isinstance(unwrap_resolver(resolver), MemoizedResolver):
+                try:
+                    self.get_level(key, OrderedDict())
+                except Exception as e:
+                    self.errors[key] = e
+        return self.levels
+
+    def get_level(self, key: BindingKey, binding_key_stack: typing.OrderedDict[BindingKey, typing.Any]) -> int:
+        if key in self.levels:
+            return self.levels[key]
+        binding_key_stack[key] = None
+        dependencies = set()
+        self.collect_memoized_dependencies(key, binding_key_stack, dependencies, set())
+        level = 0
+        for dependency in dependencies:
+            level = max(level, self.get_level(dependency, binding_key_stack) + 1)
+        del binding_key_stack[key]
+        self.levels[key] = level
+        self.memoized_dependencies[key] = dependencies
+        return level
+
+    def collect_memoized_dependencies(self,
+                                      key: BindingKey,
+                                      binding_key_stack: typing.OrderedDict[BindingKey, typing.Any],
+                                      output: typing.Set[BindingKey],
+                                      visited: typing.Set[BindingKey]):
+        dependencies = self.injector.get_resolver(key).get_dependencies()
+        if dependencies is None:
+            return
+        for dependency in dependencies:
+            dependency_key = dependency.binding_key
+            if dependency.deferred or dependency_key in visited:
+                continue
+            if self.injector.get_binding_owner(dependency_key) is not self.injector:
+                # Singletons of a parent injector are warmed up by the parent.
+                continue
+            visited.add(dependency_key)
+            if dependency_key in binding_key_stack:
+                raise_circular_dependency_error(binding_key_stack, dependency_key)
+            if isinstance(unwrap_resolver(self.injector.get_resolver(dependency_key)), MemoizedResolver):
+                output.add(dependency_key)
+            else:
+                binding_key_stack[dependency_key] = None
+                self.collect_memoized_dependencies(dependency_key, binding_key_stack, output, visited)
+                del binding_key_stack[dependency_key]
+
+
+def warm_up(injector: Injector, max_workers: typing.Optional[int] = None) -> WarmUpReport:
+    """
+    Build every memoized binding of the injector ahead of time. Bindings are built level by level, and the bindings
+    of one level are built concurrently on a thread pool with at most max_workers threads.
+    """
+    start = time.perf_counter()
+    dependency_levels = MemoizedDependencyLevels(injector)
+    levels = dependency_levels.compute()
+
+    report = WarmUpReport()
+    entries: typing.Dict[BindingKey, WarmUpEntry] = {}
+    for (key, error) in dependency_levels.errors.items():
+        entries[key] = WarmUpEntry(key, level=-1, error=error)
+
+    keys_by_level: typing.Dict[int, typing.List[BindingKey]] = {}
+    for (key, level) in levels.items():
+        keys_by_level.setdefault(level, []).append(key)
+
+    def build(key: BindingKey) -> WarmUpEntry:
+        entry = WarmUpEntry(key, levels[key])
+        build_start = time.perf_counter()
+        try:
+            injector.get_instance_internal(key, OrderedDict())
+        except Exception as e:
+            entry.error = e
+        entry.seconds = time.perf_counter() - build_start
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for level in sorted(keys_by_level.keys()):
+            keys_to_build = []
+            for key in keys_by_level[level]:
+                failed_dependencies = [
+                    dependency for dependency in dependency_levels.memoized_dependencies[key]
+                    if entries[dependency].error is not None
+                ]
+                if len(failed_dependencies) > 0:
+                    entries[key] = WarmUpEntry(
+                        key, level,
+                        error=RuntimeError(f"Dependency {failed_dependencies[0]} failed to build."),
+                        skipped=True)
+                else:
+                    keys_to_build.append(key)
+            for entry in executor.map(build, keys_to_build):
+                entries[entry.binding_key] = entry
+
+    report.entries = list(entries.values())
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,228 @@
+import asyncio
+import unittest
+from unittest import TestCase
+
+from jyuusu.binder import Module, Binder
+from jyuusu.binding_keys import SimpleTypeBindingKey
+from jyuusu.constructor_resolver import injectable_class, memoized, ResolverSpec, make_injectable_class
+from jyuusu.injectors import create_async_injector
+from jyuusu.once_cell import ReentrantInitializationError
+from jyuusu.provider import AsyncProvider, AsyncLazy
+
+
+class AsyncInjectorTest(TestCase):
+    def test_async_constructor(self):
+        async def create_value() -> int:
+            await asyncio.sleep(0)
+            return 10
+
+        @injectable_class
+        class A:
+            def __init__(self, value: int):
+                self.value = value
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).to_constructor(create_value)
+                binder.install_class(A)
+
+        injector = create_async_injector(Module_)
+
+        a = asyncio.run(injector.get_instance_async(A))
+
+        self.assertEqual(a.value, 10)
+
+    def test_sibling_arguments_are_resolved_concurrently(self):
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(asyncio.Event).with_memoization().to_constructor(lambda: asyncio.Event())
+                binder.bind(int, "first").to_constructor(wait_for_event)
+                binder.bind(int, "second").to_constructor(set_event)
+                binder.bind(tuple).to_constructor(lambda first, second: (first, second),
+                                                  first=ResolverSpec.of(int, "first"),
+                                                  second=ResolverSpec.of(int, "second"))
+
+        async def wait_for_event(event: asyncio.Event) -> int:
+            await asyncio.wait_for(event.wait(), timeout=5.0)
+            return 1
+
+        async def set_event(event: asyncio.Event) -> int:
+            event.set()
+            return 2
+
+        injector = create_async_injector(Module_)
+
+        self.assertEqual(asyncio.run(injector.get_instance_async(tuple)), (1, 2))
+
+    def test_memoized_binding_is_built_once(self):
+        constructed = []
+
+        async def create_value() -> int:
+            constructed.append(None)
+            await asyncio.sleep(0.01)
+            return 10
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+
+        injector = create_async_injector(Module_)
+
+        async def get_many():
+            return await asyncio.gather(*[injector.get_instance_async(int) for _ in range(10)])
+
+        self.assertEqual(asyncio.run(get_many()), [10] * 10)
+        self.assertEqual(len(constructed), 1)
+
+    def test_metrics_record_async_resolutions(self):
+        async def create_value() -> int:
+            await asyncio.sleep(0)
+            return 10
+
+        @injectable_class
+        class A:
+            def __init__(self, value: int):
+                self.value = value
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+                binder.install_class(A)
+
+        injector = create_async_injector(Module_)
+        metrics = injector.enable_metrics()
+
+        async def get_twice():
+            return [await injector.get_instance_async(A) for _ in range(2)]
+
+        asyncio.run(get_twice())
+
+        snapshot = metrics.snapshot()
+        int_metrics = snapshot[SimpleTypeBindingKey(int)]
+        self.assertEqual(int_metrics["resolve_count"], 2)
+        self.assertEqual(int_metrics["memoization_hits"], 1)
+        self.assertEqual(int_metrics["memoization_misses"], 1)
+        self.assertEqual(snapshot[SimpleTypeBindingKey(A)]["construction_seconds"]["count"], 2)
+
+    def test_async_provider_and_lazy(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                self.value = 10
+
+        @injectable_class
+        class B:
+            def __init__(self, a_provider: AsyncProvider[A], a_lazy: AsyncLazy[A]):
+                self.a_provider = a_provider
+                self.a_lazy = a_lazy
+
+        injector = create_async_injector()
+
+        async def get_values():
+            b = await injector.get_instance_async(B)
+            return await b.a_provider.get(), await b.a_lazy.get()
+
+        (a0, a1) = asyncio.run(get_values())
+
+        self.assertEqual(a0.value, 10)
+        self.assertEqual(a0, a1)
+
+    def test_circular_dependency(self):
+        class A:
+            def __init__(self, b):
+                self.b = b
+
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        make_injectable_class(A, b=ResolverSpec.of(B))
+        make_injectable_class(B)
+
+        injector = create_async_injector()
+
+        self.assertRaises(RuntimeError, lambda: asyncio.run(injector.get_instance_async(A)))
+
+    def test_memoized_reentry_through_async_provider(self):
+        async def create_value(provider: AsyncProvider[int]) -> int:
+            return await provider.get()
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+
+        injector = create_async_injector(Module_)
+
+        self.assertRaises(ReentrantInitializationError, lambda: asyncio.run(injector.get_instance_async(int)))
+
+    def test_memoized_binding_is_built_again_after_its_initialization_is_cancelled(self):
+        constructed = []
+
+        async def create_value() -> int:
+            constructed.append(None)
+            if len(constructed) == 1:
+                await asyncio.sleep(60)
+            return 10
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+
+        injector = create_async_injector(Module_)
+
+        async def get_with_timeout():
+            return await asyncio.wait_for(injector.get_instance_async(int), timeout=0.01)
+
+        # asyncio.run() cancels the initialization that the timed out call left running.
+        self.assertRaises(asyncio.TimeoutError, lambda: asyncio.run(get_with_timeout()))
+        self.assertEqual(asyncio.run(injector.get_instance_async(int)), 10)
+        self.assertEqual(len(constructed), 2)
+
+    def test_memoized_binding_is_built_again_in_another_event_loop(self):
+        constructed = []
+
+        async def create_value() -> int:
+            constructed.append(None)
+            if len(constructed) == 1:
+                await asyncio.sleep(60)
+            return 10
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+
+        injector = create_async_injector(Module_)
+
+        async def get_with_timeout():
+            return await asyncio.wait_for(injector.get_instance_async(int), timeout=0.01)
+
+        # The first loop stays open, so its initialization is still pending when the second loop asks for the value.
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertRaises(asyncio.TimeoutError, lambda: loop.run_until_complete(get_with_timeout()))
+            self.assertEqual(asyncio.run(injector.get_instance_async(int)), 10)
+            self.assertEqual(len(constructed), 2)
+        finally:
+            for task in asyncio.all_tasks(loop):
+                task.cancel()
+                self.assertRaises(asyncio.CancelledError, lambda: loop.run_until_complete(task))
+            loop.close()
+        self.assertEqual(asyncio.run(injector.get_instance_async(int)), 10)
+        self.assertEqual(len(constructed), 2)
+
+    def test_memoized_async_constructor_is_refused_on_the_synchronous_path(self):
+        async def create_value() -> int:
+            return 10
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).with_memoization().to_constructor(create_value)
+
+        for injector in [create_async_injector(Module_), create_async_injector(Module_).compile()]:
+            self.assertRaises(TypeError, lambda: injector.get_instance(int))
+            self.assertEqual(asyncio.run(injector.get_instance_async(int)), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,27 @@
+import asyncio
+import functools
+import gc
+import io
+import json
+import os
+import signal
+import time
 import unittest
+from threading import Barrier, Thread
 from typing import Dict, ForwardRef
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from jyuusu.binder import Module, Binder
+from jyuusu.binding_keys import SimpleTypeBindingKey, ToDictBindingKey
 from jyuusu.constructor_resolver import injectable_class, memoized, ResolverSpec, \
-    make_injectable_class
+    make_injectable_class, memoized_with, scoped, validate_injectable_class, ConstructorResolver
 from jyuusu.factory_resolver import injectable_factory, factory_class
 from jyuusu.injectors import create_injector
+from jyuusu.memoization import KeepWhileReferenced, KeepMostRecentlyUsed, EvictWhenIdle
+from jyuusu.once_cell import CacheFailureWithBackoff, CachedInitializationError, ReentrantInitializationError
 from jyuusu.provider import Provider, Lazy
+from jyuusu.scopes import RequestScope, ThreadLocalScope, ContextVarScope
+from jyuusu.tracing import SamplingTracer
 
 
 class BinderTest(TestCase):
@@ -252,6 +266,1067 @@ class BinderTest(TestCase):
         self.assertEqual(b.value, 20)
         self.assertEqual(b.a.value, 10)
 
+    def test_compiled_just_in_time_binding(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                self.value = 10
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A, a_lazy: Lazy[A]):
+                self.a = a
+                self.a_lazy = a_lazy
+
+        injector = create_injector().compile()
+
+        b = injector.get_instance(B)
+
+        self.assertEqual(b.a.value, 10)
+        self.assertEqual(b.a_lazy.get(), b.a)
+        self.assertEqual(injector.get_instance(A), b.a)
+
+    def test_concurrent_just_in_time_binding(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                self.value = 10
+
+        injector = create_injector()
+        barrier = Barrier(8)
+        instances = []
+
+        def get_a():
+            barrier.wait()
+            instances.append(injector.get_instance(A))
+
+        threads = [Thread(target=get_a) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(instances), 8)
+        for instance in instances:
+            self.assertEqual(instance, instances[0])
+
+    def test_validated_injector(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                self.value = 10
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A, values: Dict[str, int]):
+                self.a = a
+                self.values = values
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(B)
+                binder.install_dict(str, int)
+                binder.bind_to_dict(str, int).with_key("a").to_instance(1)
+
+        injector = create_injector(Module_, validate=True)
+
+        self.assertFalse(injector.check_cycles)
+        b = injector.get_instance(B)
+        self.assertEqual(b.a.value, 10)
+        self.assertEqual(b.values, {"a": 1})
+        self.assertEqual(injector.get_instance(A), b.a)
+
+    def test_validated_injector_circular_dependency(self):
+        class A:
+            def __init__(self, b):
+                self.b = b
+
+        class B:
+            def __init__(self, c):
+                self.c = c
+
+        class C:
+            def __init__(self, b: B):
+                self.b = b
+
+        make_injectable_class(A, b=ResolverSpec.provider(B))
+        make_injectable_class(B, c=ResolverSpec.of(C))
+        make_injectable_class(C)
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        with self.assertRaises(RuntimeError) as context:
+            create_injector(Module_, validate=True)
+        self.assertIn("Circular dependency discovered!!!", str(context.exception))
+
+    def test_validated_injector_missing_binding(self):
+        @injectable_class
+        class A:
+            def __init__(self, value: int):
+                self.value = value
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        self.assertRaises(AssertionError, lambda: create_injector(Module_, validate=True))
+
+    def test_validated_injector_just_in_time_circular_dependency(self):
+        class A:
+            def __init__(self, b: 'B'):
+                self.b = b
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        make_injectable_class(A, b=ResolverSpec.of(B))
+
+        injector = create_injector(validate=True)
+
+        self.assertRaises(RuntimeError, lambda: injector.get_instance(A))
+        self.assertRaises(RuntimeError, lambda: injector.get_instance(A))
+
+    def test_memoized_constructor_failure_is_retried(self):
+        attempts = []
+
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                attempts.append(None)
+                if len(attempts) == 1:
+                    raise ValueError("first attempt fails")
+                self.value = 10
+
+        injector = create_injector()
+
+        self.assertRaises(ValueError, lambda: injector.get_instance(A))
+        self.assertEqual(injector.get_instance(A).value, 10)
+        self.assertEqual(len(attempts), 2)
+
+    def test_memoized_constructor_failure_is_cached(self):
+        attempts = []
+
+        @memoized_with(failure_policy=CacheFailureWithBackoff(initial_backoff_seconds=60.0))
+        @injectable_class
+        class A:
+            def __init__(self):
+                attempts.append(None)
+                raise ValueError("always fails")
+
+        injector = create_injector()
+
+        self.assertRaises(ValueError, lambda: injector.get_instance(A))
+        self.assertRaises(CachedInitializationError, lambda: injector.get_instance(A))
+        self.assertEqual(len(attempts), 1)
+
+    def test_memoized_reentry_through_provider(self):
+        class A:
+            def __init__(self, a_provider: Provider['A']):
+                self.a = a_provider.get()
+
+        make_injectable_class(A, a_provider=ResolverSpec.provider(A))
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).with_memoization().to_resolver(A._create_jyuusu_resolver())
+
+        injector = create_injector(Module_)
+
+        self.assertRaises(ReentrantInitializationError, lambda: injector.get_instance(A))
+
+    def test_warm_up(self):
+        constructed = []
+
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                constructed.append(A)
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        @memoized
+        @injectable_class
+        class C:
+            def __init__(self, b: B):
+                constructed.append(C)
+                self.b = b
+
+        @memoized
+        @injectable_class
+        class D:
+            def __init__(self):
+                raise ValueError("D cannot be built")
+
+        @memoized
+        @injectable_class
+        class E:
+            def __init__(self, d: D):
+                self.d = d
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(C)
+                binder.install_class(E)
+
+        injector = create_injector(Module_)
+        report = injector.warm_up(max_workers=4)
+
+        self.assertEqual(constructed, [A, C])
+        levels = {entry.binding_key.type_: entry.level for entry in report.entries}
+        self.assertEqual(levels, {A: 0, C: 1, D: 0, E: 1})
+        failures = {entry.binding_key.type_: entry for entry in report.failures}
+        self.assertIsInstance(failures[D].error, ValueError)
+        self.assertTrue(failures[E].skipped)
+        self.assertEqual(injector.get_instance(C).b.a, injector.get_instance(A))
+        self.assertEqual(constructed, [A, C])
+
+    def test_request_scope(self):
+        scope = RequestScope()
+
+        @scoped(scope)
+        @injectable_class
+        class A:
+            def __init__(self):
+                pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a0: A, a1: A):
+                self.a0 = a0
+                self.a1 = a1
+
+        injector = create_injector()
+
+        with scope.enter():
+            b = injector.get_instance(B)
+            self.assertEqual(b.a0, b.a1)
+            self.assertEqual(injector.get_instance(A), b.a0)
+        with scope.enter():
+            self.assertNotEqual(injector.get_instance(A), b.a0)
+        self.assertRaises(RuntimeError, lambda: injector.get_instance(A))
+
+    def test_thread_local_scope(self):
+        scope = ThreadLocalScope()
+
+        class A:
+            def __init__(self):
+                pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).in_scope(scope).to_constructor(lambda: A())
+
+        injector = create_injector(Module_)
+        instances = []
+
+        def get_a():
+            instances.append(injector.get_instance(A))
+
+        thread = Thread(target=get_a)
+        thread.start()
+        thread.join()
+        a = injector.get_instance(A)
+
+        self.assertEqual(injector.get_instance(A), a)
+        self.assertNotEqual(instances[0], a)
+        scope.clear()
+        self.assertNotEqual(injector.get_instance(A), a)
+
+    def test_context_var_scope(self):
+        scope = ContextVarScope()
+
+        class A:
+            def __init__(self):
+                pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).in_scope(scope).to_constructor(lambda: A())
+
+        injector = create_injector(Module_)
+
+        async def get_pair():
+            return injector.get_instance(A), injector.get_instance(A)
+
+        async def main():
+            return await asyncio.gather(get_pair(), get_pair())
+
+        ((a0, a1), (a2, a3)) = asyncio.run(main())
+
+        self.assertEqual(a0, a1)
+        self.assertEqual(a2, a3)
+        self.assertNotEqual(a0, a2)
+
+    def test_context_var_scope_child_tasks_of_implicit_context(self):
+        scope = ContextVarScope()
+
+        class A:
+            def __init__(self):
+                pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).in_scope(scope).to_constructor(lambda: A())
+
+        injector = create_injector(Module_)
+
+        async def get_pair():
+            return injector.get_instance(A), injector.get_instance(A)
+
+        async def main():
+            # The parent task creates its instances implicitly before the child tasks copy its context.
+            parent_a = injector.get_instance(A)
+            pairs = await asyncio.gather(get_pair(), get_pair())
+            with scope.enter():
+                entered_a = injector.get_instance(A)
+                entered_pairs = await asyncio.gather(get_pair(), get_pair())
+            return parent_a, pairs, entered_a, entered_pairs
+
+        (parent_a, ((a0, a1), (a2, a3)), entered_a, entered_pairs) = asyncio.run(main())
+
+        self.assertIs(a0, a1)
+        self.assertIs(a2, a3)
+        self.assertIsNot(a0, a2)
+        self.assertIsNot(a0, parent_a)
+        self.assertIsNot(a2, parent_a)
+        # Tasks started inside enter() share the instances of the entered scope.
+        for pair in entered_pairs:
+            self.assertEqual(pair, (entered_a, entered_a))
+
+    def test_child_injector(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self, value: int):
+                self.value = value
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A, value: int):
+                self.a = a
+                self.value = value
+
+        class ParentModule(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+                binder.bind(int).to_instance(10)
+
+        class ChildModule(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(B)
+                binder.bind(int).to_instance(20)
+
+        parent = create_injector(ParentModule)
+        child = parent.create_child(ChildModule)
+
+        b = child.get_instance(B)
+
+        self.assertEqual(b.value, 20)
+        self.assertEqual(b.a.value, 10)
+        self.assertEqual(b.a, parent.get_instance(A))
+        self.assertEqual(child.get_instance(int), 20)
+        self.assertEqual(parent.get_instance(int), 10)
+        self.assertEqual(len(child.bindings), 2)
+        self.assertRaises(AssertionError, lambda: parent.get_instance(B, "missing"))
+
+    def test_child_injector_validate_and_compile(self):
+        @injectable_class
+        class A:
+            def __init__(self, value: int):
+                self.value = value
+
+        class ParentModule(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).to_instance(10)
+
+        class ChildModule(Module):
+            def configure(self, binder: Binder):
+                binder.bind(str).to_constructor(lambda a: str(a.value), a=ResolverSpec.of(A))
+
+        parent = create_injector(ParentModule)
+        child = parent.create_child(ChildModule).validate().compile()
+
+        self.assertEqual(child.get_instance(str), "10")
+        self.assertIn(SimpleTypeBindingKey(A), parent.bindings)
+        self.assertNotIn(SimpleTypeBindingKey(A), child.bindings)
+
+    def test_child_injector_just_in_time_binding_that_depends_on_child_bindings(self):
+        class Config:
+            def __init__(self, name: str):
+                self.name = name
+
+        @memoized
+        @injectable_class
+        class Service:
+            def __init__(self, config: Config):
+                self.config = config
+
+        @memoized
+        @injectable_class
+        class Client:
+            def __init__(self, service: Service, value: int):
+                self.service = service
+                self.value = value
+
+        class ParentModule(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).to_instance(10)
+
+        def create_tenant_module(name: str):
+            class TenantModule(Module):
+                def configure(self, binder: Binder):
+                    binder.bind(Config).to_instance(Config(name))
+
+            return TenantModule
+
+        parent = create_injector(ParentModule)
+        first_child = parent.create_child(create_tenant_module("first"))
+        second_child = parent.create_child(create_tenant_module("second")).validate()
+
+        self.assertEqual(first_child.get_instance(Client).service.config.name, "first")
+        self.assertEqual(second_child.get_instance(Client).service.config.name, "second")
+        self.assertIs(first_child.get_instance(Service), first_child.get_instance(Client).service)
+        # The classes depend on a tenant's binding, so each tenant gets its own bindings, and the parent none.
+        self.assertIn(SimpleTypeBindingKey(Service), first_child.bindings)
+        self.assertIn(SimpleTypeBindingKey(Client), second_child.bindings)
+        self.assertNotIn(SimpleTypeBindingKey(Service), parent.bindings)
+        self.assertRaises(AssertionError, lambda: parent.get_instance(Service))
+
+    def test_metrics(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        injector = create_injector(Module_)
+        metrics = injector.enable_metrics()
+        injector.get_instance(B)
+        injector.get_instance(B)
+        snapshot = metrics.snapshot()
+
+        a_metrics = snapshot[SimpleTypeBindingKey(A)]
+        self.assertEqual(a_metrics["resolve_count"], 2)
+        self.assertEqual(a_metrics["memoization_hits"], 1)
+        self.assertEqual(a_metrics["memoization_misses"], 1)
+        self.assertEqual(a_metrics["construction_seconds"]["count"], 1)
+        self.assertEqual(a_metrics["lock_wait_count"], 1)
+        b_metrics = snapshot[SimpleTypeBindingKey(B)]
+        self.assertEqual(b_metrics["resolve_count"], 2)
+        self.assertEqual(b_metrics["memoization_misses"], 0)
+        self.assertEqual(b_metrics["construction_seconds"]["count"], 2)
+        self.assertEqual(b_metrics["lock_wait_count"], 1)
+
+    def test_instrumentation_keeps_compiled_plans(self):
+        @memoized
+        @injectable_class
+        class A:
+            def __init__(self):
+                pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+                binder.install_class(B)
+
+        def resolve_compiled(enable):
+            injector = create_injector(Module_).compile()
+            instrumentation = enable(injector)
+            # The compiled plans never fall back to the interpretive resolution.
+            with mock.patch.object(ConstructorResolver, 'resolve', side_effect=AssertionError("not compiled")):
+                injector.get_instance(B)
+                injector.get_instance(B)
+            return instrumentation
+
+        snapshot = resolve_compiled(lambda injector: injector.enable_metrics()).snapshot()
+        self.assertEqual(snapshot[SimpleTypeBindingKey(A)]["memoization_hits"], 1)
+        self.assertEqual(snapshot[SimpleTypeBindingKey(B)]["construction_seconds"]["count"], 2)
+
+        report = resolve_compiled(lambda injector: injector.enable_profiling()).report()
+        self.assertEqual([node.binding_key.type_ for node in report.get_critical_path()], [B, A])
+
+        tracer = resolve_compiled(lambda injector: injector.enable_tracing(SamplingTracer(sample_every=1)))
+        self.assertEqual(len(tracer.dump()), 4)
+
+        accountant = resolve_compiled(lambda injector: injector.enable_memory_accounting())
+        try:
+            self.assertEqual([entry.binding_key.type_ for entry in accountant.report()], [A])
+        finally:
+            accountant.stop()
+
+    def test_profiling(self):
+        @injectable_class
+        class A:
+            def __init__(self):
+                time.sleep(0.02)
+
+        @injectable_class
+        class B:
+            def __init__(self):
+                pass
+
+        @injectable_class
+        class C:
+            def __init__(self, a: A, b: B):
+                self.a = a
+                self.b = b
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+                binder.install_class(B)
+                binder.install_class(C)
+
+        injector = create_injector(Module_)
+        profiler = injector.enable_profiling()
+        injector.get_instance(C)
+        report = profiler.report()
+
+        critical_path = [node.binding_key.type_ for node in report.get_critical_path()]
+        self.assertEqual(critical_path, [C, A])
+        self.assertEqual(report.get_top_self_time(1)[0].binding_key.type_, A)
+        self.assertGreaterEqual(report.get_top_self_time(1)[0].exclusive_seconds, 0.02)
+        profile = json.loads(report.to_json())
+        self.assertEqual(len(profile["roots"][0]["children"]), 2)
+        self.assertIn("Critical path:", report.to_text())
+
+    def test_sampling_tracer(self):
+        @injectable_class
+        class A:
+            def __init__(self):
+                pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+                binder.install_class(B)
+
+        injector = create_injector(Module_)
+        tracer = injector.enable_tracing(SamplingTracer(sample_every=2, capacity=3))
+        for _ in range(4):
+            injector.get_instance(B)
+
+        samples = tracer.dump()
+        self.assertEqual(len(samples), 3)
+        for sample in samples:
+            self.assertEqual(sample.resolver_type, "ConstructorResolver")
+            self.assertEqual(sample.binding_key_chain[0], SimpleTypeBindingKey(B))
+        self.assertEqual(samples[0].binding_key_chain, (SimpleTypeBindingKey(B),))
+        self.assertIn("1 in 2", tracer.dump_text())
+
+    @unittest.skipUnless(hasattr(signal, 'SIGUSR1'), "SIGUSR1 is not available")
+    def test_sampling_tracer_signal_handler(self):
+        tracer = SamplingTracer()
+        output = io.StringIO()
+        previous_handler = signal.getsignal(signal.SIGUSR1)
+        try:
+            tracer.install_signal_handler(output=output)
+            os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous_handler)
+        self.assertIn("0 sampled resolution(s)", output.getvalue())
+
+    def test_memory_accounting(self):
+        @memoized
+        @injectable_class
+        class Small:
+            def __init__(self):
+                self.data = bytearray(1000)
+
+        @memoized
+        @injectable_class
+        class Large:
+            def __init__(self, small: Small):
+                self.small = small
+                self.data = bytearray(1000000)
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(Small)
+                binder.install_class(Large)
+
+        injector = create_injector(Module_)
+        accountant = injector.enable_memory_accounting()
+        try:
+            injector.get_instance(Large)
+            entries = accountant.report()
+        finally:
+            accountant.stop()
+
+        self.assertEqual([entry.binding_key.type_ for entry in entries], [Large, Small])
+        self.assertGreaterEqual(entries[0].construction_bytes, 1000000)
+        self.assertGreaterEqual(entries[0].retained_bytes, 1000000)
+        self.assertLess(entries[1].construction_bytes, 1000000)
+        self.assertLess(entries[1].retained_bytes, 1000000)
+
+    def test_memory_accounting_stops_at_providers(self):
+        @injectable_class
+        class A:
+            def __init__(self):
+                pass
+
+        @memoized
+        @injectable_class
+        class Holder:
+            def __init__(self, a_provider: Provider[A]):
+                self.a_provider = a_provider
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(bytearray).to_instance(bytearray(1000000))
+                binder.install_class(Holder)
+
+        injector = create_injector(Module_)
+        accountant = injector.enable_memory_accounting()
+        try:
+            injector.get_instance(Holder)
+            entries = accountant.report()
+        finally:
+            accountant.stop()
+
+        # The provider leads to the injector, which holds the large instance binding.
+        self.assertEqual(len(entries), 1)
+        self.assertLess(entries[0].retained_bytes, 100000)
+
+    def test_cached_dict_binding(self):
+        counter = [0]
+
+        def create_value() -> int:
+            counter[0] += 1
+            return counter[0]
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_dict(str, int, cached=True)
+                binder.bind_to_dict(str, int).with_key("a").to_instance(10)
+                binder.bind_to_dict(str, int).with_key("b").to_constructor(create_value)
+
+        injector = create_injector(Module_)
+
+        first = injector.get_instance(Dict[str, int])
+        second = injector.get_instance(Dict[str, int])
+
+        self.assertEqual(first, {"a": 10, "b": 1})
+        self.assertIs(first, second)
+        with self.assertRaises(TypeError):
+            first["c"] = 3
+
+    def test_static_dict_binding(self):
+        counter = [0]
+
+        def create_value() -> int:
+            counter[0] += 1
+            return counter[0]
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_dict(str, int)
+                binder.bind_to_dict(str, int).with_key("a").to_instance(10)
+                binder.bind_to_dict(str, int).with_key("b").with_memoization().to_constructor(create_value)
+                binder.install_dict(str, int, "unscoped")
+                binder.bind_to_dict(str, int, "unscoped").with_key("b").to_constructor(create_value)
+
+        injector = create_injector(Module_)
+
+        first = injector.get_instance(Dict[str, int])
+        first["c"] = 30
+        second = injector.get_instance(Dict[str, int])
+
+        self.assertEqual(second, {"a": 10, "b": 1})
+        self.assertIsNot(first, second)
+        self.assertEqual(injector.get_instance(Dict[str, int], "unscoped"), {"b": 2})
+        self.assertEqual(injector.get_instance(Dict[str, int], "unscoped"), {"b": 3})
+
+        # Once metrics are enabled, the entries are resolved again so that their resolutions are observed.
+        metrics = injector.enable_metrics()
+        self.assertEqual(injector.get_instance(Dict[str, int]), {"a": 10, "b": 1})
+        self.assertEqual(metrics.get_binding_metrics(ToDictBindingKey(Dict[str, int], "b")).resolve_count, 1)
+
+    def test_install_dict_again_with_caching(self):
+        class FirstModule(Module):
+            def configure(self, binder: Binder):
+                binder.install_dict(str, int)
+                binder.bind_to_dict(str, int).with_key("a").to_instance(10)
+
+        class SecondModule(Module):
+            def configure(self, binder: Binder):
+                binder.install_dict(str, int, cached=True)
+                binder.bind_to_dict(str, int).with_key("b").to_instance(20)
+
+        injector = create_injector(FirstModule, SecondModule)
+
+        mapping = injector.get_instance(Dict[str, int])
+        self.assertEqual(dict(mapping), {"a": 10, "b": 20})
+        self.assertIs(injector.get_instance(Dict[str, int]), mapping)
+
+    def test_dict_of_providers(self):
+        constructed = []
+
+        def create_handler(name: str):
+            def create() -> str:
+                constructed.append(name)
+                return name.upper()
+
+            return create
+
+        @injectable_class
+        class Router:
+            def __init__(self, handlers: Dict[str, Provider[str]], lazy_handlers: Dict[str, Lazy[str]]):
+                self.handlers = handlers
+                self.lazy_handlers = lazy_handlers
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(Router)
+                binder.install_dict(str, str)
+                for name in ["a", "b", "c"]:
+                    binder.bind_to_dict(str, str).with_key(name).to_constructor(create_handler(name))
+
+        for injector in [create_injector(Module_), create_injector(Module_).compile()]:
+            constructed.clear()
+            router = injector.get_instance(Router)
+            self.assertEqual(set(router.handlers.keys()), {"a", "b", "c"})
+            self.assertEqual(constructed, [])
+
+            self.assertEqual(router.handlers["b"].get(), "B")
+            self.assertEqual(router.lazy_handlers["c"].get(), "C")
+            self.assertEqual(router.lazy_handlers["c"].get(), "C")
+            self.assertEqual(constructed, ["b", "c"])
+
+    def test_injectable_class_introspection_is_deferred(self):
+        @injectable_class
+        class A:
+            def __init__(self, value: int = 10):
+                self.value = value
+
+        self.assertRaises(AssertionError, lambda: validate_injectable_class(A))
+
+        @injectable_class
+        class B:
+            def __init__(self):
+                self.value = 20
+
+        self.assertIs(validate_injectable_class(B), B)
+        self.assertEqual(create_injector().get_instance(B).value, 20)
+
+    def test_factory_create_many(self):
+        @memoized
+        @injectable_class
+        class A:
+            pass
+
+        @injectable_class
+        class B:
+            pass
+
+        @injectable_factory(resolved_start='a')
+        class D:
+            def __init__(self, value: int, a: A, b: B, lazy_b: Lazy[B]):
+                self.value = value
+                self.a = a
+                self.b = b
+                self.lazy_b = lazy_b
+
+        injector = create_injector()
+        d_factory = injector.get_instance(factory_class(D))
+
+        ds = d_factory.create_many([(1,), (2,), (3,)])
+        ds.append(d_factory.create(4))
+
+        self.assertEqual([d.value for d in ds], [1, 2, 3, 4])
+        self.assertEqual(len({id(d.a) for d in ds}), 1)
+        self.assertEqual(len({id(d.b) for d in ds}), 4)
+        self.assertEqual(len({id(d.lazy_b) for d in ds}), 4)
+        self.assertIsInstance(ds[0].lazy_b.get(), B)
+
+    def test_providers_are_reused_across_constructions(self):
+        @injectable_class
+        class A:
+            pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a_provider: Provider[A], a_lazy: Lazy[A]):
+                self.a_provider = a_provider
+                self.a_lazy = a_lazy
+
+        injector = create_injector()
+        first = injector.get_instance(B)
+        second = injector.get_instance(B)
+
+        self.assertIs(first.a_provider, second.a_provider)
+        self.assertIsNot(first.a_lazy, second.a_lazy)
+        self.assertIsNot(first.a_lazy.get(), second.a_lazy.get())
+
+        # A provider created before the metrics were enabled goes through the instrumented resolver afterwards.
+        metrics = injector.enable_metrics()
+        first.a_provider.get()
+        self.assertEqual(metrics.get_binding_metrics(SimpleTypeBindingKey(A)).resolve_count, 1)
+
+    def test_providers_are_bound_to_the_owning_injector(self):
+        @injectable_class
+        class A:
+            pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a_provider: Provider[A]):
+                self.a_provider = a_provider
+
+        @memoized
+        @injectable_class
+        class C:
+            def __init__(self, a_provider: Provider[A]):
+                self.a_provider = a_provider
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(B)
+                binder.install_class(C)
+
+        parent = create_injector(Module_)
+        child = parent.create_child()
+
+        # The singleton is first built under the view of a batch, but its provider is bound to the injector.
+        (c, b) = parent.get_instances([C, B], share_dependencies=True)
+        self.assertIs(c.a_provider.injector, parent)
+        self.assertIs(b.a_provider.injector, parent)
+        self.assertIs(parent.get_instance(B).a_provider, b.a_provider)
+        self.assertIs(child.get_instance(B).a_provider, b.a_provider)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires os.fork().")
+    def test_prepare_for_fork(self):
+        @memoized
+        @injectable_class
+        class A:
+            pass
+
+        @injectable_class
+        class B:
+            def __init__(self, a: A):
+                self.a = a
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        injector = create_injector(Module_)
+        try:
+            report = injector.prepare_for_fork(freeze_gc=True)
+        finally:
+            gc.unfreeze()
+        self.assertEqual(len(report.entries), 1)
+        a = injector.get_instance(A)
+        lazy_b = Lazy(injector.get_provider(B))
+
+        # Simulate other threads that hold the injector's lock and a lazy's lock at the time of the fork.
+        with injector.lock, lazy_b.cell.lock:
+            pid = os.fork()
+            if pid == 0:
+                signal.alarm(5)
+                ok = injector.get_instance(B).a is a and lazy_b.get().a is a
+                os._exit(0 if ok else 1)
+        (_, status) = os.waitpid(pid, 0)
+        self.assertTrue(os.WIFEXITED(status))
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires os.fork().")
+    def test_memoization_policy_locks_after_fork(self):
+        @injectable_class
+        class A:
+            pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).with_memoization(policy=KeepMostRecentlyUsed(1)).to_constructor(A)
+
+        injector = create_injector(Module_)
+        resolver = injector.get_resolver(SimpleTypeBindingKey.of(A))
+
+        # Simulate other threads that hold the locks of the memoized binding and of its policy at the time of the fork.
+        with resolver.lock, resolver.policy.lock:
+            pid = os.fork()
+            if pid == 0:
+                signal.alarm(5)
+                ok = injector.get_instance(A) is injector.get_instance(A)
+                os._exit(0 if ok else 1)
+        (_, status) = os.waitpid(pid, 0)
+        self.assertTrue(os.WIFEXITED(status))
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+    def test_memoization_keep_while_referenced(self):
+        @memoized_with(policy_factory=KeepWhileReferenced)
+        @injectable_class
+        class A:
+            pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        injector = create_injector(Module_)
+        policy = injector.get_resolver(SimpleTypeBindingKey.of(A)).policy
+        a = injector.get_instance(A)
+        self.assertIs(injector.get_instance(A), a)
+        del a
+        gc.collect()
+        self.assertEqual(policy.snapshot(), {"construction_count": 1, "eviction_count": 1, "size": 0})
+        self.assertIsInstance(injector.get_instance(A), A)
+        self.assertEqual(policy.construction_count, 2)
+
+    def test_memoization_keep_while_referenced_collects_under_the_lock(self):
+        class A:
+            def __init__(self):
+                # A cycle, so that the instance is only freed by a collection.
+                self.self_reference = self
+
+        policy = KeepWhileReferenced()
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).with_memoization(policy=policy).to_constructor(lambda: A())
+
+        injector = create_injector(Module_)
+        injector.get_instance(A)
+
+        def collect_under_the_lock():
+            with policy.lock:
+                gc.collect()
+
+        # The weak reference callback runs in the thread that holds the lock, which hung when it took the lock too.
+        thread = Thread(target=collect_under_the_lock, daemon=True)
+        thread.start()
+        thread.join(timeout=5.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(policy.snapshot(), {"construction_count": 1, "eviction_count": 1, "size": 0})
+
+    def test_memoization_policies_are_per_injector(self):
+        @memoized_with(policy_factory=functools.partial(KeepMostRecentlyUsed, 1))
+        @injectable_class
+        class A:
+            pass
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.install_class(A)
+
+        first = create_injector(Module_)
+        second = create_injector(Module_)
+        child = first.create_child()
+
+        a = first.get_instance(A)
+        self.assertIsNot(second.get_instance(A), a)
+        # The child resolves the binding of its parent, so it shares the parent's policy and instance.
+        self.assertIs(child.get_instance(A), a)
+        self.assertIs(first.get_instance(A), a)
+
+        first_policy = first.get_resolver(SimpleTypeBindingKey.of(A)).policy
+        second_policy = second.get_resolver(SimpleTypeBindingKey.of(A)).policy
+        self.assertIsNot(first_policy, second_policy)
+        self.assertEqual(first_policy.snapshot(), {"construction_count": 1, "eviction_count": 0, "size": 1})
+        self.assertEqual(second_policy.snapshot(), {"construction_count": 1, "eviction_count": 0, "size": 1})
+
+    def test_memoization_policy_of_child_binding(self):
+        @injectable_class
+        class A:
+            pass
+
+        class ChildModule(Module):
+            def configure(self, binder: Binder):
+                policy = KeepMostRecentlyUsed(1)
+                binder.bind(A, "a").with_memoization(policy=policy).to_constructor(A)
+                binder.bind(A, "b").with_memoization(policy=policy).to_constructor(A)
+
+        parent = create_injector()
+        first_child = parent.create_child(ChildModule)
+        second_child = parent.create_child(ChildModule)
+
+        a = first_child.get_instance(A, "a")
+        second_child.get_instance(A, "a")
+        second_child.get_instance(A, "b")
+        # Each child has its own policy, so the other child's bindings do not evict this child's instance.
+        self.assertIs(first_child.get_instance(A, "a"), a)
+        self.assertEqual(first_child.get_resolver(SimpleTypeBindingKey.of(A, "a")).policy.eviction_count, 0)
+        self.assertEqual(second_child.get_resolver(SimpleTypeBindingKey.of(A, "a")).policy.eviction_count, 1)
+
+    def test_memoization_keep_most_recently_used(self):
+        @injectable_class
+        class A:
+            pass
+
+        policy = KeepMostRecentlyUsed(2)
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                for tag in ["a", "b", "c"]:
+                    binder.bind(A, tag).with_memoization(policy=policy).to_constructor(A)
+
+        injector = create_injector(Module_)
+        a = injector.get_instance(A, "a")
+        injector.get_instance(A, "b")
+        self.assertIs(injector.get_instance(A, "a"), a)
+        # "b" is the least recently used binding, so it is evicted.
+        injector.get_instance(A, "c")
+        self.assertIs(injector.get_instance(A, "a"), a)
+        self.assertEqual(policy.snapshot(), {"construction_count": 3, "eviction_count": 1, "size": 2})
+        injector.get_instance(A, "b")
+        self.assertEqual(policy.snapshot(), {"construction_count": 4, "eviction_count": 2, "size": 2})
+
+    def test_memoization_evict_when_idle(self):
+        @injectable_class
+        class A:
+            pass
+
+        now = [0.0]
+        policy = EvictWhenIdle(10.0, clock=lambda: now[0])
+
+        class Module_(Module):
+            def configure(self, binder: Binder):
+                binder.bind(A).with_memoization(policy=policy).to_constructor(A)
+
+        injector = create_injector(Module_)
+        a = injector.get_instance(A)
+        now[0] = 8.0
+        self.assertIs(injector.get_instance(A), a)
+        # Each request restarts the idle period.
+        now[0] = 16.0
+        self.assertIs(injector.get_instance(A), a)
+        now[0] = 30.0
+        policy.evict_expired()
+        self.assertEqual(policy.snapshot(), {"construction_count": 1, "eviction_count": 1, "size": 0})
+        self.assertIsNot(injector.get_instance(A), a)
+
 
 if __name__ == "__main__":
     unittest.main()
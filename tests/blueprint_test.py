@@ -0,0 +1,75 @@
+import pickle
+import unittest
+from typing import Dict
+from unittest import TestCase
+
+from jyuusu.binder import Module, Binder
+from jyuusu.constructor_resolver import injectable_class, memoized
+from jyuusu.factory_resolver import injectable_factory, factory_class
+from jyuusu.injectors import create_blueprint
+from jyuusu.provider import Provider
+from jyuusu.scopes import ThreadLocalScope
+
+
+@memoized
+@injectable_class
+class Config:
+    def __init__(self, name: str):
+        self.name = name
+
+
+@injectable_class
+class Service:
+    def __init__(self, config: Config, handlers: Dict[str, int], config_provider: Provider[Config]):
+        self.config = config
+        self.handlers = handlers
+        self.config_provider = config_provider
+
+
+@injectable_factory(resolved_start='config')
+class Job:
+    def __init__(self, value: int, config: Config):
+        self.value = value
+        self.config = config
+
+
+def create_two() -> int:
+    return 2
+
+
+class AppModule(Module):
+    def configure(self, binder: Binder):
+        binder.bind(str).to_instance("app")
+        binder.install_class(Config)
+        binder.install_class(Service)
+        binder.install_class(factory_class(Job))
+        binder.install_dict(str, int)
+        binder.bind_to_dict(str, int).with_key("a").to_instance(1)
+        binder.bind(int, "scoped").in_scope(ThreadLocalScope()).to_constructor(create_two)
+
+
+class BlueprintTest(TestCase):
+    def test_blueprint_round_trip(self):
+        blueprint = pickle.loads(pickle.dumps(create_blueprint(AppModule)))
+
+        injector = blueprint.create_injector(validate=True)
+        service = injector.get_instance(Service)
+        self.assertEqual(service.config.name, "app")
+        self.assertIs(service.config, service.config_provider.get())
+        self.assertEqual(service.handlers, {"a": 1})
+        self.assertEqual(injector.get_instance(factory_class(Job)).create(10).config.name, "app")
+        self.assertEqual(injector.get_instance(int, "scoped"), 2)
+
+        # Injectors created from one blueprint do not share memoized instances.
+        self.assertIsNot(blueprint.create_injector().get_instance(Config), service.config)
+
+    def test_unpicklable_binding(self):
+        class LocalModule(Module):
+            def configure(self, binder: Binder):
+                binder.bind(int).to_constructor(lambda: 10)
+
+        self.assertRaises(ValueError, lambda: create_blueprint(LocalModule))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,17 @@
+import gc
+import pickle
+import typing
 import unittest
+import weakref
 from typing import Dict
 from unittest import TestCase
 
-from jyuusu.injector import Injector
+from jyuusu.batch import BatchResolutionError
+from jyuusu.injector import Injector, Resolver
 from jyuusu.binding_keys import SimpleTypeBindingKey, ToDictBindingKey
 from jyuusu.resolvers import DictResolver, InstanceResolver, DelegatedResolver, MemoizedResolver
-from jyuusu.constructor_resolver import ConstructorResolver, ResolverSpec, ProviderType
-from jyuusu.provider import Provider
+from jyuusu.constructor_resolver import ConstructorResolver, ResolverSpec, ProviderType, injectable_class
+from jyuusu.provider import Provider, Lazy
 
 
 class InjectorTest(TestCase):
@@ -165,6 +170,254 @@ class InjectorTest(TestCase):
         self.assertEqual(a.get_b().value, 20)
         self.assertEqual(a.get_b().a.value, 10)
 
+    def test_compiled_constructor_resolver(self):
+        class A:
+            def __init__(self, d0: int, d1: int):
+                self.d1 = d1
+                self.d0 = d0
+
+        injector = Injector({
+            SimpleTypeBindingKey(int, 'd0'): InstanceResolver(10),
+            SimpleTypeBindingKey(int, 'd1'): DelegatedResolver(SimpleTypeBindingKey(int, 'd0')),
+            SimpleTypeBindingKey(A): ConstructorResolver(A, {
+                'd0': ResolverSpec(SimpleTypeBindingKey(int, 'd0')),
+                'd1': ResolverSpec(SimpleTypeBindingKey(int, 'd1')),
+            })
+        }).compile()
+
+        a0 = injector.get_instance(A)
+        a1 = injector.get_instance(A)
+
+        self.assertEqual(a0.d0, 10)
+        self.assertEqual(a0.d1, 10)
+        self.assertNotEqual(a0, a1)
+
+    def test_compiled_memoized_resolver_shares_value(self):
+        class A:
+            def __init__(self):
+                pass
+
+        injector = Injector({
+            SimpleTypeBindingKey(A): MemoizedResolver(ConstructorResolver(A, {}))
+        })
+        a0 = injector.get_instance(A)
+        injector.compile()
+        a1 = injector.get_instance(A)
+
+        self.assertEqual(a0, a1)
+
+    def test_compiled_dict_and_provider(self):
+        class A:
+            def __init__(self, values: Dict[str, int], values_provider: Provider[Dict[str, int]]):
+                self.values = values
+                self.values_provider = values_provider
+
+        injector = Injector({
+            SimpleTypeBindingKey(Dict[str, int]): DictResolver(
+                Dict[str, int],
+                {
+                    ToDictBindingKey(Dict[str, int], "a"),
+                    ToDictBindingKey(Dict[str, int], "b"),
+                }),
+            ToDictBindingKey(Dict[str, int], "a"): InstanceResolver(10),
+            ToDictBindingKey(Dict[str, int], "b"): InstanceResolver(20),
+            SimpleTypeBindingKey(A): ConstructorResolver(A, {
+                'values': ResolverSpec(SimpleTypeBindingKey(Dict[str, int])),
+                'values_provider': ResolverSpec(SimpleTypeBindingKey(Dict[str, int]), ProviderType.PROVIDER),
+            })
+        }).compile()
+
+        a = injector.get_instance(A)
+
+        self.assertEqual(a.values, {"a": 10, "b": 20})
+        self.assertEqual(a.values_provider.get(), {"a": 10, "b": 20})
+
+    def test_compile_circular_dependency(self):
+        class A:
+            def __init__(self, b: 'B'):
+                self.b = b
+
+        class B:
+            def __init__(self, a: A):
+                self.a = A
+
+        injector = Injector({
+            SimpleTypeBindingKey(A): ConstructorResolver(A, {'b': ResolverSpec(SimpleTypeBindingKey(B))}),
+            SimpleTypeBindingKey(B): ConstructorResolver(B, {'a': ResolverSpec(SimpleTypeBindingKey(A))})
+        })
+
+        self.assertRaises(RuntimeError, lambda: injector.compile())
+
+    def test_interned_binding_keys(self):
+        key = SimpleTypeBindingKey.of(Dict[str, int], 'a')
+
+        self.assertIs(key, SimpleTypeBindingKey.of(Dict[str, int], 'a'))
+        self.assertEqual(key, SimpleTypeBindingKey(Dict[str, int], 'a'))
+        self.assertEqual(hash(key), hash(SimpleTypeBindingKey(Dict[str, int], 'a')))
+        self.assertEqual(pickle.loads(pickle.dumps(key)), key)
+        self.assertIsNot(key, SimpleTypeBindingKey.of(Dict[str, int]))
+
+    def test_repeated_get_instance_uses_cache(self):
+        injector = Injector({
+            SimpleTypeBindingKey(Dict[str, int]): InstanceResolver({"a": 10}),
+        })
+
+        self.assertEqual(injector.get_instance(Dict[str, int]), {"a": 10})
+        self.assertEqual(len(injector.instance_getters), 1)
+        self.assertEqual(injector.get_instance(Dict[str, int]), {"a": 10})
+        self.assertEqual(len(injector.instance_getters), 1)
+        self.assertRaises(AssertionError, lambda: injector.get_instance(Dict[str, int], 'missing'))
+
+    def test_validate_missing_dict_entry(self):
+        injector = Injector({
+            SimpleTypeBindingKey(Dict[str, int]): DictResolver(
+                Dict[str, int],
+                {
+                    ToDictBindingKey(Dict[str, int], "a"),
+                    ToDictBindingKey(Dict[str, int], "b"),
+                }),
+            ToDictBindingKey(Dict[str, int], "a"): InstanceResolver(10),
+        })
+
+        self.assertRaises(AssertionError, lambda: injector.validate())
+
+    def test_validate_keeps_cycle_checks_for_opaque_resolvers(self):
+        class OpaqueResolver(Resolver):
+            def resolve(self, injector, binding_key_stack):
+                return injector.get_instance_internal(SimpleTypeBindingKey(int), binding_key_stack)
+
+        injector = Injector({
+            SimpleTypeBindingKey(int): OpaqueResolver(),
+        }).validate()
+
+        self.assertTrue(injector.check_cycles)
+        self.assertRaises(RuntimeError, lambda: injector.get_instance(int))
+
+    def test_just_in_time_opaque_binding_resets_instance_getters(self):
+        class OpaqueResolver(Resolver):
+            def resolve(self, injector, binding_key_stack):
+                return 20
+
+        @injectable_class
+        class A:
+            pass
+
+        def _create_jyuusu_resolver() -> Resolver:
+            return OpaqueResolver()
+
+        A._create_jyuusu_resolver = _create_jyuusu_resolver
+
+        injector = Injector({
+            SimpleTypeBindingKey(int): InstanceResolver(10),
+        }).validate()
+        self.assertFalse(injector.check_cycles)
+        self.assertEqual(injector.get_instance(int), 10)
+        self.assertIn((int, None), injector.instance_getters)
+
+        self.assertEqual(injector.get_instance(A), 20)
+        self.assertTrue(injector.check_cycles)
+        self.assertNotIn((int, None), injector.instance_getters)
+
+    def test_memoized_resolver_caches_none(self):
+        calls = []
+
+        def create_none():
+            calls.append(None)
+            return None
+
+        injector = Injector({
+            SimpleTypeBindingKey(int): MemoizedResolver(ConstructorResolver(create_none, {}))
+        })
+
+        self.assertIsNone(injector.get_instance(int))
+        self.assertIsNone(injector.get_instance(int))
+        self.assertEqual(len(calls), 1)
+
+    def test_lazy_caches_none(self):
+        calls = []
+
+        class NoneProvider(Provider):
+            def get(self):
+                calls.append(None)
+                return None
+
+        lazy = Lazy(NoneProvider())
+
+        self.assertIsNone(lazy.get())
+        self.assertIsNone(lazy.get())
+        self.assertEqual(len(calls), 1)
+
+    def test_get_instances(self):
+        class Shared:
+            pass
+
+        def create_pair(shared: Shared):
+            return shared
+
+        def fail():
+            raise ValueError("failed")
+
+        bindings = {
+            SimpleTypeBindingKey(Shared): ConstructorResolver(Shared, {}),
+            SimpleTypeBindingKey(Shared, 'a'): ConstructorResolver(create_pair, {'shared': ResolverSpec.of(Shared)}),
+            SimpleTypeBindingKey(Shared, 'b'): ConstructorResolver(create_pair, {'shared': ResolverSpec.of(Shared)}),
+            SimpleTypeBindingKey(int): ConstructorResolver(fail, {}),
+        }
+        injector = Injector(bindings)
+
+        (a, b) = injector.get_instances([(Shared, 'a'), SimpleTypeBindingKey(Shared, 'b')])
+        self.assertIsNot(a, b)
+
+        (a, b, shared) = injector.get_instances([(Shared, 'a'), (Shared, 'b'), Shared], share_dependencies=True)
+        self.assertIs(a, b)
+        self.assertIs(a, shared)
+        self.assertIsNot(injector.get_instance(Shared), shared)
+
+        with self.assertRaises(BatchResolutionError) as context:
+            injector.get_instances([Shared, int, (Shared, 'a')], share_dependencies=True)
+        self.assertEqual(list(context.exception.errors.keys()), [1])
+        self.assertIsInstance(context.exception.errors[1], ValueError)
+        self.assertIs(context.exception.results[0], context.exception.results[2])
+
+    def test_get_instances_shares_parent_bindings(self):
+        class Shared:
+            pass
+
+        def create_pair(shared: Shared):
+            return shared
+
+        parent = Injector({SimpleTypeBindingKey(Shared): ConstructorResolver(Shared, {})})
+        child = Injector({
+            SimpleTypeBindingKey(Shared, 'a'): ConstructorResolver(create_pair, {'shared': ResolverSpec.of(Shared)}),
+        }, parent=parent)
+
+        (a, shared) = child.get_instances([(Shared, 'a'), Shared], share_dependencies=True)
+        self.assertIs(a, shared)
+
+    def test_equal_aliases_share_interned_keys_and_getters(self):
+        alias = typing.List[int]
+        # Equal to alias, but a different object, as typing returns once its alias cache has evicted alias.
+        equal_alias = typing.List.copy_with((int,))
+        self.assertIsNot(alias, equal_alias)
+        self.assertIs(SimpleTypeBindingKey.of(alias), SimpleTypeBindingKey.of(equal_alias))
+
+        injector = Injector({SimpleTypeBindingKey.of(alias): InstanceResolver([10])})
+        self.assertEqual(injector.get_instance(alias), [10])
+        self.assertEqual(injector.get_instance(equal_alias), [10])
+        self.assertEqual(len(injector.instance_getters), 1)
+        # The alias that was requested first is then found by identity. Other equal aliases are not added.
+        self.assertIs(injector.instance_getters_by_id[(id(alias), None)][0], alias)
+        for _ in range(3):
+            self.assertEqual(injector.get_instance(typing.List.copy_with((int,))), [10])
+        self.assertEqual(len(injector.instance_getters_by_id), 1)
+
+    def test_interned_keys_do_not_pin_types(self):
+        klass = type("Transient", (), {})
+        SimpleTypeBindingKey.of(klass)
+        klass_ref = weakref.ref(klass)
+        del klass
+        gc.collect()
+        self.assertIsNone(klass_ref())
 
 if __name__ == "__main__":
     unittest.main()
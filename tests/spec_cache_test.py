@@ -0,0 +1,159 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+from typing import List
+from unittest import TestCase
+
+from jyuusu.binder import Module, Binder
+from jyuusu.injectors import create_injector
+from jyuusu.spec_cache import enable_spec_cache, disable_spec_cache, ResolverSpecCache
+
+MODULE_SOURCE = """
+from jyuusu.constructor_resolver import injectable_class
+
+
+@injectable_class
+class A:
+    def __init__(self):
+        self.value = 10
+
+
+@injectable_class
+class B:
+    def __init__(self, a: A):
+        self.a = a
+"""
+
+MODULE_NAME = "jyuusu_spec_cache_test_classes"
+
+ALIAS_MODULE_NAME = "jyuusu_spec_cache_test_aliases"
+
+ALIAS_MODULE_SOURCE = """
+import typing
+
+Values = typing.List[int]
+"""
+
+BASE_ALIAS_MODULE_NAME = "jyuusu_spec_cache_test_base_aliases"
+
+REEXPORTING_ALIAS_MODULE_SOURCE = """
+from jyuusu_spec_cache_test_base_aliases import Values
+"""
+
+ALIAS_USING_MODULE_SOURCE = """
+from jyuusu.constructor_resolver import injectable_class
+from jyuusu_spec_cache_test_aliases import Values
+
+
+@injectable_class
+class B:
+    def __init__(self, values: Values):
+        self.values = values
+"""
+
+
+class ValuesModule(Module):
+    def configure(self, binder: Binder):
+        binder.bind(List[int]).to_instance([10])
+        binder.bind(List[str]).to_instance(["a"])
+
+
+class SpecCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, "specs.cache")
+        sys.path.insert(0, self.directory.name)
+
+    def tearDown(self):
+        disable_spec_cache()
+        sys.path.remove(self.directory.name)
+        sys.modules.pop(MODULE_NAME, None)
+        sys.modules.pop(ALIAS_MODULE_NAME, None)
+        sys.modules.pop(BASE_ALIAS_MODULE_NAME, None)
+        self.directory.cleanup()
+
+    def import_module(self, source: str, module_name: str = MODULE_NAME):
+        with open(os.path.join(self.directory.name, module_name + ".py"), "w") as file:
+            file.write(source)
+        sys.modules.pop(module_name, None)
+        importlib.invalidate_caches()
+        return importlib.import_module(module_name)
+
+    def resolve_b(self, source: str, *modules):
+        module = self.import_module(source)
+        cache = enable_spec_cache(self.cache_path, save_at_exit=False)
+        b = create_injector(*modules).get_instance(module.B)
+        cache.save()
+        return cache, b
+
+    def test_cached_specs_are_reused(self):
+        (cache, b) = self.resolve_b(MODULE_SOURCE)
+        self.assertEqual((cache.hit_count, cache.miss_count), (0, 2))
+        self.assertEqual(b.a.value, 10)
+
+        (cache, b) = self.resolve_b(MODULE_SOURCE)
+        self.assertEqual((cache.hit_count, cache.miss_count), (2, 0))
+        self.assertEqual(b.a.value, 10)
+
+    def test_stale_specs_are_rebuilt(self):
+        self.resolve_b(MODULE_SOURCE)
+
+        (cache, b) = self.resolve_b(MODULE_SOURCE.replace("self.value = 10", "self.value = 200"))
+        self.assertEqual((cache.hit_count, cache.miss_count), (0, 2))
+        self.assertEqual(b.a.value, 200)
+
+        (cache, b) = self.resolve_b(MODULE_SOURCE.replace("self.value = 10", "self.value = 200"))
+        self.assertEqual((cache.hit_count, cache.miss_count), (2, 0))
+
+    def test_specs_are_rebuilt_when_an_imported_alias_changes(self):
+        self.import_module(ALIAS_MODULE_SOURCE, ALIAS_MODULE_NAME)
+        (cache, b) = self.resolve_b(ALIAS_USING_MODULE_SOURCE, ValuesModule)
+        self.assertEqual(b.values, [10])
+
+        (cache, b) = self.resolve_b(ALIAS_USING_MODULE_SOURCE, ValuesModule)
+        self.assertEqual((cache.hit_count, cache.miss_count), (1, 0))
+
+        # The module of the class is unchanged, but the alias it imports now means another type.
+        self.import_module(ALIAS_MODULE_SOURCE.replace("List[int]", "List[str]  # changed"), ALIAS_MODULE_NAME)
+        (cache, b) = self.resolve_b(ALIAS_USING_MODULE_SOURCE, ValuesModule)
+        self.assertEqual((cache.hit_count, cache.miss_count), (0, 1))
+        self.assertEqual(b.values, ["a"])
+
+    def test_specs_are_rebuilt_when_a_reexported_alias_changes(self):
+        self.import_module(ALIAS_MODULE_SOURCE, BASE_ALIAS_MODULE_NAME)
+        self.import_module(REEXPORTING_ALIAS_MODULE_SOURCE, ALIAS_MODULE_NAME)
+        (cache, b) = self.resolve_b(ALIAS_USING_MODULE_SOURCE, ValuesModule)
+        self.assertEqual(b.values, [10])
+
+        # Only the module that defines the alias changes. The module the class imports it from only re-exports it.
+        self.import_module(ALIAS_MODULE_SOURCE.replace("List[int]", "List[str]  # changed"), BASE_ALIAS_MODULE_NAME)
+        self.import_module(REEXPORTING_ALIAS_MODULE_SOURCE, ALIAS_MODULE_NAME)
+        (cache, b) = self.resolve_b(ALIAS_USING_MODULE_SOURCE, ValuesModule)
+        self.assertEqual((cache.hit_count, cache.miss_count), (0, 1))
+        self.assertEqual(b.values, ["a"])
+
+    def test_entries_of_missing_modules_are_pruned(self):
+        self.resolve_b(MODULE_SOURCE)
+        os.remove(os.path.join(self.directory.name, MODULE_NAME + ".py"))
+        sys.modules.pop(MODULE_NAME, None)
+        importlib.invalidate_caches()
+
+        cache = ResolverSpecCache(self.cache_path)
+        self.assertEqual(len(cache.entries), 2)
+        cache.dirty = True
+        cache.save()
+        self.assertEqual(ResolverSpecCache(self.cache_path).entries, {})
+
+    @unittest.skipUnless(hasattr(os, 'geteuid'), "file ownership is not available")
+    def test_files_writable_by_others_are_ignored(self):
+        self.resolve_b(MODULE_SOURCE)
+        self.assertEqual(len(ResolverSpecCache(self.cache_path).entries), 2)
+
+        os.chmod(self.cache_path, 0o666)
+        self.assertEqual(ResolverSpecCache(self.cache_path).entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()